@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks the core simulator kernels over a set of STN instances.
+
+Each kernel is timed across every selected instance, and the timings are
+grouped into buckets by the instance's vertex count. Results are stored in a
+JSON file, keyed by the git commit they were measured on, so that later runs
+can be compared against earlier ones.
+
+Usage:
+
+    $ python3 benchmark.py run problem_instances
+    $ python3 benchmark.py compare --threshold 0.1
+
+The compare command exits with status 1 if any kernel regressed.
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+from libheat import srea
+from libheat import lpbackend
+from libheat.stntools import load_stn_from_json_file, shortestpaths, ppc
+from libheat.montsim import Simulator
+from libheat.dmontsim import DecoupledSimulator
+from run_simulator import folder_harvest, DEFAULT_DECOUPLE
+
+
+DEFAULT_RESULTS = "benchmark_results.json"
+"""Default file which benchmark results are stored in."""
+DEFAULT_STRATEGIES = ["early", "srea", "drea", "drea-si", "drea-ar", "arsi",
+                      "da"]
+"""Execution strategies benchmarked by the simulate kernel."""
+SIM_OPTIONS = {"ar_threshold": 0.5, "si_threshold": 0.0,
+               "alp_threshold": 0.0}
+"""Simulation options passed into every benchmarked simulation."""
+BUCKETS = [("v<=8", 8), ("v<=32", 32), ("v<=128", 128), ("v<=512", 512),
+           ("v>512", float("inf"))]
+"""Instance size buckets, as (name, maximum vertex count) pairs."""
+
+
+def main():
+    args = parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "compare":
+        regressions = compare(args.results, args.base, args.head,
+                              args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+def size_bucket(stn) -> str:
+    """Returns the name of the size bucket the STN belongs to."""
+    vert_count = len(stn.verts)
+    for name, max_verts in BUCKETS:
+        if vert_count <= max_verts:
+            return name
+    return BUCKETS[-1][0]
+
+
+def bucket_key(name):
+    """Sort key which orders bucket names from smallest to largest size."""
+    names = [bucket_name for bucket_name, _ in BUCKETS]
+    if name in names:
+        return (names.index(name), name)
+    return (len(names), name)
+
+
+def kernels(strategies):
+    """Returns a dict of the form {kernel name: setup function}.
+
+    A setup function takes (path, stn) and returns a zero argument function,
+    which is the function actually timed.
+    """
+    def load(path, stn):
+        return lambda: load_stn_from_json_file(path)
+
+    def copy(path, stn):
+        return stn.copy
+
+    def floyd_warshall(path, stn):
+        return lambda: stn.copy().floyd_warshall()
+
+    def johnson(path, stn):
+        return lambda: shortestpaths.tighten(stn.copy())
+
+    def run_ppc(path, stn):
+        return lambda: ppc.tighten(stn.copy())
+
+    def run_srea(path, stn):
+        return lambda: srea.srea(stn)
+
+    def srea_lp(backend):
+        # SREA with the LP backend switched, for comparing solve latency.
+        def setup(path, stn):
+            def solve():
+                previous = (lpbackend.get_backend().name
+                            if lpbackend.is_chosen() else None)
+                lpbackend.set_backend(backend)
+                try:
+                    srea.srea(stn)
+                finally:
+                    lpbackend.set_backend(previous)
+            return solve
+        return setup
+
+    def select_next_timepoint(path, stn):
+        sim = Simulator(0)
+        sim.stn = stn.copy()
+        return lambda: sim.select_next_timepoint(sim.stn, 0.0)
+
+    def simulate(strategy):
+        def setup(path, stn):
+            if strategy == "da":
+                sim = DecoupledSimulator(0)
+                return lambda: sim.simulate(stn, sim_options=SIM_OPTIONS,
+                                            decouple_type=DEFAULT_DECOUPLE)
+            sim = Simulator(0)
+            return lambda: sim.simulate(stn, strategy,
+                                        sim_options=SIM_OPTIONS)
+        return setup
+
+    kernel_dict = {"load": load,
+                   "copy": copy,
+                   "floyd_warshall": floyd_warshall,
+                   "johnson": johnson,
+                   "ppc": run_ppc,
+                   "srea": run_srea,
+                   "select_next_timepoint": select_next_timepoint}
+    for backend in sorted(lpbackend.BACKENDS):
+        kernel_dict["srea:" + backend] = srea_lp(backend)
+    for strategy in strategies:
+        kernel_dict["simulate:" + strategy] = simulate(strategy)
+    return kernel_dict
+
+
+def time_kernel(func, repeat) -> list:
+    """Time a function, returning a list of call durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def select_instances(stn_paths, per_bucket):
+    """Pick up to per_bucket instances from each size bucket.
+
+    Returns:
+        A dict of the form {bucket name: list of (path, STN)}.
+    """
+    selected = {}
+    for path in sorted(stn_paths):
+        if per_bucket is not None and len(selected) == len(BUCKETS) and all(
+                len(pairs) >= per_bucket for pairs in selected.values()):
+            break
+        stn = load_stn_from_json_file(path)["stn"]
+        bucket = selected.setdefault(size_bucket(stn), [])
+        if per_bucket is None or len(bucket) < per_bucket:
+            bucket.append((path, stn))
+    return selected
+
+
+def benchmark(selected, kernel_dict, repeat, sim_repeat):
+    """Runs every kernel over every selected instance.
+
+    Returns:
+        A dict of the form {kernel: {bucket: stats dict}}.
+    """
+    results = {}
+    for kernel_name, setup in kernel_dict.items():
+        kernel_repeat = sim_repeat if kernel_name.startswith("simulate") \
+            else repeat
+        results[kernel_name] = {}
+        for bucket in sorted(selected, key=bucket_key):
+            pairs = selected[bucket]
+            durations = []
+            for path, stn in pairs:
+                durations += time_kernel(setup(path, stn), kernel_repeat)
+            total = sum(durations)
+            results[kernel_name][bucket] = {
+                "instances": len(pairs),
+                "calls": len(durations),
+                "mean_s": total / len(durations),
+                "median_s": statistics.median(durations),
+                "min_s": min(durations),
+                "throughput": len(durations) / total if total > 0 else None}
+            print("{:<28} {:<8} {:>10.3f} ms/call {:>12.1f} calls/s".format(
+                kernel_name, bucket, results[kernel_name][bucket]["median_s"]
+                * 1000, results[kernel_name][bucket]["throughput"] or 0.0))
+    return results
+
+
+def current_commit() -> str:
+    """Returns the current git commit hash, marked if the tree is dirty."""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL).decode().strip()
+        dirty = subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    if dirty:
+        commit += "-dirty"
+    return commit
+
+
+def load_results(filepath) -> dict:
+    """Load the stored results, of the form {commit: entry}"""
+    if not os.path.isfile(filepath):
+        return {}
+    with open(filepath, "r") as f:
+        return json.load(f)
+
+
+def run(args):
+    """Run the benchmark suite, and store the results."""
+    stn_paths = folder_harvest(args.stns, recurse=True, only_json=True)
+    selected = select_instances(stn_paths, args.per_bucket)
+    if not selected:
+        print("No STN instances found.")
+        return
+    kernel_dict = kernels(args.strategies)
+    if args.kernels is not None:
+        kernel_dict = {k: v for k, v in kernel_dict.items()
+                       if k in args.kernels or k.split(":")[0] in args.kernels}
+    results = benchmark(selected, kernel_dict, args.repeat, args.sim_repeat)
+
+    commit = args.commit if args.commit is not None else current_commit()
+    stored = load_results(args.output)
+    stored[commit] = {"commit": commit,
+                      "timestamp": time.time(),
+                      "repeat": args.repeat,
+                      "sim_repeat": args.sim_repeat,
+                      "results": results}
+    with open(args.output, "w") as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+    print("Stored results for commit {} in {}".format(commit, args.output))
+
+
+def compare(filepath, base=None, head=None, threshold=0.1) -> list:
+    """Compare the results of two commits, and report regressions.
+
+    Args:
+        filepath (str): Results file to read.
+        base (str, optional): Commit to compare against. Defaults to the
+            second most recently stored commit.
+        head (str, optional): Commit to compare. Defaults to the most
+            recently stored commit.
+        threshold (float, optional): Relative slowdown of the median call
+            time at which a kernel counts as regressed. Default is 0.1 (10%).
+
+    Returns:
+        A list of (kernel, bucket, base median, head median) tuples, one for
+        each regression found.
+    """
+    stored = load_results(filepath)
+    by_time = sorted(stored, key=lambda k: stored[k]["timestamp"])
+    if head is None:
+        if len(by_time) < 1:
+            raise ValueError("No results stored in {}".format(filepath))
+        head = by_time[-1]
+    if base is None:
+        older = [k for k in by_time if k != head]
+        if not older:
+            raise ValueError("Need at least two stored commits to compare")
+        base = older[-1]
+    for commit in (base, head):
+        if commit not in stored:
+            raise ValueError("Commit {} not found in {}".format(commit,
+                                                                 filepath))
+
+    print("Comparing {} (head) against {} (base)".format(head, base))
+    regressions = []
+    base_results = stored[base]["results"]
+    for kernel, buckets in sorted(stored[head]["results"].items()):
+        for bucket in sorted(buckets, key=bucket_key):
+            stats = buckets[bucket]
+            try:
+                old = base_results[kernel][bucket]["median_s"]
+            except KeyError:
+                continue
+            new = stats["median_s"]
+            change = (new - old) / old if old > 0 else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "REGRESSION"
+                regressions.append((kernel, bucket, old, new))
+            print("{:<28} {:<8} {:>10.3f} -> {:>10.3f} ms {:>+8.1f}% {}"
+                  .format(kernel, bucket, old * 1000, new * 1000,
+                          change * 100, flag))
+    if regressions:
+        print("{} regression(s) above {:.0f}%".format(len(regressions),
+                                                      threshold * 100))
+    else:
+        print("No regressions above {:.0f}%".format(threshold * 100))
+    return regressions
+
+
+def parse_args():
+    """Parse the program arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the simulator "
+                                     "kernels.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("-o", "--output", type=str,
+                            default=DEFAULT_RESULTS,
+                            help="Results file to add to. Default is "
+                            "'{}'".format(DEFAULT_RESULTS))
+    run_parser.add_argument("-r", "--repeat", type=int, default=5,
+                            help="Times to call each kernel per instance. "
+                            "Default is 5.")
+    run_parser.add_argument("--sim-repeat", type=int, default=3,
+                            help="Times to run each simulation per instance."
+                            " Default is 3.")
+    run_parser.add_argument("-n", "--per-bucket", type=int, default=10,
+                            help="Maximum instances per size bucket. Default"
+                            " is 10.")
+    run_parser.add_argument("-k", "--kernels", nargs="+", default=None,
+                            help="Only run these kernels. Default runs all.")
+    run_parser.add_argument("--strategies", nargs="+",
+                            default=DEFAULT_STRATEGIES,
+                            help="Execution strategies to simulate.")
+    run_parser.add_argument("--commit", type=str, default=None,
+                            help="Store results under this key instead of "
+                            "the current git commit.")
+    run_parser.add_argument("stns", nargs="+",
+                            help="The STN JSON files or folders to run on")
+
+    compare_parser = subparsers.add_parser("compare",
+                                           help="Compare two stored runs")
+    compare_parser.add_argument("results", nargs="?", default=DEFAULT_RESULTS,
+                                help="Results file to read. Default is "
+                                "'{}'".format(DEFAULT_RESULTS))
+    compare_parser.add_argument("--base", type=str, default=None,
+                                help="Commit to compare against. Default is "
+                                "the second latest run.")
+    compare_parser.add_argument("--head", type=str, default=None,
+                                help="Commit to check. Default is the latest "
+                                "run.")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="Relative slowdown which counts as a "
+                                "regression. Default is 0.1")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+"""
+Serves one PSTN to an executive, while the plan is carried out.
+
+The plan is loaded and scheduled once. The executive then reports each
+event as it happens, over a local socket, and is sent back reschedule
+decisions and the events which can be dispatched next. See
+libheat/service.py for the JSON-lines protocol.
+
+Usage:
+
+    $ python3 dispatch_service.py --socket /tmp/dispatch.sock \
+        test_data/two_agent_sync.json
+    $ python3 dispatch_service.py --port 8750 -e arsi --ar-threshold 0.5 \
+        test_data/two_agent_sync.json
+"""
+
+import asyncio
+import argparse
+
+from libheat import lpbackend
+from libheat import propagation
+from libheat import strategies
+from libheat.service import DispatchSession, serve, DEFAULT_HOST
+from libheat.stntools import load_stn_from_json_file
+import libheat.printers as pr
+
+
+def main():
+    args = parse_args()
+    if args.verbose:
+        pr.set_verbosity(1)
+    lpbackend.set_backend(args.lp_backend)
+    propagation.set_backend(args.propagation)
+
+    stn = load_stn_from_json_file(args.stn)["stn"]
+    sim_options = {"ar_threshold": args.ar_threshold,
+                   "alp_threshold": args.si_threshold,
+                   "si_threshold": args.si_threshold}
+    session = DispatchSession(stn, args.execution, sim_options,
+                              warm_start=not args.cold_start)
+    if not session.consistent:
+        pr.warning("The plan is not consistent.")
+
+    def ready(address):
+        print("Serving {} on {}".format(args.stn, address), flush=True)
+
+    asyncio.run(serve(session, path=args.socket, host=args.host,
+                      port=args.port, ready=ready))
+
+
+def parse_args():
+    """Parse the program arguments."""
+    parser = argparse.ArgumentParser(description="Serve a PSTN to an "
+                                     "executive over a local socket.")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Turns on more printing")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--socket", type=str,
+                       help="Listen on this Unix socket")
+    where.add_argument("--port", type=int,
+                       help="Listen on this TCP port, of --host")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST,
+                        help="Host to listen on with --port. Default is "
+                        "{}".format(DEFAULT_HOST))
+    parser.add_argument("-e", "--execution", type=str, default="drea",
+                        choices=sorted(strategies.STRATEGIES),
+                        help="Execution strategy to reschedule with. Default"
+                        " is 'drea'")
+    parser.add_argument("--ar-threshold", type=float, default=0.0,
+                        help="AR Threshold to use for AR and ARSI")
+    parser.add_argument("--si-threshold", type=float, default=0.0,
+                        help="SI Threshold to use for SI, ALP and ARSI")
+    parser.add_argument("--cold-start", action="store_true",
+                        help="Search every alpha from scratch, rather than "
+                        "from the last guide's")
+    parser.add_argument("--lp-backend", type=str, default=None,
+                        choices=sorted(lpbackend.BACKENDS),
+                        help="LP solver used by SREA (default: {})."
+                        .format(lpbackend.DEFAULT_BACKEND))
+    parser.add_argument("--propagation", type=str,
+                        default=propagation.DEFAULT_BACKEND,
+                        choices=sorted(propagation.BACKENDS),
+                        help="How constraints are propagated.")
+    parser.add_argument("stn", help="The STN JSON file to serve")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""
+Generates synthetic PSTN instances, in the same JSON format as the files in
+problem_instances.
+
+By default, instances are written to a folder named
+STN_a{agents}_e{events}_s{seed}_t{sync_window}, so that the plotting code
+can still extract the synchrony window from the folder name.
+
+Example:
+
+    $ python3 generate_instances.py -a 10 -e 200 -n 5 --seed 1 -o big
+"""
+
+import os
+import json
+import argparse
+
+from libheat.stntools.stngenerator import generate_pstn, DISTRIBUTIONS
+
+
+def main():
+    args = parse_args()
+    if args.output is None:
+        out_dir = "STN_a{}_e{}_s{}_t{}".format(args.agents, args.events,
+                                              args.seed, args.sync_window)
+    else:
+        out_dir = args.output
+    os.makedirs(out_dir, exist_ok=True)
+
+    for k in range(args.count):
+        jsonstn = generate_pstn(agents=args.agents,
+                                events_per_agent=args.events,
+                                sync_density=args.sync_density,
+                                contingent_density=args.contingent_density,
+                                distributions=args.distributions,
+                                tightness=args.tightness,
+                                sync_window=args.sync_window,
+                                seed=args.seed + k)
+        path = os.path.join(out_dir, "original_{}.json".format(k))
+        with open(path, "w") as f:
+            json.dump(jsonstn, f)
+        print("Wrote {} ({} nodes, {} constraints)".format(
+            path, len(jsonstn["nodes"]), len(jsonstn["constraints"])))
+
+
+def parse_args():
+    """Parse the program arguments."""
+    parser = argparse.ArgumentParser(description="Generate consistent "
+                                     "synthetic PSTN instances.")
+    parser.add_argument("-a", "--agents", type=int, default=2,
+                        help="Number of agents. Default is 2.")
+    parser.add_argument("-e", "--events", type=int, default=10,
+                        help="Number of events per agent. Default is 10.")
+    parser.add_argument("-n", "--count", type=int, default=1,
+                        help="Number of instances to generate. Default is 1.")
+    parser.add_argument("--sync-density", type=float, default=0.2,
+                        help="Fraction of events with an outgoing interagent"
+                        " constraint. Default is 0.2.")
+    parser.add_argument("--contingent-density", type=float, default=0.3,
+                        help="Fraction of an agent's chain links which are "
+                        "contingent. Default is 0.3.")
+    parser.add_argument("--distributions", nargs="+",
+                        default=list(DISTRIBUTIONS), choices=DISTRIBUTIONS,
+                        help="Distribution families of contingent edges.")
+    parser.add_argument("--tightness", type=float, default=0.8,
+                        help="Ratio of the reference schedule length to the "
+                        "makespan, in (0, 1]. Default is 0.8.")
+    parser.add_argument("--sync-window", type=int, default=10000,
+                        help="Upper bound of interagent constraints in ms. "
+                        "Default is 10000.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed. Instance k uses seed + k. Default"
+                        " is 0.")
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="Folder to write the instances to.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
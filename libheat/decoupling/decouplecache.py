@@ -0,0 +1,165 @@
+"""Cache of agent decouplings, shared across Monte-Carlo samples.
+
+A decoupling only depends on the constraints of the starting STN, and not on
+the sampled durations of its contingent edges, so every sample of an
+instance can reuse the same one. Entries are keyed by a hash of the STN's
+constraints, the decoupling type, the fidelity, and the LP backend.
+
+The cache always lives in memory. Call ``set_cache_dir()`` to also persist
+entries on disk, so later runs over the same instances skip decoupling
+entirely.
+
+get_decoupling() returns copies of the cached sub-STNs, which callers are
+free to modify, unless asked for the shared ones, which must be left as
+they are (see stntools.overlay to change them without copying).
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+
+from .. import lpbackend
+from ..stntools.stnbinary import stn_to_arrays
+
+
+CACHE_VERSION = 2
+"""Bump this whenever the decoupling code changes its results."""
+MAX_MEMORY_ENTRIES = 128
+"""Number of decouplings kept in memory before the oldest are dropped."""
+
+_memory = {}
+"""Stores a dictionary of the form {key: (alpha, list of sub-STNs)}"""
+_cache_dir = None
+_lock = threading.Lock()
+
+
+def set_cache_dir(path):
+    """Persist decouplings in the folder at path. None turns this off."""
+    global _cache_dir
+    _cache_dir = path
+
+
+def get_cache_dir():
+    """Returns the folder decouplings are persisted in, or None."""
+    return _cache_dir
+
+
+def instance_key(stn, decouple_type, fidelity=None) -> str:
+    """Returns the cache key of a decoupling of stn.
+
+    Args:
+        stn (STN): STN being decoupled. Sampled times are ignored.
+        decouple_type (str): Name of the decoupling strategy.
+        fidelity (float, optional): Fidelity the decoupling is run with, if
+            the strategy has one.
+    """
+    digest = hashlib.sha1(json.dumps(stn_to_arrays(stn)).encode("utf-8"))
+    digest.update("v{}:{}:{!r}:{}:{!r}".format(
+        CACHE_VERSION, decouple_type, fidelity,
+        lpbackend.get_backend().name, lpbackend.is_chosen()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_decoupling(stn, decouple_type, fidelity, compute,
+                   shared=False) -> tuple:
+    """Return the decoupling of stn, computing it only on a cache miss.
+
+    Args:
+        stn (STN): STN being decoupled.
+        decouple_type (str): Name of the decoupling strategy.
+        fidelity (float): Fidelity of the strategy, or None.
+        compute (function): Takes no arguments, and returns a tuple of
+            (alpha, list of sub-STNs or None). Called on a cache miss.
+        shared (bool, optional): Return the cached sub-STNs themselves,
+            which must not be modified, rather than copies.
+
+    Returns:
+        A tuple of (alpha, sub-STNs), where the sub-STNs are fresh copies
+        unless shared, or None if decoupling failed.
+    """
+    key = instance_key(stn, decouple_type, fidelity)
+    with _lock:
+        entry = _memory.get(key)
+    if entry is None:
+        entry = _load(key)
+        if entry is None:
+            entry = compute()
+            _save(key, entry)
+        _remember(key, entry)
+    alpha, substns = entry
+    if substns is None:
+        return alpha, None
+    if shared:
+        return alpha, list(substns)
+    return alpha, [sub.copy() for sub in substns]
+
+
+def _remember(key, entry):
+    with _lock:
+        _memory[key] = entry
+        while len(_memory) > MAX_MEMORY_ENTRIES:
+            del _memory[next(iter(_memory))]
+
+
+def _path(key):
+    return os.path.join(_cache_dir, "{}.pickle".format(key))
+
+
+def _load(key):
+    """Read an entry from the cache folder, or return None."""
+    if _cache_dir is None:
+        return None
+    try:
+        with open(_path(key), "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
+def _save(key, entry):
+    """Atomically write an entry to the cache folder, if there is one.
+
+    Write failures are ignored; the entry is then only kept in memory.
+    """
+    if _cache_dir is None:
+        return
+    try:
+        os.makedirs(_cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, _path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+def clear():
+    """Forget every decoupling held in memory. Files on disk are kept."""
+    with _lock:
+        _memory.clear()
+
+
+def snapshot() -> dict:
+    """Returns a picklable copy of the in-memory cache.
+
+    Used to hand decouplings computed in a parent process to its workers,
+    which then merge() it in.
+    """
+    with _lock:
+        return dict(_memory)
+
+
+def merge(snap):
+    """Merge a snapshot() into this process's cache. None is ignored."""
+    if snap is None:
+        return
+    for key, entry in snap.items():
+        _remember(key, entry)
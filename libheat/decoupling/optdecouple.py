@@ -1,10 +1,19 @@
+import numpy as np
 import pulp
+from scipy import sparse
 
 
+from .. import lpbackend
 from ..stntools import STN
 from ..stntools.distempirical import invcdf_norm
 
 
+WEIGHT_CAP = 10.0**40
+"""Magnitude which edge weights are capped to inside the LPs."""
+DEBUG_LP_PATH = "/tmp/wilson_flex.lp"
+"""Where wilson_flex writes its LP when debugging."""
+
+
 def decouple_agents(stn: STN, fidelity=0.001):
     """Decouples agents optimally (maximising flexibility between agents)
 
@@ -50,6 +59,8 @@ def alpha_binary_search(stn: STN, fidelity=0.001):
     lower_bound = 0.0
     current_alpha = -1.0
     assignments = None
+    # Only the contingent bounds change between probes, so build the LP once.
+    lp = InteragentFlexLP(stn)
     while True:
         new_alpha = (upper_bound + lower_bound) / 2
         if abs(new_alpha - current_alpha) <= fidelity:
@@ -57,7 +68,7 @@ def alpha_binary_search(stn: STN, fidelity=0.001):
             break
         current_alpha = new_alpha
         # Check to see if the LP is feasible.
-        interflex, assign_test = maximize_interagent_flex(stn, current_alpha)
+        interflex, assign_test = lp.solve(current_alpha)
         if interflex is None:
             lower_bound = current_alpha
         else:
@@ -68,17 +79,22 @@ def alpha_binary_search(stn: STN, fidelity=0.001):
     return current_alpha, assignments
 
 
-def wilson_flex(stn: STN):
-    """ Calculate Wilson Flexibility Decoupling """
+def wilson_flex(stn: STN, debug=False):
+    """ Calculate Wilson Flexibility Decoupling
+
+    Args:
+        stn (STN): STN to decouple.
+        debug (bool, optional): Write the LP to DEBUG_LP_PATH before solving.
+    """
     prob, dual_events = _wilson_lp_setup(stn)
     diffs = [dual_events[(i, "+")] - dual_events[(i, "-")]
              for i in stn.verts.keys()]
     prob_sum = sum(diffs)
     prob += prob_sum, "Maximise the differences within dual constraints"
-    prob.writeLP("/tmp/wilson_flex.lp")
-    prob.solve()
+    if debug:
+        prob.writeLP(DEBUG_LP_PATH)
     # Check the status of the LP.
-    status = pulp.LpStatus[prob.status]
+    status = lpbackend.solve_pulp(prob)
     if status != "Optimal":
         return (None, None)
 
@@ -91,35 +107,122 @@ def maximize_interagent_flex(stn: STN, alpha: float):
     Create an LP problem to maximise interagent flexibility (the amount of
     time between interagent bounds)
 
+    To solve for several alphas, build an InteragentFlexLP once instead.
+
     Args:
         stn (STN): STN to use for identifying interagent synchronous
             constraints.
         alpha (float): Alpha to use for contingent bounds.
     """
-    prob, duals = _wilson_lp_setup(stn)
-    apply_contingent_bounds(stn, prob, duals, alpha)
-
-    synchrony_pairs = stn.interagent_edges.keys()
-    # Create a set of synchrony points.
-    synchrony_points = set()
-    for i, j in synchrony_pairs:
-        if i not in synchrony_points:
+    return InteragentFlexLP(stn).solve(alpha)
+
+
+class InteragentFlexLP(object):
+    """The LP of maximize_interagent_flex(), built once and solved for any
+    number of alphas.
+
+    This is the Wilson et al. LP (see _wilson_lp_setup) with the Lund et al.
+    contingent equalities, held as sparse matrices. Only the right hand side
+    of the contingent equalities depends on alpha, so solve() just rewrites
+    that vector and solves again, in-process with HiGHS unless another
+    lpbackend was chosen.
+
+    Variables are ordered [t_v+ for each vertex v] + [t_v- for each v].
+    """
+
+    def __init__(self, stn: STN):
+        self.stn = stn
+        self.vert_ids = list(stn.verts.keys())
+        n = len(self.vert_ids)
+        plus = {v: k for k, v in enumerate(self.vert_ids)}
+        minus = {v: k + n for k, v in enumerate(self.vert_ids)}
+
+        bounds = [(-float(stn.get_edge_weight(v, 0)),
+                   float(stn.get_edge_weight(0, v))) for v in self.vert_ids]
+
+        rows = []
+        cols = []
+        vals = []
+        b_ub = []
+
+        def add_row(entries, rhs):
+            row = len(b_ub)
+            for col, val in entries:
+                rows.append(row)
+                cols.append(col)
+                vals.append(val)
+            b_ub.append(rhs)
+
+        # t_v+ >= t_v-
+        for v in self.vert_ids:
+            add_row([(plus[v], -1.0), (minus[v], 1.0)], 0.0)
+        # Wilson et al. Theorem 1 LP line 2.
+        for i, j in stn.edges.keys():
+            add_row([(plus[j], 1.0), (minus[i], -1.0)],
+                    _capped(stn.get_edge_weight(i, j)))
+            add_row([(plus[i], 1.0), (minus[j], -1.0)],
+                    _capped(stn.get_edge_weight(j, i)))
+        A_ub = sparse.csr_matrix((vals, (rows, cols)),
+                                 shape=(len(b_ub), 2 * n))
+
+        # Lund et al. LP (3) and (4), one pair of rows per contingent edge.
+        self.contingent = list(stn.contingent_edges.items())
+        rows = []
+        cols = []
+        vals = []
+        for k, ((i, j), edge) in enumerate(self.contingent):
+            rows += [2 * k, 2 * k, 2 * k + 1, 2 * k + 1]
+            cols += [plus[j], plus[i], minus[i], minus[j]]
+            vals += [1.0, -1.0, 1.0, -1.0]
+        A_eq = sparse.csr_matrix((vals, (rows, cols)),
+                                 shape=(2 * len(self.contingent), 2 * n))
+
+        # Only maximise over the synchrony points.
+        synchrony_points = set()
+        for i, j in stn.interagent_edges.keys():
             synchrony_points.add(i)
-        if j not in synchrony_points:
             synchrony_points.add(j)
-    if synchrony_points == set():
-        print("No synchrony points")
-        return (None, None)
-    # We only want to sum up the synchrony points.
-    prob_sum = sum([duals[(i, "+")] - duals[(i, "-")]
-                    for i in synchrony_points])
-    # Set the optimisation function.
-    prob += prob_sum, "Maximise the flexibility of interagent constraints"
-    prob.solve()
-    if pulp.LpStatus[prob.status] == "Optimal":
-        assignments = _get_lp_assignments(prob)
-        return (pulp.value(prob.objective), assignments)
-    return (None, None)
+        self.synchrony_points = synchrony_points
+        c = np.zeros(2 * n)
+        for v in synchrony_points:
+            c[plus[v]] = 1.0
+            c[minus[v]] = -1.0
+
+        self.lp = lpbackend.LinearProgram(
+            c, A_ub=A_ub, b_ub=np.array(b_ub), A_eq=A_eq,
+            b_eq=np.zeros(2 * len(self.contingent)), bounds=bounds + bounds,
+            maximize=True)
+
+    def set_alpha(self, alpha: float):
+        """Rewrite the contingent equalities for the given alpha."""
+        b_eq = self.lp.b_eq
+        for k, (_, edge) in enumerate(self.contingent):
+            b_eq[2 * k] = invcdf_norm(1.0 - alpha * 0.5, edge.mu, edge.sigma)
+            b_eq[2 * k + 1] = -invcdf_norm(alpha * 0.5, edge.mu, edge.sigma)
+
+    def solve(self, alpha: float):
+        """Solve the LP for the given alpha.
+
+        Returns:
+            A tuple of (objective, assignments), where assignments is a dict
+            of the form {event id: [min time, max time]}. Both are None if
+            the LP is infeasible, or there are no interagent constraints.
+        """
+        if not self.synchrony_points:
+            print("No synchrony points")
+            return (None, None)
+        self.set_alpha(alpha)
+        result = lpbackend.solve(self.lp, default="highs")
+        if not result.optimal:
+            return (None, None)
+        n = len(self.vert_ids)
+        assignments = {v: [float(result.x[k + n]), float(result.x[k])]
+                       for k, v in enumerate(self.vert_ids)}
+        return (result.objective, assignments)
+
+
+def _capped(weight):
+    return max(min(weight, WEIGHT_CAP), -WEIGHT_CAP)
 
 
 def apply_contingent_bounds(stn: STN, prob, variables: dict, alpha: float):
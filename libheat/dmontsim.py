@@ -1,16 +1,76 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from .montsim import Simulator
 from .decoupling import optdecouple
 from .decoupling import sreadecouple
+from .decoupling import decouplecache
 from . import srea
+from .incremental import IncrementalChecker
+from .stntools.overlay import OverlaySTN
 from . import functiontimer
 from . import printers as pr
 
 
 Z_NODE_ID = 0
+OPT_FIDELITY = 0.005
+"""Fidelity of the alpha search used by "opt_inter" decoupling."""
+
+
+def decouple(stn, decouple_type="opt_inter", shared=False) -> tuple:
+    """Decouple the STN into one sub-STN per agent, through decouplecache.
+
+    Args:
+        stn (STN): STN to decouple.
+        decouple_type (str, optional): "opt_inter" or "srea".
+        shared (bool, optional): Return the cached sub-STNs, which must not
+            be modified, rather than copies.
+
+    Returns:
+        A tuple of (alpha, list of sub-STNs), where the list is None if the
+        STN could not be decoupled. Unless shared, the sub-STNs are the
+        caller's to modify.
+    """
+    if decouple_type == "opt_inter":
+        fidelity = OPT_FIDELITY
+
+        def compute():
+            return optdecouple.decouple_agents(stn, fidelity=fidelity)
+    elif decouple_type == "srea":
+        fidelity = None
+
+        def compute():
+            return sreadecouple.decouple_agents(stn)
+    else:
+        raise ValueError(("decouple_type {} not"
+                          + " found.").format(decouple_type))
+    return decouplecache.get_decoupling(stn, decouple_type, fidelity,
+                                        compute, shared=shared)
 
 
 class DecoupledSimulator(Simulator):
+    """Simulator which decouples the STN into one sub-STN per agent.
+
+    The sub-STNs are independent of each other once decoupled, so their
+    guides and propagation run concurrently, on a thread pool which lives
+    for one simulation. Most of a guide's time is spent in the LP solver,
+    which runs outside of Python.
+
+    Every STN a simulation changes is an overlay (see stntools.overlay) on
+    the starting STN or on the cached decoupling.
+
+    Args:
+        random_seed (int, optional): Seed for resampling contingent edges.
+        workers (int, optional): Threads used for the per-agent work. None
+            uses one per agent, up to the CPU count. 1 runs everything in
+            the calling thread.
+    """
+
+    def __init__(self, random_seed=None, workers=None):
+        super().__init__(random_seed)
+        self.workers = workers
 
+    @functiontimer.timed("simulate")
     def simulate(self, starting_stn, decouple_type="opt_inter",
                  sim_options={}) -> bool:
         """Run one simulation.
@@ -27,8 +87,8 @@ class DecoupledSimulator(Simulator):
         """
         # Initial setup
         self._current_time = 0.0
-        self.stn = starting_stn.copy()
-        self.assignment_stn = starting_stn.copy()
+        self.stn = OverlaySTN(starting_stn)
+        self.assignment_stn = OverlaySTN(starting_stn)
         self.num_reschedules = 0
         self.num_sent_schedules = 0
         # Resample the contingent edges.
@@ -41,6 +101,24 @@ class DecoupledSimulator(Simulator):
 
         if substns is None:
             pr.verbose("Failed to decouple, falling back to early exec.")
+            return self._run(substns, None)
+        workers = self.workers
+        if workers is None:
+            workers = min(len(substns), os.cpu_count() or 1)
+        if workers <= 1:
+            return self._run(substns, None)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return self._run(substns, pool)
+
+    def _run(self, substns, pool) -> bool:
+        """Main loop of simulate().
+
+        Args:
+            substns (list): The decoupled sub-STNs, or None when decoupling
+                failed.
+            pool (ThreadPoolExecutor): Pool to spread per-agent work across.
+                None runs it in this thread.
+        """
 
         # Setup options
         first_run = True
@@ -48,9 +126,12 @@ class DecoupledSimulator(Simulator):
                     "executed_contingent": False,
                     "executed_time": 0.0} for i in range(len(self.stn.agents))]
 
-        # Setup default guide settings
+        # Setup default guide settings. Until SREA finds a guide, the guide
+        # is self.stn itself, which the checker keeps propagated.
         guides = [self.stn] * len(self.stn.agents)
         current_alpha = 0.0
+        # Propagates each assignment into self.stn in place.
+        checker = IncrementalChecker(self.stn)
 
         # Loop until all timepoints assigned.
         while not self.all_assigned():
@@ -64,45 +145,52 @@ class DecoupledSimulator(Simulator):
 
             # Calculate the guide STN.
             pr.vverbose("Getting Guide...")
-            functiontimer.start("get_guide")
-            if substns is not None:
-                for i, sub in enumerate(substns):
-                    current_alpha, guide_stn = self.get_guide(
-                        sub,
-                        current_alpha,
-                        guides[i],
-                        options=options[i])
-                    guides[i] = guide_stn
-            else:
-                for i in range(len(self.stn.agents)):
-                    # Use early first as a fallback.
-                    guides[i] = self._early_first_guide()
-            functiontimer.stop("get_guide")
+            with functiontimer.span("get_guide"):
+                if substns is not None:
+                    results = self._map(
+                        pool,
+                        lambda i: self.get_guide(substns[i],
+                                                 current_alpha,
+                                                 guides[i],
+                                                 options=options[i]),
+                        range(len(substns)))
+                    # Agent threads only return their counts, and the
+                    # alpha is passed on as if the agents ran in turn: an
+                    # agent which keeps its guide keeps the alpha before it.
+                    for i, result in enumerate(results):
+                        alpha, guide_stn, reschedules, sent = result
+                        if guide_stn is not guides[i]:
+                            current_alpha = alpha
+                        guides[i] = guide_stn
+                        self.num_reschedules += reschedules
+                        self.num_sent_schedules += sent
+                else:
+                    for i in range(len(self.stn.agents)):
+                        # Use early first as a fallback.
+                        guides[i] = self._early_first_guide()
             pr.vverbose("Got guide")
 
             # Select the next timepoint.
             pr.vverbose("Selecting timepoint...")
-            functiontimer.start("selection")
-
-            # We do this weird new_selection switch so that we select the
-            # earliest timepoint from *all* of the guides, not just any one
-            # guide.
-            # The "selection" variable represents the earliest selection we
-            # make, which holds the id, the time, and whether it was
-            # contingent.
-            selection = None
-            for i, guide_stn in enumerate(guides):
-                new_selection = self.select_next_timepoint(guide_stn,
-                                                           self._current_time)
-                if selection is None:
-                    selection = new_selection
-                    continue
-                if selection[1] > new_selection[1]:
-                    selection = new_selection
-                options[i]["executed_contingent"] = selection[2]
-                options[i]["executed_time"] = selection[1]
-
-            functiontimer.stop("selection")
+            with functiontimer.span("selection"):
+                # We do this weird new_selection switch so that we select
+                # the earliest timepoint from *all* of the guides, not just
+                # any one guide.
+                # The "selection" variable represents the earliest selection
+                # we make, which holds the id, the time, and whether it was
+                # contingent.
+                selection = None
+                for i, guide_stn in enumerate(guides):
+                    new_selection = self.select_next_timepoint(
+                        guide_stn, self._current_time)
+                    if selection is None:
+                        selection = new_selection
+                        continue
+                    if selection[1] > new_selection[1]:
+                        selection = new_selection
+                    options[i]["executed_contingent"] = selection[2]
+                    options[i]["executed_time"] = selection[1]
+
             pr.vverbose("Selected timepoint, node_id of {}"
                         .format(selection[0]))
 
@@ -111,8 +199,10 @@ class DecoupledSimulator(Simulator):
             executed_contingent = selection[2]
 
             # Propagate constraints (minimise) and check consistency.
+            # The checker assigns the timepoint in self.stn itself.
             for guide_stn in guides:
-                if next_vert_id in guide_stn.verts:
+                if next_vert_id in guide_stn.verts \
+                        and guide_stn is not self.stn:
                     self.assign_timepoint(guide_stn, next_vert_id, next_time)
             if substns is not None:
                 for i, substn in enumerate(substns):
@@ -122,36 +212,36 @@ class DecoupledSimulator(Simulator):
                         #                                     next_time))
                         self.assign_timepoint(substn, next_vert_id, next_time)
                         #print("After assignment:\n{}".format(substn))
-            self.assign_timepoint(self.stn, next_vert_id, next_time)
             self.assign_timepoint(self.assignment_stn, next_vert_id, next_time)
-            functiontimer.start("propagation & check")
-            stn_copy = self.stn.copy()
-            consistent = self.propagate_constraints(stn_copy)
-            if not consistent:
-                pr.verbose("Assignments: " + str(self.get_assigned_times()))
-                pr.verbose("Failed to place point {}, at {}"
-                           .format(next_vert_id, next_time))
-                return False
-            self.stn = stn_copy
-            if substns is not None:
-                for i, sub in enumerate(substns):
-                    sub_copy = sub.copy()
-                    subcons = self.propagate_constraints(sub_copy)
-                    if subcons:
-                        sub = sub_copy
-                    else:
-                        # The substn is not consistent, but the whole STN is.
-                        # This means we do not want to follow the SREA guide
-                        # any further. A smart decision here would to now
-                        # ignore decoupling constraints, and try to solve the
-                        # STN locally. But this is too much effort for this
-                        # algorithm. Return failure prematurely instead, and
-                        # spit out a warning.
-                        pr.warning(
-                            "Whole STN was consistent, but substn was not.")
-                        return False
-                pr.vverbose("Done propagating our STN")
-                functiontimer.stop("propagation & check")
+            with functiontimer.span("propagation & check"):
+                consistent = checker.assign(next_vert_id, next_time)
+                if not consistent:
+                    checker.rollback()
+                    pr.verbose("Assignments: "
+                               + str(self.get_assigned_times()))
+                    pr.verbose("Failed to place point {}, at {}"
+                               .format(next_vert_id, next_time))
+                    return False
+                checker.commit()
+                if substns is not None:
+                    sub_consistent = self._map(
+                        pool,
+                        lambda sub: self.propagate_constraints(
+                            OverlaySTN(sub)),
+                        substns)
+                    for subcons in sub_consistent:
+                        if not subcons:
+                            # The substn is not consistent, but the whole STN
+                            # is. This means we do not want to follow the SREA
+                            # guide any further. A smart decision here would
+                            # to now ignore decoupling constraints, and try to
+                            # solve the STN locally. But this is too much
+                            # effort for this algorithm. Return failure
+                            # prematurely instead, and spit out a warning.
+                            pr.warning("Whole STN was consistent, but substn"
+                                       " was not.")
+                            return False
+                    pr.vverbose("Done propagating our STN")
 
             #print("Full STN:\n{}".format(self.stn))
             # for i, s in enumerate(substns):
@@ -172,6 +262,13 @@ class DecoupledSimulator(Simulator):
             return False
         return True
 
+    @staticmethod
+    def _map(pool, func, items) -> list:
+        """Apply func to every item, on the pool if there is one."""
+        if pool is None:
+            return [func(item) for item in items]
+        return list(pool.map(func, items))
+
     def assign_timepoint(self, stn, vert_id, time):
         """ Assigns a timepoint to specified time
 
@@ -192,7 +289,7 @@ class DecoupledSimulator(Simulator):
                 -time,
                 create=True,
                 force=True)
-        stn.get_vertex(vert_id).execute()
+        stn.execute(vert_id)
 
     def get_guide(self, stn, previous_alpha,
                   previous_guide, options={}) -> tuple:
@@ -209,6 +306,8 @@ class DecoupledSimulator(Simulator):
             Returns a tuple with format:
             | [0]: Alpha of the guide.
             | [1]: dispatch (type STN) which the simulator should follow,
+            | [2]: Number of reschedules made.
+            | [3]: Number of schedules sent.
         """
         return self._drea_algorithm(stn,
                                     previous_alpha,
@@ -219,8 +318,12 @@ class DecoupledSimulator(Simulator):
     def _srea_wrapper(self, stn, previous_alpha, previous_guide):
         """DecoupledSimulator's own SREA Wrapper. Note, we need to pass in the
             STN here.
+
+        Returns:
+            A tuple of (alpha, guide, sent), where sent is whether SREA found
+            a new guide. The caller counts them, as this runs on agent
+            threads.
         """
-        self.num_reschedules += 1
         try:
             result = srea.srea(stn)
         except Exception as e:
@@ -229,35 +332,39 @@ class DecoupledSimulator(Simulator):
             srea.srea(stn, debugLP=True)
             #raise AssertionError()
         if result is not None:
-            self.num_sent_schedules += 1
-            return result[0], result[1]
+            return result[0], result[1], True
         # Our guide was inconsistent... um. Well.
         # This is not great.
         # Follow the previous guide?
-        return previous_alpha, previous_guide
+        return previous_alpha, previous_guide, False
 
     def _drea_algorithm(self, stn, previous_alpha, previous_guide, first_run,
                         executed_contingent):
         """ Implements the DREA algorithm. """
         if first_run or executed_contingent:
-            ans = self._srea_wrapper(stn, previous_alpha, previous_guide)
-            pr.verbose("DREA Rescheduled, new alpha: {}".format(ans[0]))
-            return ans
-        return previous_alpha, previous_guide
+            alpha, guide, sent = self._srea_wrapper(stn, previous_alpha,
+                                                    previous_guide)
+            pr.verbose("DREA Rescheduled, new alpha: {}".format(alpha))
+            return alpha, guide, 1, int(sent)
+        return previous_alpha, previous_guide, 0, 0
 
     def _early_first_guide(self):
         return self.stn
 
     def _instantiate_subproblems(self, stn, decouple_type="opt_inter"):
-        """Returns a list of decoupled subproblems"""
-        if decouple_type == "opt_inter":
-            alpha, subproblems = optdecouple.decouple_agents(stn,
-                                                             fidelity=0.005)
-        elif decouple_type == "srea":
-            alpha, subproblems = sreadecouple.decouple_agents(stn)
-        else:
-            raise ValueError(("decouple_type {} not"
-                              + " found.").format(decouple_type))
+        """Returns a list of decoupled subproblems, as overlays on the
+        cached decoupling."""
+        alpha, shared = decouple(stn, decouple_type=decouple_type,
+                                 shared=True)
+        if shared is None:
+            return None
+        subproblems = [OverlaySTN(sub) for sub in shared]
+        # The decoupling may come from the cache, computed on another
+        # sample, so bring over this sample's contingent durations.
+        for sub in subproblems:
+            for key, edge in sub.contingent_edges.items():
+                sub.own_edge(edge)._sampled_time = \
+                    stn.contingent_edges[key].sampled_time()
         return subproblems
 
     def remaining_contingent_count(self, stn):
@@ -0,0 +1,373 @@
+"""Discrete-event simulation of dispatch by agents which talk over a network.
+
+Simulator.simulate() dispatches from one global view: every step picks the
+earliest timepoint across all agents, and a new guide is seen by every agent
+the moment it is made. EventSimulator instead runs each agent as an actor
+with its own view, driven by a priority queue of timestamped events:
+
+* Agents dispatch their own executable timepoints, from their own guide and
+  the executions they have heard about. Events whose predecessors have not
+  been heard of yet wait for the news.
+* Contingent timepoints happen when their sampled duration says so, and
+  their owner sees them at once.
+* Every execution is sent to every other agent, and arrives message_delay
+  later.
+* After a contingent timepoint, its owner decides whether to reschedule,
+  with the usual strategies, from what it knows. A new guide is ready once
+  SREA has finished, which takes the measured SREA runtime (in seconds)
+  times compute_scale, and reaches the other agents message_delay after
+  that.
+
+The first guide is made before execution starts, and every agent has it
+at time 0.
+
+With no message delay and a compute_time of 0, agents reschedule from the
+same propagated STN as Simulator. Runs can still differ where a guide
+orders a contingent timepoint after an executable one: Simulator holds the
+contingent timepoint back and dispatches the executable one first, even if
+it is later, while here the contingent timepoint happens at its sampled
+time.
+
+Only the agents' own timepoints and the news they hear are held per
+agent, so the memory and work of each step grow with the plan, not with
+the number of agents times the plan.
+
+Usage:
+
+    sim = EventSimulator(random_seed=1)
+    ok = sim.simulate(stn, "drea", sim_options={"message_delay": 50.0})
+    print(sim.makespan, sim.num_messages)
+"""
+
+import time
+import heapq
+
+from .montsim import Simulator, Z_NODE_ID, DEFAULT_COMPUTE_SCALE
+from .incremental import IncrementalChecker
+from .pruning import Pruner
+from . import strategies
+from . import functiontimer
+from . import printers as pr
+
+
+DEFAULT_MESSAGE_DELAY = 0.0
+"""Time for a message to reach another agent, in STN time units."""
+
+# Messages arriving at the same time as an execution are read first.
+_DELIVER = 0
+_EXECUTE = 1
+
+
+class _Guide(object):
+    """A guide STN, as sent between agents.
+
+    Attributes:
+        stn (STN): The guide.
+        alpha (float): Its alpha.
+        issued (float): Time the guide was made at.
+        incoming (dict): Stores a dictionary of the form
+            {vert id: [(predecessor id, minimum distance), ...]}
+    """
+
+    def __init__(self, stn, alpha, issued):
+        self.stn = stn
+        self.alpha = alpha
+        self.issued = issued
+        self.incoming = {}
+        for e in stn.get_all_edges():
+            self.incoming.setdefault(e.j, []).append((e.i,
+                                                      e.get_weight_min()))
+
+
+class _Agent(object):
+    """One agent's view of the simulation.
+
+    Attributes:
+        agent_id: Agent ID, as in the STN's vertices.
+        todo (set): IDs of the agent's executable timepoints which have not
+            been executed.
+        known (dict): Stores a dictionary of the form {vert id: time} of the
+            executions the agent has heard about.
+        guide (_Guide): The guide the agent follows.
+        planned (tuple): (vert id, time) of its next execution, or None.
+        version (int): Bumped whenever the plan changes, which cancels the
+            execution queued for the previous plan.
+        strategy (Strategy): The agent's own state of the execution
+            strategy, as each agent decides on its own when to reschedule.
+    """
+
+    def __init__(self, agent_id, todo, guide, strategy):
+        self.agent_id = agent_id
+        self.todo = todo
+        self.known = {Z_NODE_ID: 0.0}
+        self.guide = guide
+        self.planned = None
+        self.version = 0
+        self.strategy = strategy
+
+
+class EventSimulator(Simulator):
+    """Simulator where agents dispatch on their own, with message latency.
+
+    Takes the same execution strategies as Simulator. Besides the results
+    of simulate(), a simulation records:
+
+    Attributes:
+        makespan (float): Time of the last execution.
+        num_messages (int): Messages sent between agents, of executions and
+            of guides.
+    """
+
+    def __init__(self, random_seed=None):
+        super().__init__(random_seed)
+        self.makespan = 0.0
+        self.num_messages = 0
+        self._queue = []
+        self._seq = 0
+
+    @functiontimer.timed("simulate")
+    def simulate(self, starting_stn, execution_strat, sim_options=None):
+        """Run one simulation.
+
+        Args:
+            starting_stn (STN): The STN used to run in the simulation.
+            execution_strat (str): The strategy to use for timepoint
+                execution, as in Simulator.simulate().
+            sim_options (dict, optional): A dictionary of possible options to
+                pass into the simulator. Besides the thresholds, the keys
+                "message_delay" and "compute_scale" override
+                DEFAULT_MESSAGE_DELAY and DEFAULT_COMPUTE_SCALE, and
+                "compute_time" fixes the time each reschedule takes, rather
+                than measuring it.
+
+        Returns:
+            Boolean indicating whether the simulation was successful or not.
+        """
+        if sim_options is None:
+            sim_options = {}
+        self._current_time = 0.0
+        self.stn = starting_stn.copy()
+        self.assignment_stn = starting_stn.copy()
+        self.num_reschedules = 0
+        self.num_sent_schedules = 0
+        self.makespan = 0.0
+        self.num_messages = 0
+        self._queue = []
+        self._seq = 0
+        self._plan = starting_stn
+        strategy_class = strategies.get_strategy(execution_strat)
+        self._reschedules = strategy_class.reschedules
+        self._delay = sim_options.get("message_delay", DEFAULT_MESSAGE_DELAY)
+        self._compute_scale = sim_options.get("compute_scale",
+                                              DEFAULT_COMPUTE_SCALE)
+        self._compute_time = sim_options.get("compute_time")
+        self._thresholds = {k: sim_options[k] for k in ("si_threshold",
+                                                       "ar_threshold",
+                                                       "alp_threshold")
+                            if k in sim_options}
+        pr.verbose("Resampling Stored STN")
+        self.resample_stored_stn()
+
+        # The first guide is made offline, from the whole plan.
+        self.strategy = strategy_class(self)
+        self.propagate_constraints(self.stn)
+        options = dict(self._thresholds, first_run=True,
+                       executed_contingent=False, executed_time=0.0,
+                       guide_min=0.0, guide_max=0.0)
+        with functiontimer.span("get_guide"):
+            alpha, guide_stn = self.strategy.guide(0.0, self.stn.copy(),
+                                                   options)
+        first_guide = _Guide(guide_stn, alpha, 0.0)
+
+        self._agents = {}
+        for agent_id in self.stn.agents:
+            todo = {v.nodeID for v in self.stn.getAgentVerts(agent_id)
+                    if v.nodeID not in self.stn.parent}
+            agent = _Agent(agent_id, todo, first_guide,
+                           strategy_class(self))
+            self._agents[agent_id] = agent
+        self._remaining = len(self.assignment_stn.verts) - 1
+
+        # Stores a dictionary of the form
+        # {vert id: [(contingent child id, sampled duration), ...]}
+        self._children = {}
+        for (i, j), edge in self.stn.contingent_edges.items():
+            self._children.setdefault(i, []).append((j, edge.sampled_time()))
+        self._checker = IncrementalChecker(self.stn)
+        self._pruner = Pruner(self.stn)
+        if not self._execute(Z_NODE_ID, 0.0):
+            return False
+        for agent in self._agents.values():
+            self._replan(agent)
+
+        while self._queue and self._remaining > 0:
+            event_time, _, _, kind, payload = heapq.heappop(self._queue)
+            self._current_time = event_time
+            if kind == "observe":
+                agent, vert_id, when = payload
+                agent.known[vert_id] = when
+                self._replan(agent)
+            elif kind == "guide":
+                agent, guide = payload
+                if guide.issued >= agent.guide.issued:
+                    agent.guide = guide
+                    self._replan(agent)
+            elif kind == "execute":
+                agent, vert_id, version = payload
+                if agent is not None:
+                    if version != agent.version:
+                        continue
+                    agent.planned = None
+                    agent.todo.discard(vert_id)
+                if not self._execute(vert_id, event_time):
+                    return False
+                if agent is not None:
+                    self._replan(agent)
+
+        if self._remaining > 0:
+            pr.verbose("Dispatch stalled with {} timepoints left"
+                       .format(self._remaining))
+            return False
+        pr.verbose("Assignments: " + str(self.get_assigned_times()))
+        if not self.propagate_constraints(self.assignment_stn):
+            pr.warning("False positive: assigned all events, but was not a"
+                       " solution.")
+            return False
+        return True
+
+    def _push(self, at_time, priority, kind, payload):
+        """Queue an event."""
+        heapq.heappush(self._queue, (at_time, priority, self._seq, kind,
+                                     payload))
+        self._seq += 1
+
+    def _send(self, sender, at_time, kind, payload_for):
+        """Send a message from sender to every other agent.
+
+        Args:
+            sender: Agent ID of the sender, or None to send to every agent.
+            at_time (float): Time the message is sent.
+            kind (str): "observe" or "guide".
+            payload_for (function): Takes the receiving _Agent, and returns
+                the event payload.
+        """
+        for agent_id, agent in self._agents.items():
+            if agent_id == sender:
+                continue
+            self.num_messages += 1
+            self._push(at_time + self._delay, _DELIVER, kind,
+                       payload_for(agent))
+
+    def _execute(self, vert_id, at_time) -> bool:
+        """Execute a timepoint in the true STN, and tell the agents.
+
+        Returns:
+            Whether the STN is still consistent.
+        """
+        self._assign_timepoint(self.assignment_stn, vert_id, at_time)
+        with functiontimer.span("propagation & check"):
+            # Only contingent outcomes, or events outside their bounds,
+            # are checked in full.
+            if vert_id in self.assignment_stn.parent \
+                    or not self._checker.assign_in_bounds(vert_id, at_time):
+                consistent = self._checker.assign(vert_id, at_time)
+            else:
+                consistent = True
+        if not consistent:
+            self._checker.rollback()
+            pr.verbose("Assignments: " + str(self.get_assigned_times()))
+            pr.verbose("Failed to place point {}, at {}"
+                       .format(vert_id, at_time))
+            return False
+        self._checker.commit()
+        self._pruner.executed(vert_id)
+        self._pruner.prune()
+        if vert_id != Z_NODE_ID:
+            self._remaining -= 1
+            self.makespan = max(self.makespan, at_time)
+
+        owner_id = self.assignment_stn.get_vertex(vert_id).ownerID
+        owner = self._agents.get(owner_id)
+        if owner is None:
+            # The zero timepoint; everybody knows when it happens.
+            return True
+        owner.known[vert_id] = at_time
+        self._send(owner_id, at_time, "observe",
+                   lambda agent: (agent, vert_id, at_time))
+
+        # Contingent timepoints which start here happen on their own.
+        for child_id, duration in self._children.get(vert_id, []):
+            self._push(at_time + duration, _EXECUTE, "execute",
+                       (None, child_id, None))
+
+        if vert_id in self.assignment_stn.parent:
+            self._replan(owner)
+            if self._reschedules:
+                self._reschedule(owner, vert_id, at_time)
+        return True
+
+    def _replan(self, agent):
+        """Queue the agent's next execution from what it knows."""
+        guide = agent.guide
+        best = None
+        for vert_id in agent.todo:
+            preds = guide.incoming.get(vert_id, [])
+            if not all(i in agent.known for i, _ in preds):
+                continue
+            earliest = max([agent.known[i] + w for i, w in preds],
+                           default=0.0)
+            # Events can not be executed in the past.
+            choice = (max(earliest, self._current_time), vert_id)
+            if best is None or choice < best:
+                best = choice
+        planned = None if best is None else (best[1], best[0])
+        if planned == agent.planned:
+            return
+        agent.planned = planned
+        agent.version += 1
+        if planned is not None:
+            self._push(planned[1], _EXECUTE, "execute",
+                       (agent, planned[0], agent.version))
+
+    def _reschedule(self, agent, vert_id, at_time):
+        """Let the agent decide on a new guide after a contingent event.
+
+        The strategy runs on the agent's view of the plan: the original STN,
+        with the executions it knows of assigned and propagated, as
+        Simulator's STN is. If those are inconsistent, the failure shows in
+        the simulation, and the agent keeps its guide.
+        """
+        view = self._plan.copy()
+        for known_id, known_time in agent.known.items():
+            self._assign_timepoint(view, known_id, known_time)
+        if not self.propagate_constraints(view):
+            return
+        self.remove_old_timepoints(view)
+
+        guide = agent.guide
+        options = dict(self._thresholds, first_run=False,
+                       executed_contingent=True, executed_time=at_time,
+                       guide_min=-guide.stn.get_edge_weight(vert_id, 0),
+                       guide_max=guide.stn.get_edge_weight(0, vert_id))
+        # The strategies work on self.stn; point it at the agent's view.
+        true_stn = self.stn
+        self.stn = view
+        try:
+            with functiontimer.span("get_guide"):
+                start = time.perf_counter()
+                alpha, new_stn = agent.strategy.guide(guide.alpha, guide.stn,
+                                                      options)
+                runtime = time.perf_counter() - start
+        finally:
+            self.stn = true_stn
+        if new_stn is guide.stn:
+            return
+
+        if self._compute_time is not None:
+            ready = at_time + self._compute_time
+        else:
+            ready = at_time + runtime * self._compute_scale
+        new_guide = _Guide(new_stn, alpha, at_time)
+        self._push(ready, _DELIVER, "guide", (agent, new_guide))
+        self._send(agent.agent_id, ready, "guide",
+                   lambda other: (other, new_guide))
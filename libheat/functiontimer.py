@@ -1,38 +1,348 @@
-""" Tool for timing functions.
-Does not work if the function uses recursion.
+"""Tool for timing functions.
+
+Timings are recorded as nested spans. Every span is identified by its full
+call path (e.g. ``("simulate", "get_guide", "srea")``), so recursion and
+nesting are handled naturally: a span only ever measures the time between its
+own start and stop.
+
+By default, the timer is disabled, and every call in here is a no-op.
+Turn it on with ``set_enabled(True)``.
+
+Usage:
+
+    with functiontimer.span("selection"):
+        select_next_timepoint(...)
+
+    @functiontimer.timed("srea")
+    def srea(...):
+        ...
+
+Worker processes record into their own copy of this module. Call
+``pop_snapshot()`` in the worker and send the result back to the parent,
+which can then ``merge()`` it in.
 """
 
-import time
+import os
+import threading
+from time import perf_counter_ns
+
+
+_enabled = False
+"""Whether spans are recorded at all."""
+
+_stats = {}
+"""Stores a dictionary of the form {span path (tuple): SpanStats}"""
+_workers = set()
+"""Set of process ids which have contributed to _stats."""
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class SpanStats(object):
+    """Accumulated timing statistics for a single span path.
+
+    The histogram is stored as {bucket: count}, where a duration of ``d``
+    nanoseconds falls in bucket ``d.bit_length()``. That is, bucket ``b``
+    holds durations in the range [2^(b-1), 2^b) ns.
+    """
+
+    __slots__ = ("count", "total_ns", "child_ns", "max_ns", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.child_ns = 0
+        self.max_ns = 0
+        self.histogram = {}
+
+    def add(self, duration_ns, child_ns):
+        self.count += 1
+        self.total_ns += duration_ns
+        self.child_ns += child_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        bucket = duration_ns.bit_length()
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.child_ns += other.child_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+
+    @property
+    def self_ns(self):
+        """Time spent in this span, but not in any of its child spans."""
+        return self.total_ns - self.child_ns
+
+    def percentile_ns(self, q):
+        """Estimate the q-th percentile (0 <= q <= 1) from the histogram.
+
+        Returns the upper edge of the bucket holding the percentile, so the
+        estimate is within a factor of two of the true value.
+        """
+        if self.count == 0:
+            return 0
+        target = q * self.count
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= target:
+                return min(1 << bucket, self.max_ns)
+        return self.max_ns
+
+
+class _Frame(object):
+    __slots__ = ("path", "start_ns", "child_ns")
+
+    def __init__(self, path, start_ns):
+        self.path = path
+        self.start_ns = start_ns
+        self.child_ns = 0
+
+
+class _Span(object):
+    """Context manager returned by span()"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        start(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        stop(self.name)
+        return False
+
+
+class _NullSpan(object):
+    """Context manager returned by span() when the timer is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def set_enabled(val):
+    """Turns span recording on or off for this process"""
+    global _enabled
+    _enabled = bool(val)
+
+
+def is_enabled() -> bool:
+    """Gets whether span recording is on for this process"""
+    return _enabled
 
 
-func_start_times = {}
-func_total_times = {}
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
 
 
 def start(func):
     """ Start the timer for a function
+
     Args:
         func: String representing the name of the function.
     """
-    global func_start_times
-    func_start_times[func] = time.time()
+    if not _enabled:
+        return
+    stack = _stack()
+    if stack:
+        path = stack[-1].path + (func,)
+    else:
+        path = (func,)
+    stack.append(_Frame(path, perf_counter_ns()))
 
 
 def stop(func):
-    global func_start_times
-    global func_total_times
+    """ Stop the timer for a function.
+
+    Any spans opened after ``func`` which were never stopped are closed as
+    well.
+
+    Args:
+        func: String representing the name of the function.
+    """
+    if not _enabled:
+        return
+    end_ns = perf_counter_ns()
+    stack = _stack()
+    if not any(frame.path[-1] == func for frame in stack):
+        return
+    while stack:
+        frame = stack.pop()
+        duration = end_ns - frame.start_ns
+        if stack:
+            stack[-1].child_ns += duration
+        with _lock:
+            stats = _stats.get(frame.path)
+            if stats is None:
+                stats = _stats[frame.path] = SpanStats()
+            stats.add(duration, frame.child_ns)
+        if frame.path[-1] == func:
+            break
+
+
+def span(name):
+    """Returns a context manager which times its body under ``name``."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
 
-    time_passed = time.time() - func_start_times[func]
-    if func in func_total_times:
-        func_total_times[func] += time_passed
-    else:
-        func_total_times[func] = time_passed
 
+def timed(name=None):
+    """Decorator which times every call to the wrapped function.
 
-def clear(func):
-    global func_total_times
-    func_total_times[func] = 0.0
+    Args:
+        name (str, optional): Span name. Defaults to the function's name.
+    """
+    def decorator(fn):
+        span_name = name if name is not None else fn.__name__
+
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start(span_name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stop(span_name)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
+
+
+def clear(func=None):
+    """Clear the recorded statistics.
+
+    Args:
+        func (str, optional): Only clear spans with this name. Default clears
+            everything.
+    """
+    with _lock:
+        if func is None:
+            _stats.clear()
+            _workers.clear()
+            return
+        for path in [p for p in _stats if p[-1] == func]:
+            del _stats[path]
 
 
 def get_times():
-    return func_total_times
+    """Returns a dictionary of the form {span name: total seconds}.
+
+    Time is only counted once per name, so recursive spans are not counted
+    twice.
+    """
+    times = {}
+    for path, stats in _stats.items():
+        if path[-1] in path[:-1]:
+            continue
+        times[path[-1]] = times.get(path[-1], 0.0) + stats.total_ns * 1e-9
+    return times
+
+
+def snapshot() -> dict:
+    """Returns a picklable copy of the recorded statistics.
+
+    The snapshot is of the form
+    {"workers": [pid, ...], "spans": {path: (count, total_ns, child_ns,
+    max_ns, histogram)}}.
+    """
+    with _lock:
+        spans = {path: (s.count, s.total_ns, s.child_ns, s.max_ns,
+                        dict(s.histogram))
+                 for path, s in _stats.items()}
+        workers = set(_workers)
+    if spans:
+        workers.add(os.getpid())
+    return {"workers": sorted(workers), "spans": spans}
+
+
+def pop_snapshot() -> dict:
+    """Returns snapshot(), then clears the recorded statistics."""
+    snap = snapshot()
+    clear()
+    return snap
+
+
+def merge(snap):
+    """Merge a snapshot (usually from a worker process) into this process.
+
+    Args:
+        snap (dict): Snapshot returned by snapshot() or pop_snapshot(). None
+            is ignored.
+    """
+    if snap is None:
+        return
+    with _lock:
+        for path, (count, total_ns, child_ns, max_ns, hist) in \
+                snap["spans"].items():
+            other = SpanStats()
+            other.count = count
+            other.total_ns = total_ns
+            other.child_ns = child_ns
+            other.max_ns = max_ns
+            other.histogram = hist
+            if path in _stats:
+                _stats[path].merge(other)
+            else:
+                _stats[path] = other
+        _workers.update(snap["workers"])
+
+
+def write_folded(filepath):
+    """Write the recorded spans as folded stacks.
+
+    Each line is of the form ``outer;inner;leaf <self time in us>``, which is
+    the input format of flamegraph.pl, speedscope, and inferno.
+
+    Args:
+        filepath (str): File path to write to.
+    """
+    with open(filepath, "w") as f:
+        for path, stats in sorted(_stats.items()):
+            self_us = stats.self_ns // 1000
+            if self_us <= 0:
+                continue
+            f.write("{} {}\n".format(";".join(path), self_us))
+
+
+def summary_table() -> str:
+    """Returns a human readable table of every recorded span."""
+    header = "{:<48} {:>9} {:>11} {:>11} {:>10} {:>10} {:>10}".format(
+        "span", "calls", "total (ms)", "self (ms)", "mean (us)", "p95 (us)",
+        "max (us)")
+    lines = [header, "-" * len(header)]
+    for path, stats in sorted(_stats.items()):
+        label = "  " * (len(path) - 1) + path[-1]
+        lines.append("{:<48} {:>9} {:>11.3f} {:>11.3f} {:>10.1f} {:>10.1f}"
+                     " {:>10.1f}".format(
+                         label[:48],
+                         stats.count,
+                         stats.total_ns * 1e-6,
+                         stats.self_ns * 1e-6,
+                         stats.total_ns / stats.count * 1e-3,
+                         stats.percentile_ns(0.95) * 1e-3,
+                         stats.max_ns * 1e-3))
+    if _workers:
+        lines.append("Worker processes merged: {}".format(len(_workers)))
+    return "\n".join(lines)
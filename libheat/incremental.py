@@ -0,0 +1,390 @@
+"""Incremental consistency checking for STNs, with an undo log.
+
+The simulators tighten one constraint at a time: assigning an event fixes
+its edges to the zero timepoint. Rather than copying the STN and
+propagating it fully after each assignment, IncrementalChecker propagates
+only the new constraint, in place, and records every change it makes so
+that a failed step can be rolled back.
+
+Once the STN's edges are tight (each is the shortest path between its
+events), tightening the distance graph edge a => b to w changes an edge
+x => y only to d(x, a) + w + d(b, y), and makes the STN inconsistent
+exactly when w + d(b, a) < 0. So two single source searches, to a and from
+b, are enough. A potential function (see shortestpaths.potential) is kept
+along with the STN so that those searches can use Dijkstra's algorithm.
+
+Loosening an edge can not be propagated this way, so it falls back to full
+propagation with the selected backend, as does the first step, before the
+STN is known to be tight.
+
+Most steps need even less. Executing an event at a time within its bounds
+(its edges with the zero timepoint) can never make a tight STN
+inconsistent, so assign_in_bounds() does not check anything: it only
+tightens the bounds of the events the assignment affects, which is all the
+simulators read to select the next event. The other edges keep weights
+which are still valid constraints, but may no longer be tight. Later
+searches still find the true shortest paths through them, and the one step
+which needs every edge tight, loosening an event's bounds, tightens them
+all first.
+
+Usage:
+
+    checker = IncrementalChecker(stn)
+    if checker.assign(vert_id, time):
+        checker.commit()
+    else:
+        checker.rollback()
+"""
+
+import heapq
+
+from . import propagation
+from .stntools import shortestpaths
+
+
+Z_NODE_ID = 0
+
+_INF = float("inf")
+# Searches over reweighted edges are off in their last bits, as are
+# Johnson's distances; see shortestpaths.TOLERANCE.
+_TOLERANCE = shortestpaths.TOLERANCE
+
+
+class IncrementalChecker(object):
+    """Tightens an STN in place, one constraint at a time.
+
+    Attributes:
+        stn (STN): The STN being tightened.
+    """
+
+    def __init__(self, stn):
+        self.stn = stn
+        # None until the STN is known to be tight.
+        self._potential = None
+        self._log = []
+        # Stores a dictionary of the form {vert id: [incident edge, ...]},
+        # built when first needed. The checker is the only one to add edges
+        # to its STN; edges are looked up again as they are found, as they
+        # may since have been removed or copied (see STN.own_edge()).
+        self._incident = None
+        # Whether assign_in_bounds() left edges which may not be tight.
+        self._loose = False
+
+    @property
+    def is_tight(self) -> bool:
+        """Whether changes are currently propagated incrementally."""
+        return self._potential is not None
+
+    def assign(self, vert_id, time) -> bool:
+        """Execute a vertex at the given time, and propagate.
+
+        Fixes the edges between the vertex and the zero timepoint to the
+        time, overwriting their previous bounds, as
+        ``Simulator._assign_timepoint`` does.
+
+        Returns:
+            Whether the STN is still consistent.
+        """
+        if not self.stn.get_vertex(vert_id).is_executed():
+            self._log.append(("executed", vert_id))
+            self.stn.execute(vert_id)
+        if vert_id == Z_NODE_ID:
+            return True
+        if time > self.stn.get_edge_weight(Z_NODE_ID, vert_id) \
+                or -time > self.stn.get_edge_weight(vert_id, Z_NODE_ID):
+            # Outside the current bounds: one edge is loosened. Edges left
+            # loose by assign_in_bounds() may not hold the old bounds, so
+            # tighten them first.
+            if self._loose and not self.propagate():
+                return False
+            self._set_weight(Z_NODE_ID, vert_id, time)
+            self._set_weight(vert_id, Z_NODE_ID, -time)
+            return self.propagate()
+        return (self.tighten(Z_NODE_ID, vert_id, time)
+                and self.tighten(vert_id, Z_NODE_ID, -time))
+
+    def assign_in_bounds(self, vert_id, time) -> bool:
+        """Execute a vertex at a time within its current bounds, without
+        checking consistency.
+
+        Does what assign() would, except that of the other edges, only
+        those with the zero timepoint are tightened. Only the vertices
+        whose bounds change are searched: a path through any other vertex
+        can not tighten anything.
+
+        Needs every vertex to have an edge with the zero timepoint.
+
+        Returns:
+            Whether the vertex was assigned. If not, nothing was changed,
+            and assign() should be used instead.
+        """
+        if vert_id == Z_NODE_ID or not self.is_tight:
+            return False
+        upper = self.stn.get_edge_weight(Z_NODE_ID, vert_id)
+        lower = -self.stn.get_edge_weight(vert_id, Z_NODE_ID)
+        if not lower <= time <= upper or not self._bounded():
+            return False
+        if not self.stn.get_vertex(vert_id).is_executed():
+            self._log.append(("executed", vert_id))
+            self.stn.execute(vert_id)
+        self._log.append(("loose", self._loose))
+        self._loose = True
+        pot = self._potential
+        if time < upper:
+            # As tighten(Z_NODE_ID, vert_id, time).
+            from_vert = self._tighten_bounds(vert_id, time, reverse=False)
+            self._set_weight(Z_NODE_ID, vert_id, time)
+            self._lower_potential(pot[Z_NODE_ID] + time, from_vert)
+        if time > lower:
+            # As tighten(vert_id, Z_NODE_ID, -time). The distances from
+            # the zero timepoint are the upper bounds.
+            self._tighten_bounds(vert_id, -time, reverse=True)
+            self._set_weight(vert_id, Z_NODE_ID, -time)
+            from_zero = {Z_NODE_ID: 0.0}
+            for v in self.stn.verts:
+                if v != Z_NODE_ID:
+                    from_zero[v] = self.stn.get_edge_weight(Z_NODE_ID, v)
+            self._lower_potential(pot[vert_id] - time, from_zero)
+        return True
+
+    def tighten(self, i, j, w) -> bool:
+        """Add the constraint t_j - t_i <= w, and propagate it.
+
+        The edge between i and j is created if there is none.
+
+        Returns:
+            Whether the STN is still consistent. If not, the constraint is
+            not added.
+        """
+        if w >= self.stn.get_edge_weight(i, j):
+            return True
+        if not self.is_tight:
+            self._set_weight(i, j, w)
+            return self.propagate()
+
+        out, into = self._adjacency()
+        from_j = self._dijkstra(j, out, reverse=False)
+        if w + from_j.get(i, _INF) < 0:
+            return False
+        to_i = self._dijkstra(i, into, reverse=True)
+        self._set_weight(i, j, w)
+        for e in self.stn.edges.values():
+            if e.i == e.j:
+                continue
+            via = to_i.get(e.i, _INF) + w + from_j.get(e.j, _INF)
+            if via < e.Cij - _TOLERANCE:
+                e = self.stn.own_edge(e)
+                self._log.append(("weights", e, e.Cij, e.Cji))
+                e.Cij = via
+            via = to_i.get(e.j, _INF) + w + from_j.get(e.i, _INF)
+            if via < e.Cji - _TOLERANCE:
+                e = self.stn.own_edge(e)
+                self._log.append(("weights", e, e.Cij, e.Cji))
+                e.Cji = via
+        # Distances from the virtual source can only improve through i => j.
+        self._lower_potential(self._potential[i] + w, from_j)
+        return True
+
+    def propagate(self) -> bool:
+        """Fully propagate the STN with the selected propagation backend.
+
+        Returns:
+            Whether the STN is consistent.
+        """
+        self._log.append(("snapshot", [(e, e.Cij, e.Cji)
+                                       for e in self.stn.edges.values()]))
+        self._log.append(("tight", self._potential))
+        self._log.append(("loose", self._loose))
+        self._potential = None
+        if not propagation.tighten(self.stn):
+            return False
+        self._loose = False
+        self._potential = shortestpaths.potential(self.stn)
+        return self.is_tight
+
+    def commit(self):
+        """Keep every change since the last commit or rollback."""
+        self._log = []
+
+    def rollback(self):
+        """Undo every change since the last commit or rollback."""
+        while self._log:
+            entry = self._log.pop()
+            kind = entry[0]
+            if kind == "weights":
+                _, e, cij, cji = entry
+                e.Cij = cij
+                e.Cji = cji
+            elif kind == "snapshot":
+                # Edges the backend changed may have been replaced by the
+                # STN's own copies (see STN.own_edge()).
+                for e, cij, cji in entry[1]:
+                    e = self.stn.edges[(e.i, e.j)]
+                    if e.Cij != cij or e.Cji != cji:
+                        e = self.stn.own_edge(e)
+                        e.Cij = cij
+                        e.Cji = cji
+            elif kind == "potential":
+                self._potential[entry[1]] = entry[2]
+            elif kind == "tight":
+                self._potential = entry[1]
+            elif kind == "loose":
+                self._loose = entry[1]
+            elif kind == "created":
+                key = entry[1]
+                self._incident = None
+                del self.stn.edges[key]
+                self.stn.interagent_edges.pop(key, None)
+                self.stn.requirement_edges.pop(key, None)
+            elif kind == "executed":
+                self.stn.get_vertex(entry[1]).executed = False
+
+    def _set_weight(self, i, j, w):
+        """Overwrite the weight of the distance graph edge i => j."""
+        e = self.stn.get_edge(i, j)
+        if e is None:
+            self.stn.add_edge(i, j, -_INF, w)
+            self._log.append(("created", (i, j)))
+            self._incident = None
+            return
+        e = self.stn.own_edge(e)
+        self._log.append(("weights", e, e.Cij, e.Cji))
+        if e.i == i:
+            e.Cij = w
+        else:
+            e.Cji = w
+
+    def _lower_potential(self, base, distances):
+        """Lower the potential of each vertex v to base + distances[v]."""
+        for v, d in distances.items():
+            if base + d < self._potential[v]:
+                self._log.append(("potential", v, self._potential[v]))
+                self._potential[v] = base + d
+
+    def _bounded(self) -> bool:
+        """Whether every vertex has an edge with the zero timepoint."""
+        edges = self.stn.edges
+        return all((Z_NODE_ID, v) in edges or (v, Z_NODE_ID) in edges
+                   for v in self.stn.verts if v != Z_NODE_ID)
+
+    def _incident_edges(self) -> dict:
+        if self._incident is None:
+            self._incident = {}
+            for e in self.stn.edges.values():
+                self._incident.setdefault(e.i, []).append(e)
+                if e.j != e.i:
+                    self._incident.setdefault(e.j, []).append(e)
+        return self._incident
+
+    def _tighten_bounds(self, source, offset, reverse) -> dict:
+        """Tighten the edges from the zero timepoint to the vertices after
+        source (or, if reverse, to it from those before source), given a
+        new distance graph edge between them and source.
+
+        Forwards, the new edge is zero => source, of weight offset, and
+        tightens zero => v to offset + d(source, v). Reversed, it is
+        source => zero, and tightens v => zero to d(v, source) + offset.
+        Vertices whose edge is not tightened are not searched past, and
+        neither is the zero timepoint.
+
+        Returns:
+            A dict of the form {vertex id: distance}, from (or, if reverse,
+            to) source, for source and every vertex tightened.
+        """
+        pot = self._potential
+        edges = self.stn.edges
+        incident = self._incident_edges()
+        found = {}
+        done = set()
+        reduced = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            d, v = heapq.heappop(heap)
+            if v in done:
+                continue
+            done.add(v)
+            if reverse:
+                dist = d - pot[v] + pot[source]
+            else:
+                dist = d - pot[source] + pot[v]
+            if v != source:
+                if v == Z_NODE_ID:
+                    continue
+                if reverse:
+                    if offset + dist >= self.stn.get_edge_weight(
+                            v, Z_NODE_ID) - _TOLERANCE:
+                        continue
+                    self._set_weight(v, Z_NODE_ID, offset + dist)
+                else:
+                    if offset + dist >= self.stn.get_edge_weight(
+                            Z_NODE_ID, v) - _TOLERANCE:
+                        continue
+                    self._set_weight(Z_NODE_ID, v, offset + dist)
+            found[v] = dist
+            for e in incident.get(v, ()):
+                # Look the edge up again, as it may have been removed, or
+                # replaced by the STN's own copy.
+                e = edges.get((e.i, e.j))
+                if e is None or e.i == e.j:
+                    continue
+                # Forwards follow v => u, reversed u => v.
+                u = e.j if e.i == v else e.i
+                w = e.Cij if (e.i == v) != reverse else e.Cji
+                if w == _INF:
+                    continue
+                if reverse:
+                    cost = w + pot[u] - pot[v]
+                else:
+                    cost = w + pot[v] - pot[u]
+                # Rounding can leave a tight edge very slightly negative.
+                nd = d + max(cost, 0.0)
+                if nd < reduced.get(u, _INF):
+                    reduced[u] = nd
+                    heapq.heappush(heap, (nd, u))
+        return found
+
+    def _adjacency(self) -> tuple:
+        """Returns the outgoing and incoming distance graph edges, as dicts
+        of the form {vertex id: [(other vertex id, weight)]}."""
+        out = {}
+        into = {}
+        for e in self.stn.edges.values():
+            if e.i == e.j:
+                continue
+            for a, b, w in ((e.i, e.j, e.Cij), (e.j, e.i, e.Cji)):
+                if w == _INF:
+                    continue
+                out.setdefault(a, []).append((b, w))
+                into.setdefault(b, []).append((a, w))
+        return out, into
+
+    def _dijkstra(self, source, adjacency, reverse) -> dict:
+        """Shortest distances from (or, if reverse, to) source, over edges
+        reweighted by the potential.
+
+        Returns:
+            A dict of the form {vertex id: distance}, for every vertex
+            reachable.
+        """
+        pot = self._potential
+        reduced = {source: 0.0}
+        done = set()
+        heap = [(0.0, source)]
+        while heap:
+            d, v = heapq.heappop(heap)
+            if v in done:
+                continue
+            done.add(v)
+            for u, w in adjacency.get(v, ()):
+                if reverse:
+                    cost = w + pot[u] - pot[v]
+                else:
+                    cost = w + pot[v] - pot[u]
+                # Rounding can leave a tight edge very slightly negative.
+                nd = d + max(cost, 0.0)
+                if nd < reduced.get(u, _INF):
+                    reduced[u] = nd
+                    heapq.heappush(heap, (nd, u))
+        if reverse:
+            return {v: d - pot[v] + pot[source] for v, d in reduced.items()}
+        return {v: d - pot[source] + pot[v] for v, d in reduced.items()}
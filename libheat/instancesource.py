@@ -0,0 +1,190 @@
+"""Lazy sources of STN instances for simulation runs.
+
+Everything in here is a generator, so a run over a large folder tree or a
+large MIT file only ever holds the instance currently being simulated (plus
+the one being prefetched). Index ranges and path filters are applied before
+any file is parsed, so skipped instances cost next to nothing.
+
+Usage:
+
+    paths = iter_stn_paths(["problem_instances"])
+    for index, path, stn in prefetch(iter_instances(paths, start_index=10)):
+        with paused():
+            pool = multiprocessing.Pool()
+        ...
+"""
+
+import contextlib
+import os
+import queue
+import threading
+
+from .stntools import load_stn_from_json_file, mitparser
+from .stntools.stnbinary import CACHE_DIR
+import libheat.printers as pr
+
+
+def iter_stn_paths(folder_paths, recurse=True, only_json=True):
+    """Yields STN file paths found in a list of file and folder paths.
+
+    Paths are yielded in the same order as folder_harvest() lists them.
+
+    Args:
+        folder_paths (iterable): Strings that represent file/folder paths.
+        recurse (bool, optional): Whether to recurse into directories.
+        only_json (bool, optional): Only yield files ending in ".json".
+    """
+    for folder_path in folder_paths:
+        if os.path.isfile(folder_path):
+            # Folder was actually a stn file.
+            if _wanted(folder_path, only_json):
+                yield folder_path
+        elif os.path.isdir(folder_path):
+            for c in os.listdir(folder_path):
+                # Make sure to include the folder path
+                long_path = folder_path + "/" + c
+                if os.path.isfile(long_path):
+                    if _wanted(long_path, only_json):
+                        yield long_path
+                elif os.path.isdir(long_path):
+                    if recurse and c != CACHE_DIR:
+                        yield from iter_stn_paths([long_path], recurse=True,
+                                                  only_json=only_json)
+                else:
+                    # This should never happen, but maybe?
+                    pr.warning("STN path was not file or directory: " +
+                               folder_path)
+                    pr.warning("Skipping...")
+        else:
+            # This should never happen, but maybe?
+            pr.warning("STN path was not file or directory: " +
+                       folder_path)
+            pr.warning("Skipping...")
+
+
+def _wanted(path, only_json):
+    if not only_json:
+        return True
+    _, ext = os.path.splitext(path)
+    return ext == ".json"
+
+
+def iter_instances(stn_paths, mitparse=False, start_index=0, stop_index=None,
+                   path_filter=None, stn_cache=False):
+    """Yields (index, path, STN) for every selected instance, lazily.
+
+    Indices count every instance which passes the path filter, so they match
+    the positions instances would have in a fully loaded list. Instances
+    outside [start_index, stop_index) are never built, and no more files are
+    opened once stop_index is reached.
+
+    Args:
+        stn_paths (iterable): STN file paths, e.g. from iter_stn_paths().
+        mitparse (bool, optional): Parse files as MIT format. MIT files may
+            hold several instances each.
+        start_index (int, optional): Index of the first instance to yield.
+        stop_index (int, optional): Index to stop at, exclusively. None runs
+            to the end.
+        path_filter (function, optional): Takes a path and returns whether
+            its instances should be used. Applied before the file is read.
+        stn_cache (bool, optional): Use the binary cache when loading STN
+            JSON files.
+    """
+    index = 0
+    for path in stn_paths:
+        if stop_index is not None and index >= stop_index:
+            return
+        if path_filter is not None and not path_filter(path):
+            continue
+        if mitparse:
+            for name, arr in mitparser.iter_mit_instances(path):
+                if stop_index is not None and index >= stop_index:
+                    return
+                if index >= start_index:
+                    stn = mitparser.instance_to_stn(name, arr, add_z=True,
+                                                    connect_origin=True)
+                    yield index, path, stn
+                index += 1
+        else:
+            if index >= start_index:
+                stn = load_stn_from_json_file(path, cache=stn_cache)["stn"]
+                yield index, path, stn
+            index += 1
+
+
+_DONE = object()
+_producing = threading.Lock()
+"""Held by prefetch threads while they produce an item, and by paused()."""
+
+
+class _Raised(object):
+    """Wraps an exception raised by the producer thread."""
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def prefetch(iterable, depth=1):
+    """Yields the items of iterable, producing them on a background thread.
+
+    While the consumer works on one item, up to ``depth`` more are produced
+    ahead of time. Exceptions raised by the iterable are raised again in the
+    consumer, at the point the failing item would have been yielded.
+
+    Args:
+        iterable (iterable): Source of items, e.g. iter_instances().
+        depth (int, optional): Maximum number of items produced ahead.
+    """
+    items = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        # Give up if the consumer went away, rather than blocking forever.
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            while True:
+                with _producing:
+                    item = next(iterator, _DONE)
+                if item is _DONE:
+                    break
+                if not put(item):
+                    return
+        except BaseException as exc:
+            put(_Raised(exc))
+            return
+        put(_DONE)
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Raised):
+                raise item.exc
+            yield item
+    finally:
+        stopped.set()
+
+
+@contextlib.contextmanager
+def paused():
+    """Stops every prefetch thread from producing items inside the block.
+
+    Waits for items being produced to finish first, so no prefetch thread is
+    part way through (e.g.) parsing a file when the block starts. Fork
+    worker processes inside it: a forked child gets a copy of every lock in
+    whatever state it was in, but only the thread which forked.
+    """
+    with _producing:
+        yield
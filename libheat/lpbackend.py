@@ -0,0 +1,303 @@
+"""Pluggable linear program (LP) solvers.
+
+LPs are described by a LinearProgram, in the matrix form used by
+``scipy.optimize.linprog``, and solved by whichever backend is selected:
+
+* "pulp": PuLP's default solver (an external CBC process). The default.
+* "highs": scipy's HiGHS solver, run in-process on sparse matrices, which
+  saves writing and reading files for every solve. Falls back to "pulp"
+  when scipy is too old to have HiGHS.
+
+Solvers which were fast in-process before backends existed ask for
+"highs" as their default, which they keep unless a backend is chosen with
+set_backend().
+
+Code which still builds PuLP problems can call solve_pulp(), which solves
+them with the selected backend and writes the values back into the PuLP
+variables.
+
+Usage:
+
+    lpbackend.set_backend("highs")
+    result = lpbackend.solve(lp)
+"""
+
+import functools
+
+import numpy as np
+import pulp
+from scipy import sparse
+from scipy.optimize import linprog
+
+
+OPTIMAL = "Optimal"
+INFEASIBLE = "Infeasible"
+UNBOUNDED = "Unbounded"
+UNDEFINED = "Undefined"
+"""Result statuses, named as in pulp.LpStatus."""
+
+
+class LinearProgram(object):
+    """A minimisation (or maximisation) LP in matrix form.
+
+    Optimise ``c @ x`` subject to ``A_ub @ x <= b_ub``, ``A_eq @ x == b_eq``
+    and ``lo <= x <= hi`` for each (lo, hi) in bounds. None, or an infinite
+    bound, means unbounded.
+
+    Args:
+        c (array): Objective coefficients.
+        A_ub (sparse matrix, optional): Inequality constraint matrix.
+        b_ub (array, optional): Inequality right hand sides.
+        A_eq (sparse matrix, optional): Equality constraint matrix.
+        b_eq (array, optional): Equality right hand sides.
+        bounds (list, optional): (lo, hi) bounds of every variable. Default
+            is (0, None) for all of them, as in linprog.
+        maximize (bool, optional): Maximise the objective instead.
+    """
+
+    def __init__(self, c, A_ub=None, b_ub=None, A_eq=None, b_eq=None,
+                 bounds=None, maximize=False):
+        self.c = np.asarray(c, dtype=float)
+        self.A_ub = A_ub
+        self.b_ub = b_ub
+        self.A_eq = A_eq
+        self.b_eq = b_eq
+        if bounds is None:
+            bounds = [(0.0, None)] * len(self.c)
+        self.bounds = bounds
+        self.maximize = maximize
+
+
+class LPResult(object):
+    """Outcome of solving a LinearProgram.
+
+    Attributes:
+        status (str): One of OPTIMAL, INFEASIBLE, UNBOUNDED, UNDEFINED.
+        x (numpy.ndarray): Variable values, or None unless optimal.
+        objective (float): Objective value, or None unless optimal.
+    """
+
+    def __init__(self, status, x=None, objective=None):
+        self.status = status
+        self.x = x
+        self.objective = objective
+
+    @property
+    def optimal(self) -> bool:
+        return self.status == OPTIMAL
+
+
+class HighsBackend(object):
+    """Solves LPs in-process with scipy's HiGHS."""
+
+    name = "highs"
+
+    _STATUSES = {0: OPTIMAL, 2: INFEASIBLE, 3: UNBOUNDED}
+
+    def solve(self, lp) -> LPResult:
+        c = -lp.c if lp.maximize else lp.c
+        bounds = [(_finite_or_none(lo), _finite_or_none(hi))
+                  for lo, hi in lp.bounds]
+        has_ub = lp.A_ub is not None and lp.A_ub.shape[0] > 0
+        has_eq = lp.A_eq is not None and lp.A_eq.shape[0] > 0
+        result = linprog(c,
+                         A_ub=lp.A_ub if has_ub else None,
+                         b_ub=lp.b_ub if has_ub else None,
+                         A_eq=lp.A_eq if has_eq else None,
+                         b_eq=lp.b_eq if has_eq else None,
+                         bounds=bounds, method="highs")
+        status = self._STATUSES.get(result.status, UNDEFINED)
+        if status != OPTIMAL:
+            return LPResult(status)
+        objective = -result.fun if lp.maximize else result.fun
+        return LPResult(status, np.asarray(result.x), float(objective))
+
+
+class PulpBackend(object):
+    """Solves LPs with PuLP's default solver."""
+
+    name = "pulp"
+
+    def solve(self, lp) -> LPResult:
+        sense = pulp.LpMaximize if lp.maximize else pulp.LpMinimize
+        prob = pulp.LpProblem("LP", sense)
+        variables = [pulp.LpVariable("x_{}".format(k),
+                                     lowBound=_finite_or_none(lo),
+                                     upBound=_finite_or_none(hi))
+                     for k, (lo, hi) in enumerate(lp.bounds)]
+        prob += pulp.lpSum(coef * variables[k]
+                           for k, coef in enumerate(lp.c) if coef != 0)
+        for matrix, rhs, equality in ((lp.A_ub, lp.b_ub, False),
+                                      (lp.A_eq, lp.b_eq, True)):
+            if matrix is None:
+                continue
+            matrix = sparse.csr_matrix(matrix)
+            for row in range(matrix.shape[0]):
+                start, end = matrix.indptr[row], matrix.indptr[row + 1]
+                expr = pulp.lpSum(
+                    float(coef) * variables[k]
+                    for k, coef in zip(matrix.indices[start:end],
+                                       matrix.data[start:end]))
+                if equality:
+                    prob += expr == float(rhs[row])
+                else:
+                    prob += expr <= float(rhs[row])
+        solver = pulp.LpSolverDefault.copy()
+        solver.msg = False
+        prob.solve(solver)
+        status = pulp.LpStatus[prob.status]
+        if status != OPTIMAL:
+            return LPResult(status)
+        x = np.array([v.varValue or 0.0 for v in variables])
+        return LPResult(status, x, float(lp.c @ x))
+
+
+BACKENDS = {"highs": HighsBackend, "pulp": PulpBackend}
+"""Available backends, by name."""
+DEFAULT_BACKEND = "pulp"
+"""PuLP is kept as SREA's default solver. HiGHS may return a different one of
+several optimal solutions."""
+
+_backend = None
+_chosen = False
+
+
+def set_backend(name):
+    """Select the backend used by solve() and solve_pulp().
+
+    Args:
+        name (str): A key of BACKENDS. None selects the default, as if no
+            backend had been chosen.
+    """
+    global _backend, _chosen
+    _chosen = name is not None
+    if name is None:
+        name = DEFAULT_BACKEND
+    _backend = _make_backend(name)
+
+
+def is_chosen() -> bool:
+    """Whether the backend was chosen with set_backend(), rather than left
+    as the default."""
+    return _chosen
+
+
+def get_backend():
+    """Returns the selected backend object."""
+    if _backend is None:
+        set_backend(None)
+    return _backend
+
+
+def solve(lp, backend=None, default=None) -> LPResult:
+    """Solve a LinearProgram.
+
+    Args:
+        lp (LinearProgram): The LP to solve.
+        backend (str, optional): Backend name to use instead of the selected
+            one.
+        default (str, optional): Backend name to use instead of
+            DEFAULT_BACKEND, when none was chosen with set_backend().
+    """
+    if backend is None and default is not None and not _chosen:
+        backend = default
+    if backend is not None:
+        return _make_backend(backend).solve(lp)
+    return get_backend().solve(lp)
+
+
+def solve_pulp(prob) -> str:
+    """Solve a PuLP problem with the selected backend.
+
+    On success, the values are written back into the problem's variables,
+    so it can be read as if prob.solve() had been called.
+
+    Returns:
+        The status, named as in pulp.LpStatus (e.g. "Optimal").
+    """
+    backend = get_backend()
+    if isinstance(backend, PulpBackend):
+        prob.solve()
+        return pulp.LpStatus[prob.status]
+    lp, variables = from_pulp(prob)
+    result = backend.solve(lp)
+    if result.optimal:
+        for var, val in zip(variables, result.x):
+            var.varValue = float(val)
+    prob.status = {OPTIMAL: pulp.LpStatusOptimal,
+                   INFEASIBLE: pulp.LpStatusInfeasible,
+                   UNBOUNDED: pulp.LpStatusUnbounded}.get(
+                       result.status, pulp.LpStatusUndefined)
+    return result.status
+
+
+def from_pulp(prob) -> tuple:
+    """Convert a PuLP problem into a LinearProgram.
+
+    Returns:
+        A tuple of (LinearProgram, list of PuLP variables), where the list
+        gives the variable of each LP column.
+    """
+    variables = prob.variables()
+    column = {var.name: k for k, var in enumerate(variables)}
+    c = np.zeros(len(variables))
+    if prob.objective is not None:
+        for var, coef in prob.objective.items():
+            c[column[var.name]] = coef
+
+    constraints = prob.constraints
+    # Newer PuLP versions return the constraints from a call instead.
+    if callable(constraints):
+        constraints = constraints()
+    else:
+        constraints = constraints.values()
+    rows = {False: ([], [], [], []), True: ([], [], [], [])}
+    for constraint in constraints:
+        equality = constraint.sense == pulp.LpConstraintEQ
+        # PuLP stores "expression + constant <sense> 0". Flip >= into <=.
+        sign = -1.0 if constraint.sense == pulp.LpConstraintGE else 1.0
+        row_ids, col_ids, vals, rhs = rows[equality]
+        row = len(rhs)
+        for var, coef in constraint.items():
+            row_ids.append(row)
+            col_ids.append(column[var.name])
+            vals.append(sign * coef)
+        rhs.append(-sign * constraint.constant)
+
+    def matrix(equality):
+        row_ids, col_ids, vals, rhs = rows[equality]
+        if not rhs:
+            return None, None
+        return (sparse.csr_matrix((vals, (row_ids, col_ids)),
+                                  shape=(len(rhs), len(variables))),
+                np.array(rhs, dtype=float))
+
+    A_ub, b_ub = matrix(False)
+    A_eq, b_eq = matrix(True)
+    bounds = [(var.lowBound, var.upBound) for var in variables]
+    lp = LinearProgram(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq,
+                       bounds=bounds, maximize=prob.sense == pulp.LpMaximize)
+    return lp, variables
+
+
+def _make_backend(name):
+    if name not in BACKENDS:
+        raise ValueError("Unknown LP backend: {}".format(name))
+    if name == "highs" and not _has_highs():
+        return PulpBackend()
+    return BACKENDS[name]()
+
+
+def _finite_or_none(val):
+    if val is None or not np.isfinite(val):
+        return None
+    return float(val)
+
+
+@functools.lru_cache(maxsize=None)
+def _has_highs() -> bool:
+    try:
+        linprog([1.0], bounds=[(0, 1)], method="highs")
+    except ValueError:
+        return False
+    return True
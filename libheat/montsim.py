@@ -1,11 +1,20 @@
+import time
+
 import numpy as np
 
 from . import srea
+from . import strategies
+from . import propagation
+from .incremental import IncrementalChecker
+from .pruning import Pruner
+from .stntools.dispatchable import minimal_dispatchable
 from . import functiontimer
 from . import printers as pr
 
 
 Z_NODE_ID = 0
+DEFAULT_COMPUTE_SCALE = 1000.0
+"""STN time units per second of rescheduling. STN times are milliseconds."""
 
 
 class Simulator(object):
@@ -15,26 +24,32 @@ class Simulator(object):
         self.assignment_stn = None
         self._current_time = 0.0
 
-        self._ar_contingent_event_counter = 0
+        self.strategy = None
         self._rand_seed = random_seed
         self._rand_state = np.random.RandomState(random_seed)
         self.num_reschedules = 0
         self.num_sent_schedules = 0
+        self.num_stale_schedules = 0
 
+    @functiontimer.timed("simulate")
     def simulate(self, starting_stn, execution_strat, sim_options=None):
         """Run one simulation.
 
         Args:
             starting_stn (STN): The STN used to run in the simulation.
-            execution_strat (str): The strategy to use for timepoint execution.
-                Acceptable execution strategies include--
+            execution_strat (str): The strategy to use for timepoint execution,
+                one of strategies.STRATEGIES, such as--
                 "early",
                 "drea",
                 "drea-si",
                 "drea-ar",
                 "arsi"
             sim_options (dict, optional): A dictionary of possible options to
-                pass into the simulator.
+                pass into the simulator. Setting "compile_guides" to True
+                dispatches every new guide through its
+                minimal_dispatchable() form, which behaves the same.
+                Setting "async_reschedule" to True models the time
+                rescheduling takes, see _reschedule_later().
 
         Returns:
             Boolean indicating whether the simulation was successful or not.
@@ -43,10 +58,11 @@ class Simulator(object):
         self._current_time = 0.0
         self.stn = starting_stn.copy()
         self.assignment_stn = starting_stn.copy()
-        self._ar_contingent_event_counter = 0
-        self._ara_successfactor = 1.0
+        # Resolve the strategy once, with fresh state for this run.
+        self.strategy = strategies.get_strategy(execution_strat)(self)
         self.num_reschedules = 0
         self.num_sent_schedules = 0
+        self.num_stale_schedules = 0
         # Resample the contingent edges.
         # Super important!
         pr.verbose("Resampling Stored STN")
@@ -67,35 +83,81 @@ class Simulator(object):
                 options["ar_threshold"] = sim_options["ar_threshold"]
             if "alp_threshold" in sim_options:
                 options["alp_threshold"] = sim_options["alp_threshold"]
+            compile_guides = sim_options.get("compile_guides", False)
+            async_reschedule = sim_options.get("async_reschedule", False)
+            compute_scale = sim_options.get("compute_scale",
+                                            DEFAULT_COMPUTE_SCALE)
+            compute_time = sim_options.get("compute_time")
+        else:
+            compile_guides = False
+            async_reschedule = False
 
-        # Setup default guide settings
+        # Setup default guide settings. Until SREA finds a guide, the guide
+        # is self.stn itself, which the checker keeps propagated.
         guide_stn = self.stn
         current_alpha = 0.0
+        # Propagates each assignment into self.stn in place.
+        checker = IncrementalChecker(self.stn)
+        pruner = Pruner(self.stn)
+        # Guides still being computed, in the form
+        # [(time ready, events executed before, alpha, guide), ...], and
+        # every (vert id, time) executed, for checking them once ready.
+        pending = []
+        executed = []
+        guide_seen = 0
 
         # Loop until all timepoints assigned.
         while not self.all_assigned():
             options["first_run"] = first_run
-            if first_run:
-                first_run = False
 
             # Calculate the guide STN.
             pr.vverbose("Getting Guide...")
-            functiontimer.start("get_guide")
-            current_alpha, guide_stn = self.get_guide(execution_strat,
-                                                      current_alpha,
-                                                      guide_stn,
-                                                      options=options)
-            # print("GUIDE")
-            # print(guide_stn)
-            functiontimer.stop("get_guide")
+            with functiontimer.span("get_guide"):
+                previous_guide = guide_stn
+                start = time.perf_counter()
+                new_alpha, new_guide = self.strategy.guide(current_alpha,
+                                                           guide_stn,
+                                                           options)
+                runtime = time.perf_counter() - start
+                # Dispatch new guides through fewer edges. The early
+                # strategy's guide is the simulation STN itself, so leave it.
+                if compile_guides and new_guide is not previous_guide \
+                        and new_guide is not self.stn:
+                    new_guide = minimal_dispatchable(new_guide)
+                if async_reschedule and not first_run \
+                        and new_guide is not previous_guide \
+                        and new_guide is not self.stn:
+                    if compute_time is None:
+                        latency = runtime * compute_scale
+                    else:
+                        latency = compute_time
+                    self._reschedule_later(pending, len(executed), latency,
+                                           new_alpha, new_guide)
+                else:
+                    current_alpha, guide_stn = new_alpha, new_guide
             pr.vverbose("Got guide")
+            first_run = False
 
             # Select the next timepoint.
             pr.vverbose("Selecting timepoint...")
-            functiontimer.start("selection")
-            selection = self.select_next_timepoint(guide_stn,
-                                                   self._current_time)
-            functiontimer.stop("selection")
+            with functiontimer.span("selection"):
+                selection = self.select_next_timepoint(guide_stn,
+                                                       self._current_time)
+                # Switch to any guide which is ready before then, and select
+                # again from it.
+                while pending and pending[0][0] <= selection[1]:
+                    ready = self._ready_guide(pending, executed,
+                                              selection[1], guide_seen)
+                    if ready is None:
+                        continue
+                    current_alpha, guide_stn, ready_time, guide_seen = ready
+                    selection = self.select_next_timepoint(
+                        guide_stn, self._current_time)
+                    if not selection[2] \
+                            and selection[1] < ready_time \
+                            and ready_time > self._current_time:
+                        # The guide came too late to execute this earlier.
+                        selection = (selection[0], ready_time, False)
             pr.vverbose("Selected timepoint, node_id of {}"
                         .format(selection[0]))
 
@@ -109,24 +171,34 @@ class Simulator(object):
             options["guide_min"] = -guide_stn.get_edge_weight(next_vert_id, 0)
 
             # Propagate constraints (minimise) and check consistency.
-            self._assign_timepoint(guide_stn, next_vert_id, next_time)
-            self._assign_timepoint(self.stn, next_vert_id, next_time)
+            # The checker assigns the timepoint in self.stn itself.
+            if guide_stn is not self.stn:
+                self._assign_timepoint(guide_stn, next_vert_id, next_time)
             self._assign_timepoint(
                 self.assignment_stn, next_vert_id, next_time)
-            functiontimer.start("propagation & check")
-            stn_copy = self.stn.copy()
-            consistent = self.propagate_constraints(stn_copy)
+            with functiontimer.span("propagation & check"):
+                # Executable timepoints within their bounds can not fail,
+                # and only need the bounds tightened. Contingent outcomes
+                # are checked in full.
+                if executed_contingent or not checker.assign_in_bounds(
+                        next_vert_id, next_time):
+                    consistent = checker.assign(next_vert_id, next_time)
+                else:
+                    consistent = True
             if not consistent:
+                checker.rollback()
                 pr.verbose("Assignments: " + str(self.get_assigned_times()))
                 pr.verbose("Failed to place point {}, at {}"
                            .format(next_vert_id, next_time))
                 return False
-            self.stn = stn_copy
+            checker.commit()
             pr.vverbose("Done propagating our STN")
-            functiontimer.stop("propagation & check")
+            if async_reschedule:
+                executed.append((next_vert_id, next_time))
 
             # Clean up the STN
-            self.remove_old_timepoints(self.stn)
+            pruner.executed(next_vert_id)
+            pruner.prune()
 
             self._current_time = next_time
         pr.verbose("Assignments: " + str(self.get_assigned_times()))
@@ -134,6 +206,79 @@ class Simulator(object):
         assert (self.propagate_constraints(self.assignment_stn))
         return True
 
+    def _reschedule_later(self, pending, seen, latency, alpha, guide):
+        """Hold back a new guide until rescheduling would have finished.
+
+        With "async_reschedule", rescheduling runs alongside dispatch, as it
+        would on a real executive: the guide is made from the STN as it is
+        now, but only ready latency later. Until then, events keep being
+        dispatched from the current guide. latency is the measured runtime
+        of the strategy, times "compute_scale", unless "compute_time" fixes
+        it.
+
+        Args:
+            pending (list): Guides still being computed, see simulate().
+            seen (int): Number of events executed so far.
+            latency (float): Time until the guide is ready.
+            alpha (float): Alpha of the guide.
+            guide (STN): The guide.
+        """
+        pending.append((self._current_time + latency, seen, alpha, guide))
+        pending.sort(key=lambda entry: entry[0])
+
+    def _ready_guide(self, pending, executed, until, current_seen):
+        """Take the guides which are ready by a time off the pending list.
+
+        A guide which assumed some event's time, and saw that event executed
+        at another time while it was being computed, is stale and dropped,
+        as is a guide made before the one being followed.
+
+        Args:
+            pending (list): Guides still being computed, see simulate().
+            executed (list): (vert id, time) of every event executed.
+            until (float): Time to take the guides ready by.
+            current_seen (int): Number of events executed before the guide
+                being followed was made.
+
+        Returns:
+            (alpha, guide, time ready, events executed before it was made)
+            of the newest usable guide, with the events executed since it
+            was made assigned in it, or None.
+        """
+        newest = None
+        while pending and pending[0][0] <= until:
+            ready_time, seen, alpha, guide = pending.pop(0)
+            if seen < current_seen \
+                    or (newest is not None and seen < newest[0]):
+                self.num_stale_schedules += 1
+                continue
+            if not self._guide_matches(guide, executed[seen:]):
+                pr.verbose("Dropped a stale guide, ready at {}"
+                           .format(ready_time))
+                self.num_stale_schedules += 1
+                continue
+            if newest is not None:
+                self.num_stale_schedules += 1
+            newest = (seen, alpha, guide, ready_time)
+        if newest is None:
+            return None
+        seen, alpha, guide, ready_time = newest
+        for vert_id, when in executed[seen:]:
+            if vert_id in guide.verts:
+                self._assign_timepoint(guide, vert_id, when)
+        return alpha, guide, ready_time, seen
+
+    @staticmethod
+    def _guide_matches(guide, executions) -> bool:
+        """Whether each (vert id, time) execution is within the guide."""
+        for vert_id, when in executions:
+            if vert_id not in guide.verts:
+                continue
+            if not (-guide.get_edge_weight(vert_id, Z_NODE_ID) <= when
+                    <= guide.get_edge_weight(Z_NODE_ID, vert_id)):
+                return False
+        return True
+
     def select_next_timepoint(self, dispatch, current_time):
         """Retrieves the earliest possible vert.
 
@@ -152,23 +297,29 @@ class Simulator(object):
         earliest_so_far_time = float("inf")
         has_incoming_contingent = False
 
-        # This could be sped up. We only want unexecuted verts without parents.
+        # Index the incoming edges once, rather than scanning every edge
+        # for every vert.
+        incoming = {}
+        for e in dispatch.get_all_edges():
+            incoming.setdefault(e.j, []).append(e)
+
         for i, vert in dispatch.verts.items():
             # Don't recheck already executed verts
             if vert.is_executed():
                 continue
             # Check if all predecessors are executed -> enabled.
-            predecessor_ids = [e.i for e in dispatch.get_incoming(i)]
-            predecessors = [dispatch.get_vertex(q) for q in predecessor_ids]
-            is_enabled = all([p.is_executed() for p in predecessors])
+            incoming_reqs = incoming.get(i, [])
+            is_enabled = all([dispatch.get_vertex(e.i).is_executed()
+                              for e in incoming_reqs])
             # Exit early if not enabled.
             if not is_enabled:
                 continue
-            incoming_contingent = dispatch.get_incoming_contingent(i)
+            incoming_contingent = None
+            if i in dispatch.parent:
+                incoming_contingent = dispatch.get_incoming_contingent(i)
             if incoming_contingent is None:
                 # Get the
                 # Make sure that we can't go back in time though.
-                incoming_reqs = dispatch.get_incoming(i)
                 if incoming_reqs == []:
                     # No incoming edges at all, this will be our start.
                     earliest_time = 0.0
@@ -228,15 +379,19 @@ class Simulator(object):
                             -time,
                             create=True,
                             force=True)
-        stn.get_vertex(vert_id).execute()
+        stn.execute(vert_id)
 
     def propagate_constraints(self, stn_to_prop):
         """ Updates current constraints and minimises
+
+        Tightens the existing edges to their shortest paths, as
+        floyd_warshall() does, with the selected propagation backend.
+
+        Returns:
+            Whether the STN is consistent.
         """
-        functiontimer.start("propogate_constraints")
-        ans = stn_to_prop.floyd_warshall()
-        functiontimer.stop("propogate_constraints")
-        return ans
+        with functiontimer.span("propagate_constraints"):
+            return propagation.tighten(stn_to_prop)
 
     def all_assigned(self) -> bool:
         """ Check if all vertices of the STN have been executed.
@@ -254,19 +409,20 @@ class Simulator(object):
         """ Remove timepoints which add no new information, as they exist
         entirely in the past, and have no lingering constraints that are not
         already captured.
+
+        Looks at every timepoint; see pruning.Pruner to remove them as
+        execution goes on.
         """
-        stored_keys = list(stn.verts.keys())
-        for v_id in stored_keys:
-            if v_id == 0:
-                continue
-            if (stn.outgoing_executed(v_id) and
-                    stn.get_vertex(v_id).is_executed()):
-                stn.remove_vertex(v_id)
+        waiting = {i for i, j in stn.edges
+                   if i != j and not stn.verts[j].is_executed()}
+        stn.remove_vertices([v for v, vert in stn.verts.items()
+                             if v != Z_NODE_ID and vert.is_executed()
+                             and v not in waiting])
 
     def resample_stored_stn(self) -> None:
         """Resample the stored STN contingent edges (self.stn)"""
         for e in self.stn.contingent_edges.values():
-            e.resample(self._rand_state)
+            self.stn.own_edge(e).resample(self._rand_state)
 
     def get_assigned_times(self) -> dict:
         """Return when each timepoint in the simulation was assigned"""
@@ -282,6 +438,9 @@ class Simulator(object):
                   previous_guide, options={}) -> tuple:
         """ Retrieve a guide STN (dispatch) based on the execution strategy
 
+        Uses the simulation's strategy (see strategies), made afresh if
+        execution_strat is not the strategy the simulation already has.
+
         Args:
             execution_strat (str): String representing the execution strategy.
             previous_alpha (float): The previously used guide STN's alpha.
@@ -294,87 +453,21 @@ class Simulator(object):
             | [0]: Alpha of the guide.
             | [1]: dispatch (type STN) which the simulator should follow,
         """
-        if execution_strat == "early":
-            return 1.0, self.stn
-        elif execution_strat == "srea":
-            return self._srea_algorithm(previous_alpha,
-                                        previous_guide,
-                                        options["first_run"])
-        elif execution_strat == "drea":
-            return self._drea_algorithm(previous_alpha,
-                                        previous_guide,
-                                        options["first_run"],
-                                        options["executed_contingent"])
-        elif execution_strat == "drea-s":
-            return self._drea_s_algorithm(previous_alpha,
-                                          previous_guide,
-                                          options["first_run"],
-                                          options["executed_contingent"],
-                                          options["executed_time"],
-                                          options["guide_min"],
-                                          options["guide_max"])
-        elif execution_strat == "drea-si":
-            return self._drea_si_algorithm(previous_alpha,
-                                           previous_guide,
-                                           options["first_run"],
-                                           options["executed_contingent"],
-                                           options["si_threshold"])
-        elif execution_strat == "drea-alp":
-            return self._drea_alp_algorithm(previous_alpha,
-                                            previous_guide,
-                                            options["first_run"],
-                                            options["executed_contingent"],
-                                            options["alp_threshold"])
-        elif execution_strat == "drea-ar":
-            if options["executed_contingent"]:
-                self._ar_contingent_event_counter += 1
-            ans = self._drea_ar_algorithm(previous_alpha,
-                                          previous_guide,
-                                          options["first_run"],
-                                          options["executed_contingent"],
-                                          options["ar_threshold"],
-                                          self._ar_contingent_event_counter)
-            self._ar_contingent_event_counter = ans[2]
-            return ans[0], ans[1]
-        elif execution_strat == "drea-ara":
-            if not options["executed_contingent"] and not options["first_run"]:
-                return previous_alpha, previous_guide
-            in_bounds = (options["guide_min"] <= options["executed_time"]
-                         <= options["guide_max"])
-            pr.verbose("In bounds?: {}".format(in_bounds))
-            pr.verbose("{}, {}, {}".format(options["guide_min"],
-                                           options["executed_time"],
-                                           options["guide_max"]))
-            ans = self._drea_ara_algorithm(previous_alpha,
-                                           previous_guide,
-                                           options["first_run"],
-                                           options["ar_threshold"],
-                                           self._ara_successfactor,
-                                           in_bounds)
-            self._ara_successfactor = ans[2]
-            return ans[0], ans[1]
-        elif execution_strat == "arsi":
-            if options["executed_contingent"]:
-                self._ar_contingent_event_counter += 1
-            ans = self._arsi_algorithm(previous_alpha,
-                                       previous_guide,
-                                       options["first_run"],
-                                       options["executed_contingent"],
-                                       self._ar_contingent_event_counter,
-                                       ar_threshold=options["ar_threshold"],
-                                       si_threshold=options["si_threshold"])
-            self._ar_contingent_event_counter = ans[2]
-            return ans[0], ans[1]
-        else:
-            raise ValueError(("Execution strategy '{}'"
-                              " unknown").format(execution_strat))
+        if self.strategy is None or self.strategy.name != execution_strat:
+            self.strategy = strategies.get_strategy(execution_strat)(self)
+        return self.strategy.guide(previous_alpha, previous_guide, options)
+
+    def _run_srea(self):
+        """Run SREA on self.stn, for every strategy. Returns srea.srea()'s
+        result."""
+        return srea.srea(self.stn)
 
     def _srea_wrapper(self, previous_alpha, previous_guide):
         """ Small wrapper to run SREA or keep the same guide if it's not
             consistent.
         """
         self.num_reschedules += 1
-        result = srea.srea(self.stn)
+        result = self._run_srea()
         if result is not None:
             self.num_sent_schedules += 1
             return result[0], result[1]
@@ -383,251 +476,6 @@ class Simulator(object):
         # Follow the previous guide?
         return previous_alpha, previous_guide
 
-    def _srea_algorithm(self, previous_alpha, previous_guide, first_run):
-        """ Implements the SREA algorithm. """
-        if first_run:
-            return self._srea_wrapper(previous_alpha, previous_guide)
-        # Not our first run, use the previous guide.
-        return previous_alpha, previous_guide
-
-    def _drea_algorithm(self, previous_alpha, previous_guide, first_run,
-                        executed_contingent):
-        """ Implements the DREA algorithm. """
-        if first_run or executed_contingent:
-            ans = self._srea_wrapper(previous_alpha, previous_guide)
-            pr.verbose("DREA Rescheduled, new alpha: {}".format(ans[0]))
-            return ans
-        return previous_alpha, previous_guide
-
-    def _drea_s_algorithm(self, previous_alpha, previous_guide, first_run,
-                          executed_contingent, next_time, min_time, max_time):
-        """ Implements the SREA-S algorithm. """
-        if first_run:
-            return self._srea_wrapper(previous_alpha, previous_guide)
-        if executed_contingent:
-            if (not (min_time <= next_time <= max_time)):
-                pr.verbose("Rescheduling! t={}, not in [{}, {}]"
-                           .format(next_time, min_time, max_time))
-                # We need to reschedule now.
-                return self._srea_wrapper(previous_alpha, previous_guide)
-            pr.verbose("Did not reschedule, t={} in [{}, {}]"
-                       .format(next_time, min_time, max_time))
-        return previous_alpha, previous_guide
-
-    def _drea_si_algorithm(self, previous_alpha, previous_guide, first_run,
-                           executed_contingent, threshold):
-        """ Implements the DREA-SI algorithm. """
-        # Exit early if the STN was not consistent at all.
-
-        if first_run:
-            result = srea.srea(self.stn)
-            self.num_reschedules += 1
-            self.num_sent_schedules += 1
-            if result is None:
-                return previous_alpha, previous_guide
-            new_alpha = result[0]
-            maybe_guide = result[1]
-            pr.verbose("Got new drea-si guide with alpha={}".format(new_alpha))
-            return new_alpha, maybe_guide
-        # We should only run this algorithm *if* we recently executed
-        # a receieved/contingent timepoint.
-        if not executed_contingent:
-            return previous_alpha, previous_guide
-        # Reschedule
-        result = srea.srea(self.stn)
-        self.num_reschedules += 1
-        if result is None:
-            return previous_alpha, previous_guide
-        new_alpha = result[0]
-        maybe_guide = result[1]
-
-        # num_cont : Number of remaining unexecuted contingent events
-        num_cont = self.remaining_contingent_count(maybe_guide)
-        p_0 = (1 - previous_alpha)**num_cont
-        p_1 = (1 - new_alpha)**num_cont
-        if p_1 - p_0 > threshold:
-            self.num_sent_schedules += 1
-            pr.verbose("Got new drea-si guide with alpha={}".format(new_alpha))
-            return new_alpha, maybe_guide
-        else:
-            pr.verbose("Did not reschedule, p_0={}, p_1={}".format(p_0, p_1))
-            return previous_alpha, previous_guide
-
-    def _drea_alp_algorithm(self, previous_alpha, previous_guide, first_run,
-                            executed_contingent, threshold):
-        """ Implements the DREA alpha difference algorithm, which is an attempt
-        to correct DREA-SI which has a fatal flaw of not rescheduling when
-        contingent events tend to differ.
-        """
-        if first_run:
-            self.num_reschedules += 1
-            result = srea.srea(self.stn)
-            if result is None:
-                return previous_alpha, previous_guide
-            new_alpha = result[0]
-            maybe_guide = result[1]
-            self.num_sent_schedules += 1
-            pr.verbose("Got new drea-alp guide with alpha={}"
-                       .format(new_alpha))
-            return new_alpha, maybe_guide
-        # We should only run this algorithm *if* we recently executed
-        # a receieved/contingent timepoint.
-        if not executed_contingent:
-            return previous_alpha, previous_guide
-        # We are therefore actually running the algorithm.
-        result = srea.srea(self.stn)
-        self.num_reschedules += 1
-        if result is None:
-            return previous_alpha, previous_guide
-        new_alpha = result[0]
-        maybe_guide = result[1]
-        # num_cont : Number of remaining unexecuted contingent events
-        num_cont = 0
-        for i in maybe_guide.received_timepoints:
-            if not maybe_guide.get_vertex(i).is_executed():
-                num_cont += 1
-
-        if abs(new_alpha - previous_alpha) > threshold:
-            pr.verbose("Got new drea-alp guide with alpha={}"
-                       .format(new_alpha))
-            self.num_sent_schedules += 1
-            return new_alpha, maybe_guide
-        else:
-            pr.verbose("Did not send reschedule, a0={}, a1={}"
-                       .format(previous_alpha, new_alpha))
-            return previous_alpha, previous_guide
-
-    def _drea_ar_algorithm(self, previous_alpha, previous_guide, first_run,
-                           executed_contingent, threshold,
-                           contingent_event_counter):
-        """ Implements the DREA-AR algorithm. """
-        if first_run:
-            result = srea.srea(self.stn)
-            self.num_reschedules += 1
-            if result is not None:
-                self.num_sent_schedules += 1
-                return result[0], result[1], contingent_event_counter
-            else:
-                return previous_alpha, previous_guide, contingent_event_counter
-        # We should only run this algorithm *if* we recently executed
-        # a received/contingent timepoint.
-        if not executed_contingent:
-            return previous_alpha, previous_guide, contingent_event_counter
-
-        # n is a placeholder for how much uncertainty we can take.
-        n = 0
-        attempts = 0
-        if threshold == 0:
-            n = float("inf")
-        else:
-            while (1 - previous_alpha)**(n + 1) > threshold and attempts < 100:
-                n += 1
-                attempts += 1
-
-        # Temporary variable to maintain unique names.
-        new_counter = contingent_event_counter
-        if contingent_event_counter >= n:
-            result = srea.srea(self.stn)
-            self.num_reschedules += 1
-            if result is not None:
-                pr.verbose("DREA-AR rescheduled our STN")
-                new_alpha = result[0]
-                maybe_guide = result[1]
-                new_counter = 0
-                self.num_sent_schedules += 1
-                return new_alpha, maybe_guide, new_counter
-        return previous_alpha, previous_guide, new_counter
-
-    def _drea_ara_algorithm(self, previous_alpha, previous_guide, first_run,
-                            threshold, successfactor, in_bounds):
-        """ Implements the DREA-ARA algorithm.
-
-        Written by Jordan...
-        Oh god please, this function's arguments are cancer. -Jordan 2018
-        """
-        if first_run:
-            result = srea.srea(self.stn)
-            self.num_reschedules += 1
-            if result is not None:
-                self.num_sent_schedules += 1
-                return result[0], result[1], successfactor
-            else:
-                return previous_alpha, previous_guide, successfactor
-
-        # Temporary variable to maintain unique names.
-        newfactor = successfactor
-        if in_bounds:
-            newfactor *= 1.0 - previous_alpha
-        else:
-            newfactor = min(1.0 - previous_alpha, previous_alpha / 2.0)
-
-        if successfactor <= threshold:
-            result = srea.srea(self.stn)
-            self.num_reschedules += 1
-            if result is not None:
-                pr.verbose("DREA-AR rescheduled our STN")
-                new_alpha = result[0]
-                maybe_guide = result[1]
-                newfactor = 1.0
-                self.num_sent_schedules += 1
-                return new_alpha, maybe_guide, newfactor
-        return previous_alpha, previous_guide, newfactor
-
-    def _arsi_algorithm(self, previous_alpha, previous_guide, first_run,
-                        executed_contingent, contingent_event_counter,
-                        ar_threshold=0.0,
-                        si_threshold=0.0):
-        """Implements the ARSI algorithm. This is now technically ARSC, not
-        ARSI anymore because we are doing a direct alpha comparsion.
-
-        Direct alpha comparison with absolute value allows considering cases
-        where we *do* see an increase in risk, rather than a decrease.
-        """
-        if first_run:
-            result = srea.srea(self.stn)
-            self.num_reschedules += 1
-            if result is not None:
-                self.num_sent_schedules += 1
-                new_alpha = result[0]
-                new_guide = result[1]
-                return new_alpha, new_guide, contingent_event_counter
-            return previous_alpha, previous_guide, contingent_event_counter
-        # We should only run this algorithm *if* we recently executed
-        # a received/contingent timepoint.
-        if not executed_contingent:
-            return previous_alpha, previous_guide, contingent_event_counter
-        # AR SECTION ----------------------------------------------------------
-        # n is a placeholder for how much uncertainty we can take.
-        n = 0
-        attempts = 0  # Make sure we can actually escape if threshold = 0
-        while (1 - previous_alpha)**(n + 1) > ar_threshold and attempts < 100:
-            n += 1
-            attempts += 1
-        # Should we reschedule?
-        result = None
-        if contingent_event_counter >= n:
-            # Get a new schedule
-            pr.verbose("ARSC rescheduled...")
-            result = srea.srea(self.stn)
-            self.num_reschedules += 1
-        if result is None:
-            # Early exit if SREA failed OR if it's not time yet to reschedule
-            return previous_alpha, previous_guide, contingent_event_counter
-        # SI SECTION ----------------------------------------------------------
-        new_alpha = result[0]
-        maybe_guide = result[1]
-
-        num_cont = self.remaining_contingent_count(maybe_guide)
-        if abs(new_alpha - previous_alpha) >= si_threshold:
-            self.num_sent_schedules += 1
-            pr.verbose("Got new ARSC guide with alpha={}".format(new_alpha))
-            return new_alpha, maybe_guide, 0
-        else:
-            pr.verbose(("ARSC did not send schedule, previous_alpha={}, "
-                        + "new_alpha={}")
-                       .format(previous_alpha, new_alpha))
-            return previous_alpha, previous_guide, contingent_event_counter
-
     def remaining_contingent_count(self, stn):
         """Returns the number of remaining (unexecuted) contingent events"""
         # num_cont : Number of remaining unexecuted contingent events
@@ -0,0 +1,223 @@
+"""Named figures and tables, and rendering many of them at once.
+
+plotter.py draws one figure per run. render_batch() instead loads the
+results once, and renders a list of figures and tables in parallel worker
+processes with the non-interactive Agg backend. Each output is recorded in
+a manifest next to it, under a hash of the results files' contents and
+the render settings, so outputs whose inputs are unchanged are skipped,
+and the results are not even loaded if nothing needs rendering.
+
+Usage:
+
+    render_batch(["syncvrobust", "table"], files, lambda: load(files),
+                 "figures")
+"""
+
+import os
+import json
+import warnings
+import tempfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from . import dream_details
+from . import summarycache
+from .plot_arsc import plot_arsc_cross
+from .plot_ara import plot_ara
+from .plot_syncvrobust import plot_syncvrobust
+from .plot_scatters import communication as com_scatter
+from .plot_scatters import reschedules as res_scatter
+
+
+RENDER_VERSION = 1
+"""Bump this whenever a figure or table changes how it is drawn."""
+MANIFEST = ".rendered.json"
+"""Name of the manifest file in the output folder."""
+CM2INCH = 0.393701
+"""Conversion between centimetres and US inches."""
+DEFAULT_WIDTH = 12
+"""Default figure width in centimetres."""
+DEFAULT_HEIGHT = 6
+"""Default figure height in centimetres."""
+STYLE = {"font.family": "serif"}
+"""rcParams every figure is drawn with."""
+
+
+def _dream_cross_section(df, ax):
+    # Plot a cross section of the DREAM data.
+    ax.set_title("DREAM Threshold AR Analysis (m_SC = 0)")
+    plot_arsc_cross(df, sc_threshold=0.0, ax=ax, plot_srea=True,
+                    threshold_range=[0.0, 0.0625, 0.125, 0.25, 0.5, 1])
+
+
+def _ara_threshold(df, ax):
+    ax.set_title("DREA-AR Alternate")
+    plot_ara(df, ax=ax, plot_srea=True)
+
+
+FIGURES = {"syncvrobust": lambda df, ax: plot_syncvrobust(df,
+                                                          errorbars=True),
+           "dream_cross_section": _dream_cross_section,
+           "ara_threshold": _ara_threshold,
+           "com_scatter": lambda df, ax: com_scatter(df),
+           "res_scatter": lambda df, ax: res_scatter(df)}
+"""Figures, by name. Each takes (results, axes), and draws on the current
+figure."""
+TABLES = {"table": lambda df: print(dream_details.dream_table(df)),
+          "gain_table": dream_details.dream_gain_table,
+          "gain_table_q2": dream_details.dream_gain_table_q2,
+          "best_ar": dream_details.dream_best_ar,
+          "best_sc": dream_details.dream_best_sc}
+"""Tables, by name. Each takes the results, and prints the table."""
+NAMES = ["syncvrobust", "dream_cross_section", "ara_threshold", "table",
+         "gain_table", "gain_table_q2", "best_ar", "best_sc", "com_scatter",
+         "res_scatter"]
+"""Every figure and table which can be rendered, in plotter.py's order of
+precedence."""
+
+_frame = None
+"""Results frame of a worker process."""
+
+
+def new_figure():
+    """Start a figure of the default size, and return (figure, axes)."""
+    fig = plt.figure(figsize=(CM2INCH * DEFAULT_WIDTH,
+                              CM2INCH * DEFAULT_HEIGHT))
+    ax = plt.gca()
+    ax.tick_params(bottom=True, top=True, left=True, right=True)
+    return fig, ax
+
+
+def output_name(name, fmt="pdf") -> str:
+    """Returns the file name a figure or table is rendered to."""
+    if name in TABLES:
+        return name + ".txt"
+    return "{}.{}".format(name, fmt)
+
+
+def render(name, df, path):
+    """Render one figure or table of the results to path.
+
+    Figures are drawn with whichever matplotlib backend is in use; the
+    plotting functions' calls to plt.show() do nothing under Agg.
+    """
+    if name in TABLES:
+        with open(path, "w") as f, contextlib.redirect_stdout(f):
+            TABLES[name](df)
+        return
+    fig, ax = new_figure()
+    try:
+        FIGURES[name](df, ax)
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+
+
+def render_batch(names, files, load, output_dir, fmt="pdf", workers=None,
+                 force=False) -> dict:
+    """Render figures and tables to a folder, skipping unchanged ones.
+
+    Args:
+        names (list): Names of the figures and tables, from NAMES.
+        files (list): Paths of the results files they are drawn from.
+        load (function): Takes no arguments, and returns the results (a
+            frame or summary frame) of the files. Only called if something
+            needs rendering.
+        output_dir (str): Folder to render into.
+        fmt (str, optional): File format of the figures. Default "pdf".
+        workers (int, optional): Number of worker processes. Default is
+            one per CPU, at most one per output. 1 renders in this process.
+        force (bool, optional): Render even if the inputs are unchanged.
+
+    Returns:
+        A dictionary of the form {name: "rendered", "unchanged" or an
+        error message}.
+    """
+    unknown = [name for name in names if name not in NAMES]
+    if unknown:
+        raise ValueError("Unknown figures: {}".format(", ".join(unknown)))
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    manifest = _read_manifest(manifest_path)
+
+    status = {}
+    todo = {}
+    for name in names:
+        out = output_name(name, fmt)
+        key = summarycache.summary_key("render:" + name, files,
+                                       (RENDER_VERSION, fmt))
+        if not force and manifest.get(out) == key \
+                and os.path.isfile(os.path.join(output_dir, out)):
+            status[name] = "unchanged"
+        else:
+            todo[name] = (out, key)
+    if not todo:
+        return status
+
+    df = load()
+    jobs = [(name, os.path.join(output_dir, out))
+            for name, (out, _) in todo.items()]
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(df)
+        errors = [_render_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(df,)) as pool:
+            errors = list(pool.map(_render_job, jobs))
+
+    for (name, _), error in zip(jobs, errors):
+        if error is None:
+            out, key = todo[name]
+            manifest[out] = key
+            status[name] = "rendered"
+        else:
+            status[name] = error
+    _write_manifest(manifest_path, manifest)
+    return status
+
+
+def _init_worker(df):
+    """Set up a process to render figures of df."""
+    global _frame
+    _frame = df
+    plt.switch_backend("Agg")
+    matplotlib.rcParams.update(STYLE)
+    warnings.filterwarnings("ignore", message=".*non-interactive.*")
+
+
+def _render_job(job):
+    """Render one (name, path) job. Returns None, or an error message."""
+    name, path = job
+    try:
+        render(name, _frame, path)
+    except Exception as e:
+        return "{}: {}".format(type(e).__name__, e)
+    return None
+
+
+def _read_manifest(path) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(path, manifest):
+    """Atomically write the manifest."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -8,7 +8,7 @@ Author: Jordan R. Abrahams
 import pandas as pd
 
 
-from .plot_utils import threshold_means
+from .plot_utils import grid_means, metric_mean, metric_sem
 
 
 COLUMNS = ["ar_threshold", "sc_threshold", "robustness", "robustness_pm"]
@@ -17,6 +17,15 @@ ERROR_FAC = 1
 """Error bar Z-score"""
 
 
+def _print_drea(drea):
+    """Print the DREA results the tables are compared against."""
+    for label, metric in (("Rob", "robustness"), ("Runtime", "runtime"),
+                          ("Reschedule", "reschedule_freq"),
+                          ("Deployment", "send_freq")):
+        print("DREA {}: {}".format(label, metric_mean(drea, metric)))
+        print("DREA {} +/-: {}".format(label, metric_sem(drea, metric)))
+
+
 def dream_table(df, **kwargs):
     """Get DREAM/ARSC algorithm table.
 
@@ -46,7 +55,6 @@ def dream_table(df, **kwargs):
     else:
         comparison = drea
 
-    outdf = pd.DataFrame(columns=COLUMNS)
     # Check naming of arsi/arsc
     naming = "arsc"
     sc_col_name = "sc_threshold"
@@ -54,28 +62,19 @@ def dream_table(df, **kwargs):
         naming = "arsi"
         sc_col_name = "si_threshold"
 
-    for ar_thresh in thresholds:
-        # Iterate through AR Thresholds, and then gather the mean robustnesses
-        # for each SC threshold.
-        arsc_cut = df.loc[(df['execution'] == naming)
-                          & (df["ar_threshold"] == ar_thresh)]
-
-        if comparison is None:
-            data = threshold_means(arsc_cut, sc_col_name, thresholds,
-                                   error_fac=ERROR_FAC)
-        else:
-            data = threshold_means(arsc_cut, sc_col_name, thresholds,
-                                   comp_df=comparison, error_fac=ERROR_FAC)
-
-        for i, sc_thresh in enumerate(thresholds):
-            row_dict = {"ar_threshold": ar_thresh,
-                        "sc_threshold": sc_thresh,
-                        "robustness": data.robs[i],
-                        "robustness_pm": data.robs_err[i],
-                        "send_freq": data.sends[i],
-                        "reschedule_freq": data.res[i],
-                        "runtime": data.runtimes[i]}
-            outdf = outdf.append(row_dict, ignore_index=True, sort=True)
+    # Gather the mean robustnesses for every AR and SC threshold at once.
+    arsc = df.loc[df['execution'] == naming]
+    means = grid_means(arsc,
+                       [("ar_threshold", thresholds),
+                        (sc_col_name, thresholds)],
+                       comp_df=comparison, error_fac=ERROR_FAC)
+    outdf = pd.DataFrame({"ar_threshold": means["ar_threshold"],
+                          "sc_threshold": means[sc_col_name],
+                          "robustness": means["robustness"],
+                          "robustness_pm": means["robustness_err"],
+                          "send_freq": means["send_freq"],
+                          "reschedule_freq": means["reschedule_freq"],
+                          "runtime": means["runtime"]})
 
     # print(outdf)
     #print("DREA Rob: {}".format(drea["robustness"].mean()))
@@ -120,30 +119,26 @@ def dream_gain_table(df, **kwargs):
 
     print(df.head())
 
-    dreamdf = pd.DataFrame(columns=COLUMNS)
     # Check naming of arsi/arsc
     naming = "arsc"
     sc_col_name = "sc_threshold"
     if df.loc[df['execution'] == "arsc"].empty:
         sc_col_name = "si_threshold"
         naming = "arsi"
-    for ar_thresh in thresholds:
-        # Iterate through AR Thresholds, and then gather the mean robustnesses
-        # for each SC threshold.
-        arsc_cut = df.loc[(df['execution'] == naming)
-                          & (df["ar_threshold"] == ar_thresh)]
-        data = threshold_means(arsc_cut, sc_col_name, thresholds,
-                               error_fac=ERROR_FAC, use_percents=False)
-
-        for i, sc_thresh in enumerate(thresholds):
-            row_dict = {"ar_threshold": ar_thresh,
-                        "sc_threshold": sc_thresh,
-                        "robustness": data.robs[i],
-                        "robustness_pm": data.robs_err[i],
-                        "improv_rob": data.robs[i] - srea["robustness"].mean(),
-                        "reschedule_freq": data.res[i],
-                        "deployment": data.sends[i]}
-            dreamdf = dreamdf.append(row_dict, ignore_index=True, sort=True)
+    arsc = df.loc[df['execution'] == naming]
+    means = grid_means(arsc,
+                       [("ar_threshold", thresholds),
+                        (sc_col_name, thresholds)],
+                       error_fac=ERROR_FAC, use_percents=False)
+    dreamdf = pd.DataFrame({"ar_threshold": means["ar_threshold"],
+                            "sc_threshold": means[sc_col_name],
+                            "robustness": means["robustness"],
+                            "robustness_pm": means["robustness_err"],
+                            "improv_rob": (means["robustness"]
+                                           - metric_mean(srea,
+                                                         "robustness")),
+                            "reschedule_freq": means["reschedule_freq"],
+                            "deployment": means["send_freq"]})
 
     # Recall, we used to name communications as deployments.
     deployment_metric = dreamdf["improv_rob"] / dreamdf["deployment"]
@@ -159,38 +154,27 @@ def dream_gain_table(df, **kwargs):
                             "robustness_pm", "metric"]]
     # print(pretty_print.sort_values(by=["ar_threshold"]))
 
-    print("DREA Rob: {}".format(drea["robustness"].mean()))
-    print("DREA Rob +/-: {}".format(drea["robustness"].sem()))
-    print("DREA Runtime: {}".format(drea["runtime"].mean()))
-    print("DREA Runtime +/-: {}".format(drea["runtime"].sem()))
-    print("DREA Reschedule: {}".format(drea["reschedule_freq"].mean()))
-    print("DREA Reschedule +/-: {}".format(drea["reschedule_freq"].sem()))
-    print("DREA Deployment: {}".format(drea["send_freq"].mean()))
-    print("DREA Deployment +/-: {}".format(drea["send_freq"].sem()))
+    _print_drea(drea)
 
 
 def dream_best_ar(df):
     dream = df.loc[(df["execution"] == "drea-ar") & (df["si_threshold"] == 0)]
     srea = df.loc[df["execution"] == "srea"]
     thresholds = list(dream["ar_threshold"].unique())
-    data = threshold_means(dream, "ar_threshold", thresholds, error_fac=1,
-                           use_percents=False)
-    dream_summary = pd.DataFrame(columns=["robustness",
-                                          "ar_threshold",
-                                          "sc_threshold",
-                                          "reschedule_freq"])
-    for i, ar_thresh in enumerate(thresholds):
-        row = {"robustness": data.robs[i],
-               "ar_threshold": ar_thresh,
-               "sc_threshold": 0,
-               "reschedule_freq": data.res[i]}
-        dream_summary = dream_summary.append(row, ignore_index=True)
-
-    metric = ((dream_summary["robustness"] - float(srea["robustness"].mean()))
+    means = grid_means(dream, [("ar_threshold", thresholds)], error_fac=1,
+                       use_percents=False)
+    dream_summary = pd.DataFrame({"robustness": means["robustness"],
+                                  "ar_threshold": means["ar_threshold"],
+                                  "sc_threshold": 0,
+                                  "reschedule_freq":
+                                  means["reschedule_freq"]})
+
+    metric = ((dream_summary["robustness"]
+               - float(metric_mean(srea, "robustness")))
               / dream_summary["reschedule_freq"])
     dream_summary["metric"] = metric
     print(dream_summary.sort_values(by="metric"))
-    print("SREA robustness: {}".format(srea["robustness"].mean()))
+    print("SREA robustness: {}".format(metric_mean(srea, "robustness")))
 
 
 def dream_best_sc(df):
@@ -199,24 +183,19 @@ def dream_best_sc(df):
     dream = df.loc[(df["execution"] == "arsi") & (df["ar_threshold"] == 1)]
     srea = df.loc[df["execution"] == "srea"]
     thresholds = list(dream["si_threshold"].unique())
-    data = threshold_means(dream, "si_threshold", thresholds, error_fac=1,
-                           use_percents=False)
-    dream_summary = pd.DataFrame(columns=["robustness",
-                                          "ar_threshold",
-                                          "sc_threshold",
-                                          "send_freq"])
-    for i, sc_thresh in enumerate(thresholds):
-        row = {"robustness": data.robs[i],
-               "ar_threshold": 1.0,
-               "sc_threshold": sc_thresh,
-               "send_freq": data.sends[i]}
-        dream_summary = dream_summary.append(row, ignore_index=True)
-
-    metric = ((dream_summary["robustness"] - float(srea["robustness"].mean()))
+    means = grid_means(dream, [("si_threshold", thresholds)], error_fac=1,
+                       use_percents=False)
+    dream_summary = pd.DataFrame({"robustness": means["robustness"],
+                                  "ar_threshold": 1.0,
+                                  "sc_threshold": means["si_threshold"],
+                                  "send_freq": means["send_freq"]})
+
+    metric = ((dream_summary["robustness"]
+               - float(metric_mean(srea, "robustness")))
               / dream_summary["send_freq"])
     dream_summary["metric"] = metric
     print(dream_summary.sort_values(by="metric"))
-    print("SREA robustness: {}".format(srea["robustness"].mean()))
+    print("SREA robustness: {}".format(metric_mean(srea, "robustness")))
 
 
 def generate_contour_values(df, ar_thresholds, sc_thresholds, coi):
@@ -268,7 +247,6 @@ def dream_gain_table_q2(df, **kwargs):
     else:
         comparison = drea
 
-    dreamdf = pd.DataFrame(columns=COLUMNS)
     # Check naming of arsi/arsc
     naming = "arsc"
     sc_col_name = "sc_threshold"
@@ -276,25 +254,22 @@ def dream_gain_table_q2(df, **kwargs):
         naming = "arsi"
         sc_col_name = "si_threshold"
 
-    for ar_thresh in thresholds:
-        # Iterate through AR Thresholds, and then gather the mean robustnesses
-        # for each SC threshold.
-        arsc_cut = df.loc[(df['execution'] == naming)
-                          & (df["ar_threshold"] == ar_thresh)]
-        data = threshold_means(arsc_cut, sc_col_name, thresholds,
-                               error_fac=ERROR_FAC, use_percents=False)
-
-        for i, sc_thresh in enumerate(thresholds):
-            row_dict = {"ar_threshold": ar_thresh,
-                        "sc_threshold": sc_thresh,
-                        "robustness": data.robs[i],
-                        "robustness_pm": data.robs_err[i],
-                        "improv_rob": data.robs[i] - srea["robustness"].mean(),
-                        "reschedule_freq": data.res[i],
-                        "deployment": data.sends[i],
-                        "runtime": data.runtimes[i],
-                        "runtime_pm": data.runtimes_err[i]}
-            dreamdf = dreamdf.append(row_dict, ignore_index=True, sort=True)
+    arsc = df.loc[df['execution'] == naming]
+    means = grid_means(arsc,
+                       [("ar_threshold", thresholds),
+                        (sc_col_name, thresholds)],
+                       error_fac=ERROR_FAC, use_percents=False)
+    dreamdf = pd.DataFrame({"ar_threshold": means["ar_threshold"],
+                            "sc_threshold": means[sc_col_name],
+                            "robustness": means["robustness"],
+                            "robustness_pm": means["robustness_err"],
+                            "improv_rob": (means["robustness"]
+                                           - metric_mean(srea,
+                                                         "robustness")),
+                            "reschedule_freq": means["reschedule_freq"],
+                            "deployment": means["send_freq"],
+                            "runtime": means["runtime"],
+                            "runtime_pm": means["runtime_err"]})
 
     deployment_metric_2 = dreamdf["improv_rob"] / dreamdf["runtime"]
     #deployment_metric.rename(index=str, columns={"0": "metric"})
@@ -309,11 +284,4 @@ def dream_gain_table_q2(df, **kwargs):
                             "metric_2"]]
     print(pretty_print.sort_values(by=["metric_2"]))
 
-    print("DREA Rob: {}".format(drea["robustness"].mean()))
-    print("DREA Rob +/-: {}".format(drea["robustness"].sem()))
-    print("DREA Runtime: {}".format(drea["runtime"].mean()))
-    print("DREA Runtime +/-: {}".format(drea["runtime"].sem()))
-    print("DREA Reschedule: {}".format(drea["reschedule_freq"].mean()))
-    print("DREA Reschedule +/-: {}".format(drea["reschedule_freq"].sem()))
-    print("DREA Deployment: {}".format(drea["send_freq"].mean()))
-    print("DREA Deployment +/-: {}".format(drea["send_freq"].sem()))
+    _print_drea(drea)
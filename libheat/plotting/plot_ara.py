@@ -3,7 +3,7 @@
 import matplotlib.pyplot as plt
 
 
-from .plot_utils import threshold_means
+from .plot_utils import threshold_means, metric_mean
 
 
 X_AXIS_RANGE = (-0.02, 1.02)
@@ -42,8 +42,8 @@ def plot_ara(df, **kwargs):
     # else:
     #    aralabel = "ARSC ".format(sc_cut)
     aralabel = "DREA-AR Alt "
-    srea_rob = srea["robustness"].mean()
-    drea_rob = drea["robustness"].mean()
+    srea_rob = metric_mean(srea, "robustness")
+    drea_rob = metric_mean(drea, "robustness")
     if "ax" in kwargs:
         ax = kwargs["ax"]
     else:
@@ -6,7 +6,7 @@
 import matplotlib.pyplot as plt
 
 
-from .plot_utils import threshold_means
+from .plot_utils import threshold_means, metric_mean
 
 
 X_AXIS_RANGE = (-0.02, 1.02)
@@ -67,10 +67,11 @@ def plot_arsc_cross(df, **kwargs):
     # End setup ---------------------------------------------------------------
 
     if using_sc:
-        try:
+        # Summary frames always have an (empty) sc_threshold column.
+        if naming == "arsc" and "sc_threshold" in df.columns:
             data = threshold_means(arsc, "sc_threshold", thresholds,
                                    drea, error_fac=ERROR_FAC)
-        except KeyError:
+        else:
             data = threshold_means(arsc, "si_threshold", thresholds,
                                    drea, error_fac=ERROR_FAC)
     else:
@@ -82,8 +83,8 @@ def plot_arsc_cross(df, **kwargs):
     # else:
     #    arsc_label = "ARSC ".format(sc_cut)
     arsc_label = "DREAM "
-    srea_rob = srea["robustness"].mean()
-    drea_rob = drea["robustness"].mean()
+    srea_rob = metric_mean(srea, "robustness")
+    drea_rob = metric_mean(drea, "robustness")
     if "ax" in kwargs:
         ax = kwargs["ax"]
         ax.errorbar(thresholds, data.robs, yerr=data.robs_err,
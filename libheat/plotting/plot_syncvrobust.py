@@ -8,6 +8,9 @@ Author: Jordan R Abrahams
 import matplotlib.pyplot as plt
 
 
+from .plot_utils import grid_means
+
+
 def plot_syncvrobust(df, errorbars=True, executions=None, thresholds=None):
     """Plot Sychronisation vs. Performance
 
@@ -18,8 +21,8 @@ def plot_syncvrobust(df, errorbars=True, executions=None, thresholds=None):
         Each STN is considered a datum.
 
     Args:
-        df (DataFrame): DataFrame of results to be passed. Must have a
-            "sync_deg" column.
+        df (DataFrame): DataFrame of results, or a summary frame, to be
+            passed. Must have a "sync_deg" column.
         errorbars (boolean, optional): Should the plot have error bars? Default
             True
         executions (list, optional): List of strings of execution strats to
@@ -40,32 +43,27 @@ def plot_syncvrobust(df, errorbars=True, executions=None, thresholds=None):
     data_err = {}
     # Iterate through every execution strategy we care about.
     for ex in executions:
-        runs = df.loc[df["execution"] == ex]
-        for x in x_values:
-            run_deg = runs.loc[runs["sync_deg"] == x]
-            if ex != "drea-si" and ex != "drea-ar":
-                run_series = run_deg["robustness"]  # Get robustness.
-                mean = run_series.mean()
-                err = run_series.sem()  # Standard error bar.
-                if ex in data_y:
-                    data_y[ex].append(mean * 100)
-                    data_err[ex].append(err * 100)
-                else:
-                    data_y[ex] = [mean * 100]
-                    data_err[ex] = [err * 100]
+        if ex != "drea-si" and ex != "drea-ar":
+            means = grid_means(df, [("execution", [ex]),
+                                    ("sync_deg", x_values)])
+            data_y[ex] = means["robustness"].tolist()
+            data_err[ex] = means["robustness_err"].tolist()
+        else:
+            # Older results have a single threshold column.
+            if "threshold" in df.columns:
+                thresh_name = "threshold"
+            elif ex == "drea-si":
+                thresh_name = "si_threshold"
             else:
-                for t in thresholds:
-                    thresh_series = run_deg.loc[run_deg["threshold"]
-                                                == t]["robustness"]
-                    mean = thresh_series.mean()
-                    err = thresh_series.sem()
-                    label = ex + "_" + str(t)  # Make a unique label for each
-                    if label in data_y:
-                        data_y[label].append(mean * 100)
-                        data_err[label].append(err * 100)
-                    else:
-                        data_y[label] = [mean * 100]
-                        data_err[label] = [err * 100]
+                thresh_name = "ar_threshold"
+            means = grid_means(df, [("execution", [ex]),
+                                    (thresh_name, thresholds),
+                                    ("sync_deg", x_values)])
+            for t in thresholds:
+                cut = means[means[thresh_name] == t]
+                label = ex + "_" + str(t)  # Make a unique label for each
+                data_y[label] = cut["robustness"].tolist()
+                data_err[label] = cut["robustness_err"].tolist()
     linestyles = ["-", "--", ":", "-."]
     for i, label in enumerate(data_y.keys()):
         if errorbars:
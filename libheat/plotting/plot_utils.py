@@ -3,9 +3,32 @@
 """
 
 
+import numpy as np
 import pandas as pd
 
 
+METRICS = ["robustness", "send_freq", "reschedule_freq", "runtime"]
+"""Result columns summarised by grid_means()."""
+MIN_SAMPLES = 50
+"""Results from fewer samples than this are filtered out."""
+STAT_SUFFIXES = ("_n", "_sum", "_sumsq")
+"""Suffixes of the count, sum and sum of squares columns of each metric in
+a summary frame (see summarystore)."""
+
+
+def load_results(files):
+    """Read results CSV files into one filtered DataFrame.
+
+    Args:
+        files (list): Paths of the CSV files, as written by run_simulator.
+
+    Returns:
+        The rows of every file, passed through framefilters().
+    """
+    frames = [pd.read_csv(f, header=0) for f in files]
+    return framefilters(pd.concat(frames, ignore_index=True, sort=True))
+
+
 def framefilters(df, add_sync_degree=True):
     """Filter a DataFrame of rows that we don't want in the first place.
     This includes things like STNs which have 0% robustness.
@@ -24,40 +47,125 @@ def framefilters(df, add_sync_degree=True):
         any columns we wish to add.
     """
     if add_sync_degree:
-        # Add the synchrony column, extracted from the file name.
-        sync_column = []
-        for i, row in df.iterrows():
-            foldername = row["stn_path"].split("/")[-2]
-            try:
-                synchrony = float(foldername.split("_")[4][1:]) * 0.001
-            except IndexError:
-                synchrony = "NaN"
-            sync_column.append(synchrony)
-        df = df.assign(sync_deg=pd.Series(sync_column))
+        df = df.assign(sync_deg=sync_degrees(df["stn_path"]))
     # Remove zeros present in the data.
     df = clearzero(df)
-    return df[df.samples >= 50]
+    return df[df.samples >= MIN_SAMPLES]
+
+
+def sync_degrees(stn_paths):
+    """Extract the degree of synchrony from each STN path.
+
+    The degree is encoded in the name of the folder holding the STN, e.g.
+    ".../STN_a2_i4_s5_t10000/original_0.json" has a degree of 10.
+
+    Args:
+        stn_paths (Series): Paths of the STNs.
+
+    Returns:
+        A float Series, NaN where the folder name has no synchrony field.
+    """
+    # Sweeps hold many rows per STN, so only parse each path once.
+    codes, uniques = pd.factorize(stn_paths)
+    foldernames = pd.Series(uniques).str.split("/").str[-2]
+    fields = foldernames.str.split("_").str[4].str[1:]
+    degrees = pd.to_numeric(fields, errors="coerce").to_numpy() * 0.001
+    # Missing paths get code -1, which picks out the trailing NaN.
+    degrees = np.append(degrees, np.nan)
+    return pd.Series(degrees[codes], index=stn_paths.index)
 
 
 def clearzero(df):
     """Remove STN rows which have 0% robustness across all runs."""
-    unique_stns = df.drop_duplicates(subset="stn_path")
-    to_remove = []
-    for _, row in unique_stns.iterrows():
-        stn_path = row["stn_path"]
-        runs = df.loc[df["stn_path"] == stn_path]
-        all_zero = True
-        for _, run in runs.iterrows():
-            if not all_zero:
-                break
-            all_zero = run["robustness"] <= 0.0
-        if all_zero:
-            to_remove.append(stn_path)
-    for path in to_remove:
-        indices = df.loc[df["stn_path"] == path]
-        common = df.merge(indices, on=['stn_path'])
-        df = df[~df.stn_path.isin(common.stn_path)]
-    return df
+    nonzero = ~(df["robustness"] <= 0.0)
+    keep = nonzero.groupby(df["stn_path"]).transform("any")
+    return df[keep]
+
+
+def grid_means(df, grid, comp_df=None, error_fac=1.0, use_percents=True):
+    """Computes the means (and standard errors) of the result metrics for
+        every combination of threshold values, in one pass over the frame.
+
+    Args:
+        df (DataFrame): DataFrame of the data we want to summarise.
+        grid (list): List of (column name, list of values) tuples. The
+            output has a row for every combination of these values, in
+            order, with the last column varying fastest.
+        comp_df (DataFrame, optional): Data frame to compare to, percent wise.
+        error_fac (float, optional): Multiply error sizes by this number.
+        use_percents (float, optional): Return results in percents.
+
+    Returns:
+        Returns a DataFrame with the threshold columns of the grid, a column
+        for each of METRICS, holding the mean, and an "<metric>_err" column
+        holding the error. Combinations with no rows are NaN.
+    """
+    p = 100 if use_percents else 1
+    names = [name for name, _ in grid]
+    if len(grid) == 1:
+        index = pd.Index(grid[0][1], name=names[0])
+    else:
+        index = pd.MultiIndex.from_product([values for _, values in grid],
+                                           names=names)
+    keys = names if len(names) > 1 else names[0]
+    out = index.to_frame(index=False)
+    if is_summary(df):
+        columns = [metric + suffix for metric in METRICS
+                   for suffix in STAT_SUFFIXES]
+        sums = df.groupby(keys)[columns].sum().reindex(index)
+        stats = {}
+        for metric in METRICS:
+            stats[metric] = _moments(*[sums[metric + suffix].to_numpy()
+                                       for suffix in STAT_SUFFIXES])
+    else:
+        agg = df.groupby(keys)[METRICS].agg(["mean", "sem"]).reindex(index)
+        stats = {metric: (agg[(metric, "mean")].to_numpy(),
+                          agg[(metric, "sem")].to_numpy())
+                 for metric in METRICS}
+    for metric in METRICS:
+        mean, sem = stats[metric]
+        comp = 1.0 if comp_df is None else metric_mean(comp_df, metric)
+        out[metric] = mean / comp * p
+        out[metric + "_err"] = sem * p * error_fac
+    return out
+
+
+def is_summary(df) -> bool:
+    """Whether df is a summary frame, holding the count, sum and sum of
+    squares of each metric, rather than one row per result."""
+    return "robustness_sum" in df.columns
+
+
+def metric_mean(df, metric) -> float:
+    """Mean of a metric over the results in df, a frame or summary frame."""
+    if not is_summary(df):
+        return df[metric].mean()
+    return _moments(*[df[metric + suffix].to_numpy().sum()
+                      for suffix in STAT_SUFFIXES])[0]
+
+
+def metric_sem(df, metric) -> float:
+    """Standard error of the mean of a metric over the results in df."""
+    if not is_summary(df):
+        return df[metric].sem()
+    return _moments(*[df[metric + suffix].to_numpy().sum()
+                      for suffix in STAT_SUFFIXES])[1]
+
+
+def _moments(n, total, sumsq):
+    """Returns the mean and standard error from sufficient statistics.
+
+    Like pandas, the error of fewer than two values is NaN.
+    """
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(n > 0, total / n, np.nan)
+        var = np.where(n > 1, (sumsq - total * mean) / (n - 1), np.nan)
+        # Rounding can leave the variance of equal values just below zero.
+        sem = np.sqrt(np.maximum(var, 0.0) / n)
+    if mean.ndim == 0:
+        return float(mean), float(sem)
+    return mean, sem
 
 
 def threshold_means(df, thresh_name, thresholds, comp_df=None, error_fac=1.0,
@@ -86,53 +194,12 @@ def threshold_means(df, thresh_name, thresholds, comp_df=None, error_fac=1.0,
             res_err -> returns a list of reschedule frequencies errors
             runtimes -> returns a list of runtimes.
     """
-    if comp_df is not None:
-        comp_rob = comp_df["robustness"].mean()
-        comp_res = comp_df["reschedule_freq"].mean()
-        comp_run = comp_df["runtime"].mean()
-        comp_send = comp_df["send_freq"].mean()
-    else:
-        comp_rob = 1.0
-        comp_res = 1.0
-        comp_run = 1.0
-        comp_send = 1.0
-
-    rob_means = []
-    stderrs = []
-    sends = []
-    sends_err = []
-    reschedules = []
-    reschedules_err = []
-    runtimes = []
-    runtimes_err = []
-
-    if use_percents:
-        p = 100
-    else:
-        p = 1
-
-    for t in thresholds:
-        point = df.loc[df[thresh_name] == t]
-        mean = point["robustness"].mean() / comp_rob * p
-        rob_means.append(mean)
-        se = point["robustness"].sem() * p
-        stderrs.append(se * error_fac)
-        send_dat = point["send_freq"].mean() / comp_send * p
-        sends.append(send_dat)
-        send_err = point["send_freq"].sem() * p
-        sends_err.append(send_err * error_fac)
-        res = point["reschedule_freq"].mean() / comp_res * p
-        reschedules.append(res)
-        res_err = point["reschedule_freq"].sem() * p
-        reschedules_err.append(res_err * error_fac)
-        runtime = point["runtime"].mean() / comp_run * p
-        runtimes.append(runtime)
-        runtime_err = point["runtime"].sem() * p
-        runtimes_err.append(runtime_err * error_fac)
+    means = grid_means(df, [(thresh_name, thresholds)], comp_df=comp_df,
+                       error_fac=error_fac, use_percents=use_percents)
 
     class ThreshResponse(object):
         def __init__(self, robs, robs_err, sends, sends_err, res, res_err,
-                     runtimes):
+                     runtimes, runtimes_err):
             self.robs = robs
             self.robs_err = robs_err
             self.sends = sends
@@ -142,8 +209,11 @@ def threshold_means(df, thresh_name, thresholds, comp_df=None, error_fac=1.0,
             self.runtimes = runtimes
             self.runtimes_err = runtimes_err
 
-    return ThreshResponse(rob_means, stderrs, sends, sends_err, reschedules,
-                          reschedules_err, runtimes)
+    return ThreshResponse(*[means[col].tolist() for col in
+                            ("robustness", "robustness_err",
+                             "send_freq", "send_freq_err",
+                             "reschedule_freq", "reschedule_freq_err",
+                             "runtime", "runtime_err")])
 
 
 def find_thresholds(df: pd.DataFrame, threshold_name: str):
@@ -0,0 +1,120 @@
+"""Disk cache of results summaries, keyed by the results files they read.
+
+Loading and filtering a large sweep, and aggregating it into tables, takes
+far longer than plotting. A summary only depends on the contents of the
+results files it was computed from, so it is stored under a hash of those
+contents, and recomputed only once a file changes.
+
+Nothing is cached until ``set_cache_dir()`` is called.
+
+Usage:
+
+    set_cache_dir(".plotcache")
+    df = get_summary("frame", files, lambda: load_results(files))
+"""
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+
+CACHE_VERSION = 1
+"""Bump this whenever the summarising code changes its results."""
+CHUNK_SIZE = 1 << 20
+"""Bytes read at a time when hashing a results file."""
+
+_cache_dir = None
+_digests = {}
+"""Stores a dictionary of the form {(path, size, mtime): digest}"""
+
+
+def set_cache_dir(path):
+    """Store summaries in the folder at path. None turns caching off."""
+    global _cache_dir
+    _cache_dir = path
+
+
+def get_cache_dir():
+    """Returns the folder summaries are stored in, or None."""
+    return _cache_dir
+
+
+def file_digest(path) -> str:
+    """Returns the SHA-1 of the file's contents.
+
+    Digests are remembered for the life of the process, until the file's
+    size or modification time changes.
+    """
+    stat = os.stat(path)
+    stamp = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(stamp)
+    if digest is None:
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _digests[stamp] = digest
+    return digest
+
+
+def summary_key(name, files, params=None) -> str:
+    """Returns the cache key of a summary.
+
+    Args:
+        name (str): Name of the summary, e.g. "dream_table".
+        files (list): Paths of the results files it is computed from. Their
+            order does not matter.
+        params (optional): Anything else the summary depends on, with a
+            stable repr().
+    """
+    sha = hashlib.sha1("v{}:{}:{!r}".format(CACHE_VERSION, name, params)
+                       .encode("utf-8"))
+    for digest in sorted(file_digest(f) for f in files):
+        sha.update(digest.encode("utf-8"))
+    return sha.hexdigest()
+
+
+def get_summary(name, files, compute, params=None):
+    """Return a summary of the files, computing it only on a cache miss.
+
+    Args:
+        name (str): Name of the summary.
+        files (list): Paths of the results files it is computed from.
+        compute (function): Takes no arguments, and returns the summary.
+            Called on a cache miss, or whenever there is no cache folder.
+        params (optional): Anything else the summary depends on.
+    """
+    if _cache_dir is None:
+        return compute()
+    path = os.path.join(_cache_dir, "{}-{}.pickle".format(
+        name, summary_key(name, files, params)))
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    summary = compute()
+    _save(path, summary)
+    return summary
+
+
+def _save(path, summary):
+    """Atomically write a summary to the cache folder.
+
+    Write failures are ignored; the summary is then recomputed next time.
+    """
+    try:
+        os.makedirs(_cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(summary, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except OSError:
+        pass
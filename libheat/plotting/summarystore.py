@@ -0,0 +1,164 @@
+"""Incremental, pre-aggregated store of sweep results for plotting.
+
+Every figure and table only needs means and standard errors, which can be
+found from the count, sum and sum of squares of each metric. The store
+keeps those per (execution, ar_threshold, si_threshold, sc_threshold,
+sync_deg, stn_path), separately for each results file, so that adding or
+changing a file only reads that file again.
+
+summary() returns a "summary frame": one row per key, with the key columns
+and the "<metric>_n", "<metric>_sum" and "<metric>_sumsq" columns of each
+metric. The plotting functions accept summary frames wherever they accept
+results frames (see plot_utils.is_summary()). They are filtered the same
+way as plot_utils.framefilters() filters results.
+
+Usage:
+
+    store = SummaryStore("results.summary")
+    store.update(files)
+    store.save()
+    plot_syncvrobust(store.summary(files))
+"""
+
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .plot_utils import METRICS, STAT_SUFFIXES, MIN_SAMPLES, sync_degrees
+from .summarycache import file_digest
+
+
+STORE_VERSION = 1
+"""Bump this whenever summarise() changes its results."""
+KEYS = ["execution", "ar_threshold", "si_threshold", "sc_threshold",
+        "sync_deg", "stn_path"]
+"""Columns results are grouped by. Missing columns are left NaN."""
+
+
+def summarise(df) -> pd.DataFrame:
+    """Aggregate a frame of results into an unfiltered summary frame.
+
+    Besides the statistics of each metric, which only count results with
+    enough samples, "nonzero" counts every result with a robustness above
+    zero, for clearing STNs which never succeed.
+    """
+    df = df.assign(sync_deg=sync_degrees(df["stn_path"]))
+    for key in KEYS:
+        if key not in df.columns:
+            df[key] = np.nan
+    kept = (df["samples"] >= MIN_SAMPLES).to_numpy()
+    parts = {"nonzero": (~(df["robustness"] <= 0.0)).astype(int)}
+    for metric in METRICS:
+        values = df[metric].where(kept)
+        parts[metric + "_n"] = values.notna().astype(int)
+        parts[metric + "_sum"] = values.fillna(0.0)
+        parts[metric + "_sumsq"] = (values ** 2).fillna(0.0)
+    stats = pd.DataFrame(parts, index=df.index)
+    return stats.groupby([df[key] for key in KEYS],
+                         dropna=False).sum().reset_index()
+
+
+def combine(summaries) -> pd.DataFrame:
+    """Add up unfiltered summary frames into one."""
+    summaries = list(summaries)
+    if not summaries:
+        columns = KEYS + ["nonzero"] + [metric + suffix for metric in METRICS
+                                        for suffix in STAT_SUFFIXES]
+        return pd.DataFrame(columns=columns)
+    stats = pd.concat(summaries, ignore_index=True)
+    return stats.groupby(KEYS, dropna=False, sort=False).sum().reset_index()
+
+
+def filter_summary(stats) -> pd.DataFrame:
+    """Filter a summary frame as plot_utils.framefilters() filters results.
+
+    STNs which never succeed are dropped, as are keys without any result
+    with enough samples.
+    """
+    nonzero = stats.groupby("stn_path", dropna=False)["nonzero"] \
+        .transform("sum")
+    counted = stats[[metric + "_n" for metric in METRICS]].sum(axis=1)
+    return stats[(nonzero > 0) & (counted > 0)].reset_index(drop=True)
+
+
+class SummaryStore(object):
+    """Summaries of results files, kept up to date as the files change.
+
+    Attributes:
+        path (str): File the store is saved to, or None.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        # Stores a dictionary of the form
+        # {absolute file path: (digest, summary frame)}
+        self._files = {}
+        if path is not None and os.path.isfile(path):
+            self._load()
+
+    def update(self, files) -> list:
+        """Summarise every file which is new or has changed.
+
+        Args:
+            files (list): Paths of results CSV files.
+
+        Returns:
+            The paths which were read.
+        """
+        read = []
+        for f in files:
+            key = os.path.abspath(f)
+            digest = file_digest(f)
+            entry = self._files.get(key)
+            if entry is not None and entry[0] == digest:
+                continue
+            self._files[key] = (digest, summarise(pd.read_csv(f, header=0)))
+            read.append(f)
+        return read
+
+    def forget(self, files):
+        """Drop the summaries of these files."""
+        for f in files:
+            self._files.pop(os.path.abspath(f), None)
+
+    def summary(self, files=None) -> pd.DataFrame:
+        """Returns the filtered summary frame of the files.
+
+        Args:
+            files (list, optional): Paths of files to include. They must
+                have been update()d. Default is every file in the store.
+        """
+        if files is None:
+            keys = list(self._files)
+        else:
+            keys = [os.path.abspath(f) for f in files]
+        return filter_summary(combine(self._files[k][1] for k in keys))
+
+    def save(self):
+        """Atomically write the store to its path."""
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"version": STORE_VERSION, "files": self._files},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load(self):
+        """Read the store from its path. Unreadable or outdated stores are
+        started afresh."""
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return
+        if saved.get("version") == STORE_VERSION:
+            self._files = saved["files"]
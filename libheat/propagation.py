@@ -0,0 +1,57 @@
+"""Pluggable constraint propagation for simulations and SREA.
+
+Every backend tightens the existing edges of an STN to their shortest path
+distances, without creating edges, and reports whether the STN is
+consistent. They differ only in speed:
+
+* "johnson": Johnson's algorithm on the sparse distance graph (see
+  stntools.shortestpaths). The default.
+* "ppc": P3C over a cached chordal triangulation (see stntools.ppc).
+  Cheapest on sparse multi-agent plans.
+* "floyd_warshall": The original ``STN.floyd_warshall()``. O(V^3).
+
+Usage:
+
+    propagation.set_backend("ppc")
+    consistent = propagation.tighten(stn)
+"""
+
+from .stntools import ppc
+from .stntools import shortestpaths
+
+
+BACKENDS = {"johnson": shortestpaths.tighten,
+            "ppc": ppc.tighten,
+            "floyd_warshall": lambda stn: stn.floyd_warshall()}
+"""Available backends, by name."""
+DEFAULT_BACKEND = "johnson"
+
+_backend = DEFAULT_BACKEND
+
+
+def set_backend(name):
+    """Select the backend used by tighten().
+
+    Args:
+        name (str): A key of BACKENDS. None selects the default.
+    """
+    global _backend
+    if name is None:
+        name = DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError("Unknown propagation backend: {}".format(name))
+    _backend = name
+
+
+def get_backend() -> str:
+    """Returns the name of the selected backend."""
+    return _backend
+
+
+def tighten(stn) -> bool:
+    """Tighten the STN's edges in place with the selected backend.
+
+    Returns:
+        Whether the STN is consistent.
+    """
+    return BACKENDS[_backend](stn)
@@ -0,0 +1,78 @@
+"""Removal of past timepoints from an STN, as it is executed.
+
+A timepoint adds nothing to an STN once it has been executed, along with
+every timepoint it has an edge to (edges as stored, from i to j): its
+constraints on the future are then held by the edges with the zero
+timepoint. Simulator.remove_old_timepoints() finds such timepoints by
+looking at every one after each step, which scans every edge per
+timepoint. Pruner instead keeps, for each timepoint, the number of
+unexecuted timepoints it still has edges to, so each execution only
+updates the timepoints with an edge to it, and removes the timepoints
+which are ready together, through an index of their edges.
+
+Edges added after the Pruner is made are not counted, except edges with
+the zero timepoint, which is never removed and is executed first.
+
+Usage:
+
+    pruner = Pruner(stn)
+    ...  # execute vert_id in stn
+    pruner.executed(vert_id)
+    pruner.prune()
+"""
+
+Z_NODE_ID = 0
+
+
+class Pruner(object):
+    """Removes past timepoints from an STN.
+
+    Args:
+        stn (STN): The STN to remove timepoints from, in place.
+    """
+
+    def __init__(self, stn):
+        self.stn = stn
+        # Stores a dictionary of the form
+        # {vert id: number of edges to unexecuted timepoints}
+        self._waiting = {v: 0 for v in stn.verts}
+        # Stores a dictionary of the form {vert id: [from id, ...]}, one
+        # entry per edge to the timepoint.
+        self._from = {v: [] for v in stn.verts}
+        # Stores a dictionary of the form {vert id: [edge key, ...]}
+        self._edges = {v: [] for v in stn.verts}
+        for (i, j), e in stn.edges.items():
+            self._edges[i].append((i, j))
+            if i == j:
+                continue
+            self._edges[j].append((i, j))
+            self._from[j].append(i)
+            if not stn.verts[j].is_executed():
+                self._waiting[i] += 1
+        self._ready = [v for v in stn.verts if self._is_ready(v)]
+
+    def executed(self, vert_id):
+        """Note that a timepoint has been executed in the STN."""
+        for i in self._from.get(vert_id, ()):
+            self._waiting[i] -= 1
+            if self._waiting[i] == 0 and self._is_ready(i):
+                self._ready.append(i)
+        if self._is_ready(vert_id):
+            self._ready.append(vert_id)
+
+    def prune(self):
+        """Remove every timepoint which is ready from the STN."""
+        if not self._ready:
+            return
+        ready = [v for v in self._ready if v in self.stn.verts]
+        self._ready = []
+        keys = []
+        for v in ready:
+            keys += self._edges.pop(v, [])
+            keys += [(Z_NODE_ID, v), (v, Z_NODE_ID)]
+        self.stn.remove_vertices(ready, keys)
+
+    def _is_ready(self, vert_id) -> bool:
+        vert = self.stn.get_vertex(vert_id)
+        return vert_id != Z_NODE_ID and vert is not None \
+            and vert.is_executed() and self._waiting.get(vert_id) == 0
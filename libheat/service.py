@@ -0,0 +1,425 @@
+"""Online dispatch service, for an executive to report events to.
+
+A DispatchSession holds one PSTN while it is executed in the real world.
+The executive reports each event as it happens, and the session propagates
+it incrementally, reschedules with the chosen strategy (warm-starting SREA
+from the last guide's alpha), and answers with the events which can be
+dispatched next.
+
+serve() puts a session behind a local socket, a Unix socket or a localhost
+TCP port, speaking JSON lines. Every request is one JSON object on a line,
+with an "op" and the op's fields, and an optional "id" which is echoed in
+the response:
+
+    {"id": 1, "op": "execute", "vert": 3, "time": 1250.0}
+    {"id": 2, "op": "dispatch"}
+    {"id": 3, "op": "guide"}
+    {"id": 4, "op": "status"}
+    {"id": 5, "op": "metrics"}
+    {"id": 6, "op": "shutdown"}
+
+Every response is one JSON object on a line, with "ok", and either the
+op's results or an "error" message. Each response includes "latency", the
+seconds the request took, and "metrics" gives the count, mean and maximum
+latency of each op so far. Unbounded times are sent as null.
+
+Usage:
+
+    session = DispatchSession(stn, "drea")
+    asyncio.run(serve(session, path="/tmp/dispatch.sock"))
+
+    with ServiceClient(path="/tmp/dispatch.sock") as client:
+        print(client.request("execute", vert=3, time=1250.0))
+"""
+
+import math
+import json
+import time
+import socket
+import asyncio
+
+from . import srea
+from . import strategies
+from .montsim import Simulator, Z_NODE_ID
+from .incremental import IncrementalChecker
+from .pruning import Pruner
+from . import printers as pr
+
+
+DEFAULT_HOST = "127.0.0.1"
+"""Host the TCP server listens on. Only local connections are served."""
+LIMIT = 1 << 24
+"""Longest request line, in bytes."""
+
+
+class DispatchSession(Simulator):
+    """A PSTN being executed, as reported by an executive.
+
+    Times are relative to the zero timepoint, which is executed at 0 when
+    the session starts.
+
+    Args:
+        stn (STN): The plan. It is copied.
+        execution_strat (str, optional): Strategy to reschedule with, as in
+            Simulator.simulate(). Default "drea".
+        sim_options (dict, optional): Thresholds for the strategy.
+        warm_start (bool, optional): Start each SREA search at the last
+            guide's alpha. Default True.
+
+    Attributes:
+        alpha (float): Alpha of the current guide.
+        guide (STN): The guide being followed.
+        consistent (bool): Whether the plan was consistent to begin with.
+    """
+
+    def __init__(self, stn, execution_strat="drea", sim_options=None,
+                 warm_start=True):
+        super().__init__()
+        self.execution_strat = execution_strat
+        self.warm_start = warm_start
+        self.stn = stn.copy()
+        self.assignment_stn = stn.copy()
+        self.strategy = strategies.get_strategy(execution_strat)(self)
+        self._options = {"first_run": True,
+                         "executed_contingent": False,
+                         "executed_time": 0.0,
+                         "guide_min": 0.0,
+                         "guide_max": 0.0}
+        if sim_options is not None:
+            for key in ("si_threshold", "ar_threshold", "alp_threshold"):
+                if key in sim_options:
+                    self._options[key] = sim_options[key]
+
+        self._checker = IncrementalChecker(self.stn)
+        self.consistent = self._checker.propagate() \
+            and self._checker.assign(Z_NODE_ID, 0.0)
+        self._checker.commit()
+        self._pruner = Pruner(self.stn)
+        self._assign_timepoint(self.assignment_stn, Z_NODE_ID, 0.0)
+        self.alpha = 0.0
+        self.guide = self.stn
+        if self.consistent:
+            self.alpha, self.guide = self.strategy.guide(0.0, self.stn,
+                                                         self._options)
+        self._options["first_run"] = False
+
+    def execute(self, vert_id, at_time) -> dict:
+        """Record that an event happened.
+
+        An event which does not fit the plan is not recorded, and leaves the
+        session as it was.
+
+        Args:
+            vert_id (int): The event.
+            at_time (float): When it happened.
+
+        Returns:
+            A dictionary with "consistent", whether the event fitted the
+            plan, and if it did, "rescheduled", whether a new guide was made,
+            "alpha" and "dispatch" (see dispatch()).
+
+        Raises:
+            ValueError: If the event is unknown, or was already executed.
+        """
+        if vert_id not in self.assignment_stn.verts:
+            raise ValueError("Unknown event {}".format(vert_id))
+        if self.assignment_stn.get_vertex(vert_id).is_executed():
+            raise ValueError("Event {} was already executed"
+                             .format(vert_id))
+        # Executable events within their bounds always fit.
+        if (vert_id in self.assignment_stn.parent
+                or not self._checker.assign_in_bounds(vert_id, at_time)) \
+                and not self._checker.assign(vert_id, at_time):
+            self._checker.rollback()
+            pr.verbose("Event {} at {} does not fit the plan"
+                       .format(vert_id, at_time))
+            return {"consistent": False}
+        self._checker.commit()
+        self._assign_timepoint(self.assignment_stn, vert_id, at_time)
+        self._options["executed_contingent"] = \
+            vert_id in self.assignment_stn.parent
+        self._options["executed_time"] = at_time
+        self._options["guide_max"] = self.guide.get_edge_weight(0, vert_id)
+        self._options["guide_min"] = -self.guide.get_edge_weight(vert_id, 0)
+        if self.guide is not self.stn and vert_id in self.guide.verts:
+            self._assign_timepoint(self.guide, vert_id, at_time)
+        self._pruner.executed(vert_id)
+        self._pruner.prune()
+        self._current_time = max(self._current_time, at_time)
+
+        previous = self.guide
+        self.alpha, self.guide = self.strategy.guide(self.alpha, self.guide,
+                                                     self._options)
+        return {"consistent": True,
+                "rescheduled": self.guide is not previous,
+                "alpha": self.alpha,
+                "dispatch": self.dispatch()}
+
+    def dispatch(self) -> list:
+        """Returns the events which can be executed next.
+
+        An event can be executed once every event before it in the guide
+        has been. Contingent events are left out, as they happen on their
+        own.
+
+        Returns:
+            A list of {"vert", "earliest", "latest"} dictionaries, in order
+            of earliest time.
+        """
+        executed = {v for v, vert in self.assignment_stn.verts.items()
+                    if vert.is_executed()}
+        incoming = {}
+        for e in self.guide.get_all_edges():
+            incoming.setdefault(e.j, []).append(e)
+        ready = []
+        for vert_id in self.guide.verts:
+            if vert_id in executed or vert_id in self.assignment_stn.parent:
+                continue
+            preds = incoming.get(vert_id, [])
+            if not all(e.i in executed for e in preds):
+                continue
+            earliest = max([self.assignment_stn.get_assigned_time(e.i)
+                            + e.get_weight_min() for e in preds],
+                           default=0.0)
+            latest = self.guide.get_edge_weight(Z_NODE_ID, vert_id)
+            ready.append({"vert": vert_id,
+                          "earliest": max(earliest, self._current_time),
+                          "latest": latest})
+        ready.sort(key=lambda entry: (entry["earliest"], entry["vert"]))
+        return ready
+
+    def guide_bounds(self) -> list:
+        """Returns the guide's window for each event not yet executed.
+
+        Returns:
+            A list of {"vert", "earliest", "latest"} dictionaries, by event.
+        """
+        bounds = []
+        for vert_id in sorted(self.guide.verts):
+            if self.assignment_stn.get_vertex(vert_id).is_executed():
+                continue
+            bounds.append(
+                {"vert": vert_id,
+                 "earliest": -self.guide.get_edge_weight(vert_id, Z_NODE_ID),
+                 "latest": self.guide.get_edge_weight(Z_NODE_ID, vert_id)})
+        return bounds
+
+    def status(self) -> dict:
+        """Returns a summary of the session."""
+        remaining = sum(1 for vert in self.assignment_stn.verts.values()
+                        if not vert.is_executed())
+        return {"consistent": self.consistent,
+                "alpha": self.alpha,
+                "time": self._current_time,
+                "remaining": remaining,
+                "reschedules": self.num_reschedules,
+                "sent_schedules": self.num_sent_schedules}
+
+    def _run_srea(self):
+        """Run SREA on self.stn, starting from the current alpha."""
+        if self.warm_start and not self._options["first_run"]:
+            return srea.srea(self.stn, warm_alpha=self.alpha)
+        return srea.srea(self.stn)
+
+
+class DispatchServer(object):
+    """Answers JSON-line requests about one session.
+
+    Requests which use the session are answered one at a time, off the
+    event loop, so a slow reschedule never stops "metrics" being answered.
+
+    Args:
+        session (DispatchSession): The session to serve.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        # Stores a dictionary of the form {op: [count, total, maximum]}
+        self.latencies = {}
+        self._lock = asyncio.Lock()
+        self._stopped = asyncio.Event()
+        # Stores a dictionary of the form {open connection's writer: task}
+        self._connections = {}
+
+    async def handle(self, reader, writer):
+        """Answer every request on one connection."""
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while not reader.at_eof():
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than LIMIT. The rest of the stream is unusable.
+                    await self._reply(writer, {"ok": False,
+                                               "error": "Request too long"})
+                    break
+                if not line.strip():
+                    continue
+                response = await self.answer(line)
+                await self._reply(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[writer]
+            writer.close()
+
+    async def answer(self, line) -> dict:
+        """Returns the response to one request line."""
+        start = time.perf_counter()
+        request_id = None
+        op = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Requests must be JSON objects")
+            request_id = request.get("id")
+            op = request.get("op")
+            if op == "metrics":
+                response = {"metrics": self.metrics()}
+            elif op == "shutdown":
+                self._stopped.set()
+                response = {}
+            else:
+                loop = asyncio.get_running_loop()
+                async with self._lock:
+                    response = await loop.run_in_executor(
+                        None, self._call, op, request)
+            response["ok"] = True
+        except Exception as e:
+            # Report the error, and keep serving.
+            response = {"ok": False, "error": "{}: {}".format(
+                type(e).__name__, e)}
+        latency = time.perf_counter() - start
+        self._record(op, latency)
+        response["latency"] = latency
+        if request_id is not None:
+            response["id"] = request_id
+        return response
+
+    def metrics(self) -> dict:
+        """Returns {op: {"count", "mean", "max"}} of request latencies."""
+        return {op: {"count": count, "mean": total / count, "max": most}
+                for op, (count, total, most) in self.latencies.items()}
+
+    async def wait_stopped(self):
+        """Wait until a "shutdown" request."""
+        await self._stopped.wait()
+
+    async def close_connections(self):
+        """Close every open connection, once its responses are sent."""
+        tasks = list(self._connections.values())
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _call(self, op, request) -> dict:
+        """Run a session op. Raises ValueError for unknown ops."""
+        session = self.session
+        if op == "execute":
+            return session.execute(int(request["vert"]),
+                                   float(request["time"]))
+        if op == "dispatch":
+            return {"dispatch": session.dispatch()}
+        if op == "guide":
+            return {"alpha": session.alpha, "guide": session.guide_bounds()}
+        if op == "status":
+            return session.status()
+        raise ValueError("Unknown op {!r}".format(op))
+
+    def _record(self, op, latency):
+        if not isinstance(op, str):
+            op = "invalid"
+        entry = self.latencies.setdefault(op, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += latency
+        entry[2] = max(entry[2], latency)
+
+    @staticmethod
+    async def _reply(writer, response):
+        writer.write(json.dumps(_finite(response)).encode("utf-8") + b"\n")
+        await writer.drain()
+
+
+async def serve(session, path=None, host=DEFAULT_HOST, port=None,
+                ready=None):
+    """Serve a session until a "shutdown" request.
+
+    Args:
+        session (DispatchSession): Session to serve.
+        path (str, optional): Unix socket to listen on.
+        host (str, optional): Host to listen on, when not on a Unix socket.
+        port (int, optional): TCP port to listen on, when not on a Unix
+            socket. 0 picks a free port.
+        ready (function, optional): Called with the listening address once
+            the server is accepting connections.
+    """
+    server = DispatchServer(session)
+    if path is not None:
+        listener = await asyncio.start_unix_server(server.handle, path=path,
+                                                   limit=LIMIT)
+    elif port is not None:
+        listener = await asyncio.start_server(server.handle, host=host,
+                                              port=port, limit=LIMIT)
+    else:
+        raise ValueError("Give a Unix socket path or a TCP port")
+    async with listener:
+        if ready is not None:
+            ready(listener.sockets[0].getsockname())
+        await server.wait_stopped()
+        await server.close_connections()
+
+
+class ServiceClient(object):
+    """Blocking client of serve(), one request at a time.
+
+    Args:
+        path (str, optional): Unix socket to connect to.
+        host (str, optional): Host to connect to, when not on a Unix socket.
+        port (int, optional): TCP port to connect to.
+        timeout (float, optional): Seconds to wait for each response.
+    """
+
+    def __init__(self, path=None, host=DEFAULT_HOST, port=None,
+                 timeout=None):
+        if path is not None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = path
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (host, port)
+        self._sock.settimeout(timeout)
+        self._sock.connect(address)
+        self._file = self._sock.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, op, **fields) -> dict:
+        """Send one request, and return its response."""
+        self._next_id += 1
+        request = dict(fields, op=op, id=self._next_id)
+        self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("The service closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _finite(value):
+    """Replace infinite floats, which JSON can not hold, with None."""
+    if isinstance(value, float) and math.isinf(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_finite(v) for v in value]
+    return value
@@ -6,11 +6,19 @@ Authors: Jordan R Abrahams, Kyle Lund, Sam Dietrich
 """
 
 from math import floor, ceil
+import numpy as np
 import pulp
+from scipy import sparse
 
+from . import functiontimer
+from . import lpbackend
+from . import propagation
 from .stntools import STN
 from .stntools.distempirical import invcdf_norm, invcdf_uniform
 
+SOLUTION_DIGITS = 6
+"""Decimal places LP solutions are rounded to before use."""
+
 # \file SREA.py
 #
 #  \brief Runs the SREA algorithm on an input STN and computes the robustness
@@ -85,6 +93,188 @@ def setUpLP(stn, decouple):
     return (bounds, deltas, prob)
 
 
+def tighten_edges(stn) -> bool:
+    """Tighten every edge of the STN to its shortest path distance.
+
+    Gives the same result as ``stn.floyd_warshall()``, no edges are created,
+    but through the selected propagation backend (Johnson's algorithm by
+    default). Falls back to ``stn.floyd_warshall()`` if the STN has a
+    negative cycle.
+
+    Returns:
+        Whether the STN is consistent.
+    """
+    if propagation.tighten(stn):
+        return True
+    stn.floyd_warshall()
+    return False
+
+
+class SreaLP(object):
+    """The SREA LP of an STN, held as sparse matrices and solved for any
+    number of alphas.
+
+    This is the same LP as setUpLP() and srea_LP() build through PuLP. Only
+    the contingent equalities and the bounds on the deltas depend on alpha,
+    so solve() rewrites those and solves again, with the selected lpbackend.
+
+    Variables are ordered [t_v+ for each vertex v] + [t_v- for each v] +
+    [delta_ij, delta_ji for each contingent edge (i, j)].
+
+    Args:
+        stn (STN): STN to build the LP from. Should already be tightened
+            (see tighten_edges()), unless decoupling.
+        decouple (bool, optional): Only constrain interagent edges.
+        minimal (bool, optional): Leave out every edge constraint which is
+            implied by two others through a common event (a dominated edge).
+            This gives the same optima from a much smaller LP on tightened
+            STNs, which are close to complete.
+    """
+
+    def __init__(self, stn, decouple=False, minimal=False):
+        self.vert_ids = list(stn.verts.keys())
+        n = len(self.vert_ids)
+        self.n = n
+        index = {v: k for k, v in enumerate(self.vert_ids)}
+
+        hi = np.array([stn.get_edge_weight(0, v) for v in self.vert_ids],
+                      dtype=float)
+        lo = -np.array([stn.get_edge_weight(v, 0) for v in self.vert_ids],
+                       dtype=float)
+
+        # One row per directed edge constraint, t_j+ - t_i- <= w(i, j),
+        # gathered into a matrix of weights first.
+        weights = np.full((n, n), np.inf)
+        self.contingent = []
+        for (i, j), edge in stn.edges.items():
+            if (i, j) in stn.contingent_edges:
+                self.contingent.append(((i, j), edge))
+                continue
+            # Edges from zero are the bounds on the variables.
+            if i == 0:
+                continue
+            if decouple and (i, j) not in stn.interagent_edges:
+                continue
+            ii, jj = index[i], index[j]
+            weights[ii, jj] = min(weights[ii, jj], edge.Cij)
+            weights[jj, ii] = min(weights[jj, ii], edge.Cji)
+        if minimal:
+            _remove_dominated(weights, hi, lo, index.get(0))
+        from_idx, to_idx = np.nonzero(np.isfinite(weights))
+        rhs = weights[from_idx, to_idx]
+        m = len(rhs)
+
+        # t_v+ >= t_v-, then the edge constraints.
+        rows = np.concatenate([np.arange(n), np.arange(n),
+                               n + np.arange(m), n + np.arange(m)])
+        cols = np.concatenate([np.arange(n), n + np.arange(n),
+                               to_idx, n + from_idx])
+        vals = np.concatenate([-np.ones(n), np.ones(n),
+                               np.ones(m), -np.ones(m)])
+        num_vars = 2 * n + 2 * len(self.contingent)
+        A_ub = sparse.csr_matrix((vals, (rows, cols)),
+                                 shape=(n + m, num_vars))
+        b_ub = np.concatenate([np.zeros(n), rhs])
+
+        # Lund et al. LP (3) and (4), one pair of rows per contingent edge:
+        # t_j+ - t_i+ - delta_ij = p_ij and t_j- - t_i- + delta_ji = -p_ji
+        rows = []
+        cols = []
+        vals = []
+        for k, ((i, j), _) in enumerate(self.contingent):
+            d_ij = 2 * n + 2 * k
+            rows += [2 * k] * 3 + [2 * k + 1] * 3
+            cols += [index[j], index[i], d_ij,
+                     n + index[j], n + index[i], d_ij + 1]
+            vals += [1.0, -1.0, -1.0, 1.0, -1.0, 1.0]
+        A_eq = sparse.csr_matrix((vals, (rows, cols)),
+                                 shape=(2 * len(self.contingent), num_vars))
+
+        c = np.zeros(num_vars)
+        c[2 * n:] = 1.0
+        bounds = list(zip(lo, hi)) * 2 \
+            + [(0.0, None)] * (2 * len(self.contingent))
+        self.lp = lpbackend.LinearProgram(
+            c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq,
+            b_eq=np.zeros(2 * len(self.contingent)), bounds=bounds,
+            maximize=True)
+
+    @property
+    def num_constraints(self) -> int:
+        """Number of rows in the LP."""
+        return self.lp.A_ub.shape[0] + self.lp.A_eq.shape[0]
+
+    def set_alpha(self, alpha: float) -> bool:
+        """Rewrite the contingent constraints for the given alpha.
+
+        Returns:
+            False if the deltas cannot be bounded for this alpha, so the LP
+            is infeasible without solving it.
+        """
+        b_eq = self.lp.b_eq
+        bounds = self.lp.bounds
+        feasible = True
+        for k, (_, edge) in enumerate(self.contingent):
+            if edge.dtype() == "gaussian":
+                p_ij = invcdf_norm(1.0 - alpha * 0.5, edge.mu, edge.sigma)
+                p_ji = -invcdf_norm(alpha * 0.5, edge.mu, edge.sigma)
+                limit_ij = invcdf_norm(0.997, edge.mu, edge.sigma)
+                limit_ji = -invcdf_norm(0.003, edge.mu, edge.sigma)
+            elif edge.dtype() == "uniform":
+                p_ij = invcdf_uniform(1.0 - alpha * 0.5, edge.dist_lb,
+                                      edge.dist_ub)
+                p_ji = -invcdf_uniform(alpha * 0.5, edge.dist_lb,
+                                       edge.dist_ub)
+                limit_ij = invcdf_uniform(0.0, edge.dist_lb, edge.dist_ub)
+                limit_ji = -invcdf_uniform(1.0, edge.dist_lb, edge.dist_ub)
+            b_eq[2 * k] = p_ij
+            b_eq[2 * k + 1] = -p_ji
+            d_ij = 2 * self.n + 2 * k
+            bounds[d_ij] = (0.0, limit_ij - p_ij)
+            bounds[d_ij + 1] = (0.0, limit_ji - p_ji)
+            feasible = feasible and limit_ij >= p_ij and limit_ji >= p_ji
+        return feasible
+
+    def solve(self, alpha: float):
+        """Solve the LP for the given alpha.
+
+        Returns:
+            A dict of the form {event id: (t-, t+)}, or None if the LP is
+            infeasible.
+        """
+        if not self.set_alpha(round(float(alpha), 3)):
+            return None
+        result = lpbackend.solve(self.lp)
+        if not result.optimal:
+            return None
+        n = self.n
+        return {v: (float(result.x[k + n]), float(result.x[k]))
+                for k, v in enumerate(self.vert_ids)}
+
+
+def _remove_dominated(weights, hi, lo, zero):
+    """Drop dominated edge constraints from weights, in place.
+
+    The constraint t_j+ - t_i- <= w(i, j) follows from t_k+ - t_i- <= w(i, k)
+    and t_j+ - t_k- <= w(k, j) whenever w(i, k) + w(k, j) <= w(i, j), as
+    t_k+ >= t_k-. Bounds act as constraints to and from the zero timepoint.
+    Events are tried one at a time, so an edge is only dropped while both
+    of the edges implying it are still in place.
+    """
+    legs = weights.copy()
+    if zero is not None:
+        legs[zero, :] = np.minimum(legs[zero, :], hi)
+        legs[:, zero] = np.minimum(legs[:, zero], -lo)
+    n = len(weights)
+    for k in range(n):
+        implied = legs[:, k, None] + legs[None, k, :] <= weights
+        implied[k, :] = False
+        implied[:, k] = False
+        np.fill_diagonal(implied, False)
+        weights[implied] = np.inf
+        legs[implied] = np.inf
+
+
 ##
 # \fn srea(inputstn,debug=False,debugLP=False,lb=0.0,ub=0.999)
 # \brief Runs the SREA algorithm on an input STN
@@ -96,16 +286,23 @@ def setUpLP(stn, decouple):
 # @param debugLP Print optional status messages about each run of the LP
 # @param lb The starting lower bound on alpha for the binary search
 # @param ub The starting upper bound on alpha for the binary search
+# @param minimal Leave dominated edges out of the LP (see SreaLP)
+# @param warm_alpha A guess at the answer, such as the alpha of the last
+#     guide. The search starts there, and then widens, which takes fewer LPs
+#     than a cold search when alpha barely moves. The result is the same.
 #
 # @returns a tuple (alpha, outputstn) if there is a solution, or None if there
 #     is no solution
+@functiontimer.timed("srea")
 def srea(inputstn,
          debug=False,
          debugLP=False,
          returnAlpha=True,
          decouple=False,
          lb=0.0,
-         ub=0.999):
+         ub=0.999,
+         minimal=False,
+         warm_alpha=None):
     inputstn = inputstn.copy()
     # dictionary of alphas for binary search
     alphas = {i: i / 1000.0 for i in range(1001)}
@@ -118,9 +315,11 @@ def srea(inputstn,
 
     # set up LP
     if not decouple:
-        # TODO: Change to faster algorithm?
-        inputstn.floyd_warshall()
-    bounds, deltas, probBase = setUpLP(inputstn, decouple)
+        tighten_edges(inputstn)
+    lp = SreaLP(inputstn, decouple, minimal=minimal)
+
+    if warm_alpha is not None:
+        lower, upper, result = _warm_search(lp, warm_alpha, lower, upper)
 
     # First run binary search on alpha
     while upper - lower > 1:
@@ -129,12 +328,13 @@ def srea(inputstn,
             print('trying alpha = {}'.format(alpha))
 
         # run the LP
-        probContainer = (bounds, deltas, probBase.copy())
-        LPbounds = srea_LP(inputstn.copy(),
-                           alpha,
-                           decouple,
-                           debug=debugLP,
-                           probContainer=probContainer)
+        LPbounds = lp.solve(alpha)
+        if debugLP:
+            print('Status:', 'Optimal' if LPbounds is not None
+                  else 'Infeasible')
+            if LPbounds is not None:
+                for i, (t_lo, t_hi) in LPbounds.items():
+                    print('t_{} = [{}, {}]'.format(i, t_lo, t_hi))
 
         # LP was feasible, try lower alpha
         if LPbounds is not None:
@@ -144,33 +344,81 @@ def srea(inputstn,
         else:
             lower = (upper + lower) // 2
 
-        # finished our search, load the smallest alpha decoupling
-        if upper - lower <= 1:
-            if result is not None:
-                alpha, LPbounds = result
-                if debug:
-                    print(
-                        'modifying STN with lowest good alpha, {}'.format(alpha))
-                for i, sign in LPbounds:
-                    if sign == '+':
-                        inputstn.update_edge(
-                            0, i, ceil(bounds[(i, '+')].varValue))
-                    else:
-                        inputstn.update_edge(
-                            i, 0, ceil(-bounds[(i, '-')].varValue))
-
-                if returnAlpha:
-                    return alpha, inputstn
-                else:
-                    return inputstn
     # skip the rest if there was no decoupling at all
     if result is None:
         if debug:
             print('could not produce feasible LP.')
         return None
 
-    # Fail here
-    assert(False)
+    # finished our search, load the smallest alpha decoupling
+    alpha, LPbounds = result
+    if debug:
+        print('modifying STN with lowest good alpha, {}'.format(alpha))
+    # Solvers can leave tiny errors (e.g. 1e-10 instead of 0),
+    # which must not be rounded up to a whole millisecond.
+    for i, (t_lo, t_hi) in LPbounds.items():
+        inputstn.update_edge(0, i, ceil(round(t_hi, SOLUTION_DIGITS)))
+        inputstn.update_edge(i, 0, ceil(round(-t_lo, SOLUTION_DIGITS)))
+
+    if returnAlpha:
+        return alpha, inputstn
+    else:
+        return inputstn
+
+
+def _warm_search(lp, guess, lower, upper) -> tuple:
+    """Narrow srea()'s search for alpha, starting from a guess.
+
+    Tries the guess, then steps away from it in doubling steps until the
+    LP changes between feasible and infeasible. Feasibility only grows with
+    alpha, so the smallest feasible alpha is then between the last two.
+
+    Args:
+        lp (SreaLP): The LP to solve.
+        guess (float): Guess at the smallest feasible alpha.
+        lower (int): Thousandths of alpha known to be infeasible.
+        upper (int): Thousandths of alpha known to be feasible.
+
+    Returns:
+        A tuple of (lower, upper, result), where result is (alpha, bounds)
+        of the smallest feasible alpha tried, or None.
+    """
+    index = min(max(int(round(guess * 1000)), lower + 1), upper - 1)
+    if index <= lower:
+        return lower, upper, None
+    result = None
+    bounds = lp.solve(index / 1000.0)
+    if bounds is not None:
+        upper = index
+        result = (index / 1000.0, bounds)
+    else:
+        lower = index
+    step = 1
+    while upper - lower > 1:
+        if result is not None:
+            # Walk down until infeasible.
+            probe = upper - step
+            if probe <= lower:
+                break
+        else:
+            # Walk up until feasible.
+            probe = lower + step
+            if probe >= upper:
+                break
+        bounds = lp.solve(probe / 1000.0)
+        if bounds is not None:
+            if result is None:
+                upper = probe
+                result = (probe / 1000.0, bounds)
+                break
+            upper = probe
+            result = (probe / 1000.0, bounds)
+        else:
+            lower = probe
+            if result is not None:
+                break
+        step *= 2
+    return lower, upper, result
 
 
 # \fn srea_LP(inputstn,alpha,debug=False,probContainer=None)
@@ -255,11 +503,10 @@ def srea_LP(inputstn,
     # stack overflow suggested I put in this fix so I did.
     # https://stackoverflow.com/questions/27406858/pulp-solver-error
     # try:
-    prob.solve()
+    status = lpbackend.solve_pulp(prob)
     # except Exception:
     # return None
 
-    status = pulp.LpStatus[prob.status]
     if debug:
         print('Status:', status)
         # Each of the variables is printed with it's resolved optimum value
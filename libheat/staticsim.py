@@ -0,0 +1,180 @@
+"""Simulation of static strategies, for many samples at once.
+
+A static strategy (see strategies) follows its first guide whatever
+happens, and that guide is made before anything is sampled. So instead of
+running a Simulator per sample, simulate_batch() makes the guide once, and
+works out every sample's execution together with numpy:
+
+* An executable timepoint goes at the earliest time the guide allows it,
+  from when the timepoints before it went.
+* A contingent timepoint goes its sampled duration after its parent.
+
+A sample succeeds if those times meet every constraint of the plan, which
+is exactly when Simulator.simulate() succeeds with the same random seed.
+Guides this does not cover, where SREA failed or the guide's edges do not
+order the timepoints, are left to the Simulator.
+
+Usage:
+
+    result = simulate_batch(stn, "srea", seeds)
+    if result is not None:
+        sample_results, reschedules, sent_schedules = result
+"""
+
+import numpy as np
+
+from .montsim import Simulator, Z_NODE_ID
+from . import strategies
+from . import functiontimer
+
+
+DEFAULT_CHUNK_SIZE = 1024
+"""Number of samples worked out together, which bounds the memory used."""
+
+
+@functiontimer.timed("simulate_batch")
+def simulate_batch(starting_stn, execution_strat, random_seeds,
+                   sim_options=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Run one simulation per random seed, of a static strategy.
+
+    Args:
+        starting_stn (STN): The STN used to run in the simulations.
+        execution_strat (str): A static execution strategy.
+        random_seeds (list): Seed of each simulation, as given to
+            Simulator(). None seeds sample at random.
+        sim_options (dict, optional): Thresholds for the strategy.
+        chunk_size (int, optional): Number of samples to work out together.
+
+    Returns:
+        A tuple of (list of bools of how the simulations went, reschedules
+        of each simulation, sent schedules of each simulation), or None if
+        the simulations need a Simulator.
+
+    Raises:
+        ValueError: If the strategy is not static.
+    """
+    strategy_class = strategies.get_strategy(execution_strat)
+    if not strategy_class.static:
+        raise ValueError("Execution strategy '{}' is not static"
+                         .format(execution_strat))
+    if any(v.is_executed() for v in starting_stn.get_all_verts()):
+        return None
+
+    # Make the guide as Simulator.simulate() would.
+    sim = Simulator()
+    sim.stn = starting_stn.copy()
+    strategy = strategy_class(sim)
+    options = {"first_run": True,
+               "executed_contingent": False,
+               "executed_time": 0.0,
+               "guide_min": 0.0,
+               "guide_max": 0.0}
+    if sim_options is not None:
+        for key in ("si_threshold", "ar_threshold", "alp_threshold"):
+            if key in sim_options:
+                options[key] = sim_options[key]
+    with functiontimer.span("get_guide"):
+        _, guide = strategy.guide(0.0, sim.stn, options)
+    if guide is sim.stn:
+        # SREA failed, so the simulation STN itself is followed.
+        return None
+    plan = _dispatch_plan(guide)
+    if plan is None:
+        return None
+
+    columns = {v: k for k, v in enumerate(plan[0])}
+    # Sampled in the order Simulator.resample_stored_stn() samples in.
+    contingent = list(sim.stn.contingent_edges.items())
+    checks = _constraints(starting_stn, columns)
+    sample_results = []
+    for start in range(0, len(random_seeds), chunk_size):
+        seeds = random_seeds[start:start + chunk_size]
+        durations = {}
+        states = [np.random.RandomState(seed) for seed in seeds]
+        samples = np.array([[e.resample(state) for _, e in contingent]
+                            for state in states]).reshape(len(seeds), -1)
+        for k, (key, _) in enumerate(contingent):
+            durations[key] = samples[:, k]
+        times = _dispatch_times(plan, durations, len(seeds))
+        sample_results += _satisfied(times, checks).tolist()
+    count = len(random_seeds)
+    return (sample_results, [sim.num_reschedules] * count,
+            [sim.num_sent_schedules] * count)
+
+
+def _dispatch_plan(guide):
+    """Order the guide's timepoints, and note how each one is timed.
+
+    Returns:
+        A tuple of (vert ids, in an order where every timepoint comes after
+        the ones it waits for; dictionary of the form {vert id: (contingent
+        edge key, parent id) or [(predecessor id, minimum distance), ...]}),
+        or None if the guide's edges do not order the timepoints.
+    """
+    incoming = {v: [] for v in guide.verts}
+    for e in guide.get_all_edges():
+        incoming[e.j].append(e)
+    if incoming[Z_NODE_ID]:
+        return None
+
+    timing = {}
+    for v, edges in incoming.items():
+        if v in guide.parent:
+            e = guide.get_incoming_contingent(v)
+            timing[v] = ((e.i, e.j), e.i)
+            continue
+        preds = [(e.i, e.get_weight_min()) for e in edges]
+        if not all(np.isfinite(w) for _, w in preds):
+            return None
+        timing[v] = preds
+
+    # Kahn's algorithm; a timepoint is enabled once its predecessors went.
+    waiting = {v: len(edges) for v, edges in incoming.items()}
+    successors = {v: [] for v in guide.verts}
+    for e in guide.get_all_edges():
+        successors[e.i].append(e.j)
+    order = [v for v, n in waiting.items() if n == 0]
+    for v in order:
+        for j in successors[v]:
+            waiting[j] -= 1
+            if waiting[j] == 0:
+                order.append(j)
+    if len(order) != len(guide.verts):
+        return None
+    return order, timing
+
+
+def _dispatch_times(plan, durations, count):
+    """Returns a (count, timepoints) array of when each timepoint goes, with
+    columns in the plan's order."""
+    order, timing = plan
+    columns = {v: k for k, v in enumerate(order)}
+    times = np.zeros((count, len(order)))
+    for k, v in enumerate(order):
+        how = timing[v]
+        if isinstance(how, tuple):
+            key, parent = how
+            times[:, k] = times[:, columns[parent]] + durations[key]
+        elif how:
+            times[:, k] = np.max([times[:, columns[i]] + w for i, w in how],
+                                 axis=0)
+    return times
+
+
+def _constraints(stn, columns):
+    """Returns the STN's constraints as arrays of (from column, to column,
+    maximum distance, minimum distance)."""
+    edges = list(stn.get_all_edges())
+    return (np.array([columns[e.i] for e in edges], dtype=int),
+            np.array([columns[e.j] for e in edges], dtype=int),
+            np.array([e.Cij for e in edges], dtype=float),
+            np.array([-e.Cji for e in edges], dtype=float))
+
+
+def _satisfied(times, checks):
+    """Returns a bool array of which rows of times meet the constraints."""
+    i, j, upper, lower = checks
+    if len(i) == 0:
+        return np.ones(len(times), dtype=bool)
+    distances = times[:, j] - times[:, i]
+    return ((distances <= upper) & (distances >= lower)).all(axis=1)
@@ -3,6 +3,9 @@ from .stnjsontools import (load_stn_from_json,
                            load_stn_from_json_obj,
                            load_stn_from_json_file)
 from .mitparser import mit2stn
+from .stngenerator import generate_pstn
+from .stnbinary import save_stn_binary, load_stn_binary
+from .dispatchable import minimal_dispatchable
 
 __all__ = [
     "Vertex",
@@ -11,4 +14,8 @@ __all__ = [
     "load_stn_from_json",
     "load_stn_from_json_file",
     "load_stn_from_json_obj",
-    "mit2stn"]
+    "mit2stn",
+    "generate_pstn",
+    "save_stn_binary",
+    "load_stn_binary",
+    "minimal_dispatchable"]
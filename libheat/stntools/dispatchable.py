@@ -0,0 +1,77 @@
+"""Compiles guide STNs into a minimal dispatchable form.
+
+A guide is dispatched by ``Simulator.select_next_timepoint``, which enables
+an event once the events of all its incoming edges are executed, and
+schedules it no earlier than the lower bounds of those edges. An incoming
+edge p => i is dominated, and can be dropped without changing dispatch,
+when there is an event k with kept edges p => k and k => i such that:
+
+* k is an ordinary (non-contingent) event, so it is dispatched no earlier
+  than p's lower bound on it;
+* the lower bounds through k add up to at least the lower bound of p => i;
+* the upper bounds through k add up to at most the upper bound of p => i.
+
+i is then still enabled only after p (through k), and p's lower bound on i
+is implied by k's. Events are tried one at a time, so an edge is only
+dropped while both edges through k are in place.
+
+Edges from the zero timepoint and contingent edges are always kept.
+
+Usage:
+
+    guide = minimal_dispatchable(guide)
+"""
+
+import numpy as np
+
+from .stn import STN
+
+
+def dominated_edges(stn: STN) -> list:
+    """Returns the keys of the edges of stn which minimal_dispatchable()
+    would drop."""
+    vert_ids = list(stn.verts.keys())
+    index = {v: k for k, v in enumerate(vert_ids)}
+    n = len(vert_ids)
+    present = np.zeros((n, n), dtype=bool)
+    lower = np.full((n, n), -np.inf)
+    upper = np.full((n, n), np.inf)
+    for (i, j), edge in stn.edges.items():
+        if i == 0 or j == 0 or (i, j) in stn.contingent_edges:
+            continue
+        ii, jj = index[i], index[j]
+        present[ii, jj] = True
+        lower[ii, jj] = edge.get_weight_min()
+        upper[ii, jj] = edge.get_weight_max()
+    # Pairs stored in both directions are left alone.
+    both = present & present.T
+    removable = present & ~both
+
+    received = set(stn.received_timepoints)
+    for k, v in enumerate(vert_ids):
+        if v == 0 or v in received:
+            continue
+        through = present[:, k, None] & present[None, k, :]
+        through &= lower[:, k, None] + lower[None, k, :] >= lower
+        through &= upper[:, k, None] + upper[None, k, :] <= upper
+        through &= removable
+        through[k, :] = False
+        through[:, k] = False
+        present[through] = False
+        removable[through] = False
+    return [(i, j) for (i, j) in stn.edges
+            if i != 0 and j != 0 and (i, j) not in stn.contingent_edges
+            and not present[index[i], index[j]]]
+
+
+def minimal_dispatchable(stn: STN) -> STN:
+    """Returns a copy of stn with its dominated edges dropped.
+
+    The copy dispatches exactly as stn does, through fewer edges.
+    """
+    compiled = stn.copy()
+    for key in dominated_edges(stn):
+        del compiled.edges[key]
+        compiled.interagent_edges.pop(key, None)
+        compiled.requirement_edges.pop(key, None)
+    return compiled
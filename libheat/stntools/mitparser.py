@@ -1,9 +1,12 @@
 import json
+import re
 
 from libheat.stntools.stn import STN
 
 
 NO_AGENT = 0
+CHUNK_SIZE = 1 << 20
+"""Number of characters read from MIT files at a time."""
 
 
 def mit2stn(fp: str, add_z=False, connect_origin=False, cap=True) -> list:
@@ -19,18 +22,57 @@ def mit2stn(fp: str, add_z=False, connect_origin=False, cap=True) -> list:
     Returns:
         Returns an STN object made from the passed in file.
     """
+    return [instance_to_stn(name, arr, add_z=add_z,
+                            connect_origin=connect_origin, cap=cap)
+            for name, arr in iter_mit_instances(fp)]
+
+
+def iter_mit_instances(fp: str, chunk_size=CHUNK_SIZE):
+    """Yields the raw instances of an MIT JSON file, without building STNs.
+
+    The file is read incrementally, so only one instance is held in memory
+    at a time, however large the file is.
+
+    Args:
+        fp: File path for the JSON file.
+        chunk_size (int, optional): Characters to read from the file at once.
+
+    Yields:
+        (name, edge list) tuples, one per instance, in file order. Pass them
+        to instance_to_stn() to build the STN.
+    """
     with open(fp, "r") as f:
-        jo = json.loads(f.read())
-    stnlist = []
-    for inst in jo["instances"]:
-        # inst is an STP dict
-        for arr_name, arr in inst.items():
-            stn = _make_stn(arr, add_z, connect_origin)
-            stn.name = arr_name
-            if cap:
-                stn.cap_edges()
-            stnlist.append(stn)
-    return stnlist
+        stream = _JSONStream(f, chunk_size)
+        found = False
+        for key in stream.object_keys():
+            if key != "instances":
+                stream.value()
+                continue
+            found = True
+            for inst in stream.array_items():
+                # inst is an STP dict
+                for arr_name, arr in inst.items():
+                    yield arr_name, arr
+        if not found:
+            raise KeyError("instances")
+
+
+def instance_to_stn(name, arr, add_z=False, connect_origin=False, cap=True):
+    """Build an STN from one instance yielded by iter_mit_instances().
+
+    Args:
+        name (str): Name of the instance.
+        arr (list): MIT edges of the instance.
+        add_z (boolean, optional): Add an extra z timepoint to the STN.
+        connect_origin (boolean, optional): Connect every event to the z
+            timepoint.
+        cap (boolean, optional): Cap infinite edges.
+    """
+    stn = _make_stn(arr, add_z, connect_origin)
+    stn.name = name
+    if cap:
+        stn.cap_edges()
+    return stn
 
 
 def _make_stn(arr, add_z, connect_origin):
@@ -46,16 +88,20 @@ def _make_stn(arr, add_z, connect_origin):
         stn.add_vertex(0, None)
         event_count += 1
 
+    # Vertices created by the current MIT edge.
+    created = []
     for mit_edge in arr:
         start_name = mit_edge["start_event_name"]
         end_name = mit_edge["end_event_name"]
         if start_name not in name_to_id:
             name_to_id[start_name] = event_count
             stn.add_vertex(event_count, NO_AGENT)
+            created.append(event_count)
             event_count += 1
         if end_name not in name_to_id:
             name_to_id[end_name] = event_count
             stn.add_vertex(event_count, NO_AGENT)
+            created.append(event_count)
             event_count += 1
 
         dist = _get_dist(mit_edge)
@@ -71,10 +117,13 @@ def _make_stn(arr, add_z, connect_origin):
                          float("inf"),
                          distribution=dist)
 
+        # Only the new vertices can be missing an origin edge, since every
+        # older vertex was connected when it was created.
         if connect_origin:
-            for i in stn.verts.keys():
+            for i in created:
                 if not stn.edge_exists(0, i) and i != 0:
                     stn.add_edge(0, i, 0, float("inf"))
+        created.clear()
     return stn
 
 
@@ -103,3 +152,101 @@ def _get_dist(mit_edge):
     else:
         raise ValueError("Edge type not found: {}".format(edge_type))
     return dist
+
+
+class _JSONStream(object):
+    """Reads a JSON document from a file piece by piece.
+
+    Values are decoded with the standard json decoder, but only one value is
+    ever held in memory at a time, rather than the whole document.
+    """
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read more of the file into the buffer. Returns False at EOF."""
+        if self.eof:
+            return False
+        # Read at least as much as is buffered, so that decoding a large
+        # value is retried a logarithmic number of times.
+        rest = self.buf[self.pos:]
+        chunk = self.f.read(max(self.chunk_size, len(rest)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = rest + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace, and return the next character ('' at EOF)."""
+        while True:
+            self.pos = self._WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError("Expected '{}' in JSON, found '{}'"
+                             .format(char, found))
+        self.pos += 1
+
+    def value(self):
+        """Decode and return the next JSON value."""
+        self._peek()
+        while True:
+            try:
+                val, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the value is cut off by the end of the buffer.
+                if not self._fill():
+                    raise
+                continue
+            # A number which ends the buffer may continue in the next chunk.
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return val
+
+    def _items(self, close):
+        """Yields once per item until the close character, handling commas.
+        """
+        if self._peek() == close:
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self._peek() == ",":
+                self.pos += 1
+                continue
+            self._expect(close)
+            return
+
+    def object_keys(self):
+        """Yields the keys of the next JSON object.
+
+        The caller must consume the value of each key (e.g. with value())
+        before asking for the next key.
+        """
+        self._expect("{")
+        for _ in self._items("}"):
+            key = self.value()
+            self._expect(":")
+            yield key
+
+    def array_items(self):
+        """Yields the decoded items of the next JSON array, one at a time."""
+        self._expect("[")
+        for _ in self._items("]"):
+            yield self.value()
@@ -0,0 +1,170 @@
+"""STNs which store only their differences from a shared base STN.
+
+Every Monte-Carlo sample starts from the same STN, and changes little of
+it: the sampled durations, the events it executes, and the bounds those
+tighten. OverlaySTN reads everything else from a base STN, which any
+number of overlays (and threads) can share, so a sample's memory grows
+with what it changes rather than with the size of the instance.
+
+The base must not change while it has overlays. An overlay copies an edge
+or vertex of the base the first time it is changed through the STN's own
+methods: ``update_edge()``, ``execute()``, or ``own_edge()`` for callers
+that change an edge's weights directly. Changing an object found by
+reading (``get_edge()``, ``edges.values()``...) changes the base.
+
+Usage:
+
+    stn = OverlaySTN(base)
+    stn.update_edge(0, 1, 10.0)
+    stn.execute(1)
+    plain = stn.copy()  # An ordinary STN, with nothing shared.
+"""
+
+from collections.abc import ItemsView, MutableMapping, ValuesView
+
+from .stn import STN
+
+
+class OverlaySTN(STN):
+    """STN which reads from a base STN, and keeps its changes to itself.
+
+    Args:
+        base (STN): The STN to start from. It may itself be an overlay.
+    """
+
+    def __init__(self, base):
+        super().__init__()
+        self.base = base
+        self.verts = _Layer(base.verts)
+        self.edges = _Layer(base.edges)
+        self.parent = _Layer(base.parent)
+        self.received_timepoints = list(base.received_timepoints)
+        self.contingent_edges = _Layer(base.contingent_edges)
+        self.interagent_edges = _Layer(base.interagent_edges)
+        self.requirement_edges = _Layer(base.requirement_edges)
+        self.makespan = base.makespan
+        self.agents = list(base.agents)
+        self.name = base.name
+
+    def own_edge(self, edge):
+        """Returns this STN's own copy of edge, to change in place."""
+        key = (edge.i, edge.j)
+        if self.edges.is_own(key):
+            return self.edges[key]
+        own = self.edges[key].copy()
+        self.edges[key] = own
+        for kind in (self.contingent_edges, self.interagent_edges,
+                     self.requirement_edges):
+            if key in kind:
+                kind[key] = own
+        return own
+
+    def execute(self, nodeID):
+        if nodeID in self.verts and not self.verts.is_own(nodeID):
+            self.verts[nodeID] = self.verts[nodeID].copy()
+        super().execute(nodeID)
+
+    def changes(self) -> int:
+        """Returns the number of vertices and edges this STN holds itself,
+        rather than reads from its base."""
+        return self.verts.changes() + self.edges.changes()
+
+
+class _Layer(MutableMapping):
+    """Dictionary which reads through to a base dictionary, and keeps its
+    own changes.
+
+    Keys of the base keep their place in the iteration order when changed,
+    and keys added (or removed, then added again) come after them, as in
+    a copy of the base.
+    """
+
+    def __init__(self, base):
+        self._base = base
+        # Stores a dictionary of the form {base key: new value}
+        self._own = {}
+        # Stores a dictionary of the form {added key: value}
+        self._new = {}
+        # Stores a set of base keys which were removed.
+        self._gone = set()
+
+    def is_own(self, key) -> bool:
+        """Whether the value of key was set in this layer."""
+        return key in self._own or key in self._new
+
+    def changes(self) -> int:
+        """Returns the number of values set in this layer."""
+        return len(self._own) + len(self._new)
+
+    def __getitem__(self, key):
+        if key in self._own:
+            return self._own[key]
+        if key in self._new:
+            return self._new[key]
+        if key in self._gone:
+            raise KeyError(key)
+        return self._base[key]
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __contains__(self, key):
+        return key in self._own or key in self._new \
+            or (key not in self._gone and key in self._base)
+
+    def __setitem__(self, key, value):
+        if key in self._gone or key not in self._base:
+            self._new[key] = value
+        else:
+            self._own[key] = value
+
+    def __delitem__(self, key):
+        if key in self._new:
+            del self._new[key]
+        elif key in self._gone or key not in self._base:
+            raise KeyError(key)
+        else:
+            self._own.pop(key, None)
+            self._gone.add(key)
+
+    def __iter__(self):
+        if self._gone:
+            for key in self._base:
+                if key not in self._gone:
+                    yield key
+        else:
+            yield from self._base
+        yield from self._new
+
+    def __len__(self):
+        return len(self._base) - len(self._gone) + len(self._new)
+
+    def values(self):
+        return _Values(self)
+
+    def items(self):
+        return _Items(self)
+
+    def _items(self):
+        own = self._own
+        gone = self._gone
+        for key, value in self._base.items():
+            if key in gone:
+                continue
+            if key in own:
+                value = own[key]
+            yield key, value
+        yield from self._new.items()
+
+
+class _Values(ValuesView):
+    def __iter__(self):
+        for _, value in self._mapping._items():
+            yield value
+
+
+class _Items(ItemsView):
+    def __iter__(self):
+        return self._mapping._items()
@@ -0,0 +1,297 @@
+"""Partial path consistency (P3C) over a chordal triangulation of an STN.
+
+Path consistency over the complete graph (``STN.floyd_warshall()``) costs
+O(V^3). Enforcing it only over the triangles of a chordal graph that
+contains the STN's constraint graph gives the same, shortest path, weights
+on every edge of that graph (Bliek and Sam-Haroud, 1999). On the sparse
+plans we run, a good triangulation adds few edges.
+
+P3C (Planken et al., 2008) does so in two sweeps along the elimination
+ordering of the triangulation: a forward (directional path consistency)
+sweep, which also detects negative cycles, and a backward sweep. Each
+triangle is visited twice, so no propagation queue is needed.
+
+Triangulations only depend on the shape of the constraint graph, so they
+are cached. Simulations remove executed events from the STN as they go;
+a cached triangulation of the whole instance still covers those sub-STNs,
+and is restricted to their events instead of triangulating again.
+
+Usage:
+
+    if not tighten(stn):
+        print("Inconsistent")
+"""
+
+import heapq
+import threading
+
+from .shortestpaths import TOLERANCE
+from .stn import STN
+
+
+HEURISTICS = ("min_fill", "min_degree")
+"""Vertex elimination heuristics triangulate() accepts."""
+MAX_CACHED = 64
+"""Number of triangulations kept in the cache."""
+COVER_CHECKS = 4
+"""How many recent triangulations a cache miss tries to restrict."""
+
+_cache = {}
+"""Stores a dictionary of the form {graph key: Triangulation}"""
+_lock = threading.Lock()
+
+
+class Triangulation(object):
+    """A chordal graph, as a perfect elimination ordering of its vertices.
+
+    Attributes:
+        order (list): Vertex ids, in elimination order.
+        later (dict): {vertex id: list of neighbours later in the order}.
+            Each of these lists is a clique of the chordal graph.
+    """
+
+    def __init__(self, order, later):
+        self.order = order
+        self.later = later
+
+    @property
+    def fill_count(self) -> int:
+        """Number of edges in the chordal graph."""
+        return sum(len(nbrs) for nbrs in self.later.values())
+
+    def triangles(self):
+        """Yields every triangle as (v, a, b), where v is eliminated first."""
+        for v in self.order:
+            nbrs = self.later[v]
+            for x in range(len(nbrs)):
+                for y in range(x + 1, len(nbrs)):
+                    yield v, nbrs[x], nbrs[y]
+
+    def covers(self, vert_ids, pairs) -> bool:
+        """Whether the chordal graph contains these vertices and edges."""
+        position = self._positions()
+        for v in vert_ids:
+            if v not in position:
+                return False
+        for a, b in pairs:
+            if position[a] > position[b]:
+                a, b = b, a
+            if b not in self._later_sets()[a]:
+                return False
+        return True
+
+    def restrict(self, vert_ids):
+        """The triangulation induced on a subset of the vertices.
+
+        Induced subgraphs of chordal graphs are chordal, with the same
+        ordering, so nothing is recomputed.
+        """
+        keep = set(vert_ids)
+        order = [v for v in self.order if v in keep]
+        later = {v: [u for u in self.later[v] if u in keep] for v in order}
+        return Triangulation(order, later)
+
+    def _positions(self):
+        if not hasattr(self, "_position"):
+            self._position = {v: k for k, v in enumerate(self.order)}
+        return self._position
+
+    def _later_sets(self):
+        if not hasattr(self, "_later_set"):
+            self._later_set = {v: set(nbrs) for v, nbrs in self.later.items()}
+        return self._later_set
+
+
+def constraint_graph(stn: STN) -> tuple:
+    """Returns (vertex ids, set of undirected edges as sorted pairs)."""
+    pairs = set()
+    for i, j in stn.edges:
+        if i != j:
+            pairs.add((i, j) if i < j else (j, i))
+    return list(stn.verts.keys()), pairs
+
+
+def triangulate(stn: STN, heuristic="min_fill") -> Triangulation:
+    """Triangulate the constraint graph of the STN, without the cache.
+
+    Vertices are eliminated one at a time, greedily choosing the one which
+    adds the fewest fill edges ("min_fill") or has the fewest neighbours
+    ("min_degree"). Ties go to the lower degree, then the lower id.
+    """
+    vert_ids, pairs = constraint_graph(stn)
+    return _triangulate(vert_ids, pairs, heuristic)
+
+
+def _triangulate(vert_ids, pairs, heuristic):
+    if heuristic not in HEURISTICS:
+        raise ValueError("Unknown heuristic: {}".format(heuristic))
+    adj = {v: set() for v in vert_ids}
+    for a, b in pairs:
+        adj[a].add(b)
+        adj[b].add(a)
+
+    def score(v):
+        nbrs = adj[v]
+        if heuristic == "min_degree":
+            return (len(nbrs), v)
+        nbr_list = list(nbrs)
+        fill = 0
+        for x in range(len(nbr_list)):
+            adj_x = adj[nbr_list[x]]
+            for y in range(x + 1, len(nbr_list)):
+                if nbr_list[y] not in adj_x:
+                    fill += 1
+        return (fill, len(nbrs), v)
+
+    # Lazily updated heap; stale entries are skipped on the way out.
+    current = {v: score(v) for v in vert_ids}
+    heap = [(s, v) for v, s in current.items()]
+    heapq.heapify(heap)
+    order = []
+    later = {}
+    eliminated = set()
+    while heap:
+        s, v = heapq.heappop(heap)
+        if v in eliminated or current[v] != s:
+            continue
+        eliminated.add(v)
+        nbrs = adj.pop(v)
+        order.append(v)
+        later[v] = sorted(nbrs)
+        # Join the neighbours into a clique, then drop v.
+        for a in nbrs:
+            adj[a].discard(v)
+            adj[a].update(u for u in nbrs if u != a)
+        # Only scores of the neighbours, and their neighbours, can change.
+        touched = set(nbrs)
+        if heuristic == "min_fill":
+            for a in nbrs:
+                touched.update(adj[a])
+        for u in touched:
+            new = score(u)
+            if new != current[u]:
+                current[u] = new
+                heapq.heappush(heap, (new, u))
+    return Triangulation(order, later)
+
+
+def get_triangulation(stn: STN, heuristic="min_fill") -> Triangulation:
+    """Returns a triangulation covering the STN, from the cache if possible.
+
+    A cache miss first tries to restrict one of the most recently cached
+    triangulations (e.g. of the whole instance) to the STN's events, and
+    only triangulates from scratch if none covers it.
+    """
+    vert_ids, pairs = constraint_graph(stn)
+    key = (heuristic, frozenset(vert_ids), frozenset(pairs))
+    with _lock:
+        tri = _cache.get(key)
+        recent = list(_cache.items())[-COVER_CHECKS:]
+    if tri is not None:
+        return tri
+    for (other_heuristic, _, _), other in reversed(recent):
+        if other_heuristic == heuristic and other.covers(vert_ids, pairs):
+            tri = other.restrict(vert_ids)
+            break
+    else:
+        tri = _triangulate(vert_ids, pairs, heuristic)
+    with _lock:
+        _cache[key] = tri
+        while len(_cache) > MAX_CACHED:
+            del _cache[next(iter(_cache))]
+    return tri
+
+
+def clear_cache():
+    """Forget every cached triangulation."""
+    with _lock:
+        _cache.clear()
+
+
+def p3c(stn: STN, triangulation=None) -> dict:
+    """Run P3C on the STN.
+
+    Args:
+        stn (STN): STN to propagate. Not modified.
+        triangulation (Triangulation, optional): Triangulation covering the
+            STN. Default is get_triangulation(stn).
+
+    Returns:
+        A dict of the form {(a, b): shortest distance from a to b}, for
+        every edge of the chordal graph in both directions. None if the STN
+        has a negative cycle.
+    """
+    if triangulation is None:
+        triangulation = get_triangulation(stn)
+    inf = float("inf")
+    dist = {}
+    for v in triangulation.order:
+        for u in triangulation.later[v]:
+            dist[(v, u)] = inf
+            dist[(u, v)] = inf
+    for e in stn.edges.values():
+        if e.i == e.j:
+            continue
+        if e.Cij < dist[(e.i, e.j)]:
+            dist[(e.i, e.j)] = e.Cij
+        if e.Cji < dist[(e.j, e.i)]:
+            dist[(e.j, e.i)] = e.Cji
+    # Cycles which are negative only by rounding errors are not conflicts.
+    for (a, b), w in dist.items():
+        if w + dist[(b, a)] < -TOLERANCE:
+            return None
+
+    # Forward sweep: directional path consistency along the ordering.
+    for v, a, b in triangulation.triangles():
+        via = dist[(a, v)] + dist[(v, b)]
+        if via < dist[(a, b)]:
+            dist[(a, b)] = via
+        via = dist[(b, v)] + dist[(v, a)]
+        if via < dist[(b, a)]:
+            dist[(b, a)] = via
+        if dist[(a, b)] + dist[(b, a)] < -TOLERANCE:
+            return None
+
+    # Backward sweep: tighten each vertex's edges from its later cliques.
+    for v in reversed(triangulation.order):
+        nbrs = triangulation.later[v]
+        for a in nbrs:
+            for b in nbrs:
+                if a == b:
+                    continue
+                via = dist[(v, b)] + dist[(b, a)]
+                if via < dist[(v, a)]:
+                    dist[(v, a)] = via
+                via = dist[(a, b)] + dist[(b, v)]
+                if via < dist[(a, v)]:
+                    dist[(a, v)] = via
+    return dist
+
+
+def tighten(stn: STN, triangulation=None) -> bool:
+    """Tighten every edge of the STN to its shortest path distance, by P3C.
+
+    Like ``stn.floyd_warshall()``, no edges are created.
+
+    Returns:
+        Whether the STN is consistent. If it is not, the STN is left as it
+        was.
+    """
+    dist = p3c(stn, triangulation)
+    if dist is None:
+        return False
+    for e in stn.edges.values():
+        if e.i == e.j:
+            continue
+        # As in shortestpaths.tighten(), rounding errors are not tightened.
+        cij = e.Cij
+        if dist[(e.i, e.j)] < cij - TOLERANCE:
+            cij = dist[(e.i, e.j)]
+        cji = e.Cji
+        if dist[(e.j, e.i)] < cji - TOLERANCE:
+            cji = dist[(e.j, e.i)]
+        if cij != e.Cij or cji != e.Cji:
+            e = stn.own_edge(e)
+            e.Cij = cij
+            e.Cji = cji
+    return True
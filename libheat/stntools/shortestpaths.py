@@ -0,0 +1,198 @@
+"""Shortest paths over the distance graph of an STN, for sparse STNs.
+
+``STN.floyd_warshall()`` takes O(V^3) time whatever the number of edges.
+Plans with thousands of events have only a few constraints per event, so
+here the distance graph is held as a sparse matrix, and Johnson's algorithm
+is used instead: one Bellman-Ford pass from a virtual source reweights the
+edges to be non-negative, then Dijkstra runs from each source that is
+actually needed, in O(V E log V) time at worst. Both come from
+``scipy.sparse.csgraph``.
+
+A negative cycle means the STN is inconsistent. Functions here return None
+(or False) when they find one, rather than raising.
+
+Usage:
+
+    if not tighten(stn):
+        print("Inconsistent")
+    from_z = distances_from(stn, 0)
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import johnson, bellman_ford, NegativeCycleError
+
+from .stn import STN
+
+
+TOLERANCE = 1e-9
+"""Smallest change tighten() makes to a bound. Distances read back from
+Johnson's reweighting can be off in their last bits, and tightening by
+those errors would make the two bounds of an executed event differ."""
+
+
+def distance_graph(stn: STN, reverse=False) -> tuple:
+    """Build the distance graph of the STN as a sparse matrix.
+
+    Entry [a, b] is the weight of the distance graph edge a => b, an upper
+    bound on t_b - t_a. Parallel edges keep the smallest weight, and
+    infinite weights are left out.
+
+    Args:
+        stn (STN): STN to build the graph of.
+        reverse (bool, optional): Reverse every edge, for distances to a
+            vertex rather than from it.
+
+    Returns:
+        A tuple of (list of vertex ids, CSR matrix), where the list gives the
+        vertex id of each row and column.
+    """
+    vert_ids = list(stn.verts.keys())
+    index = {v: k for k, v in enumerate(vert_ids)}
+    edges = list(stn.edges.values())
+    tails = np.array([index[e.i] for e in edges]
+                     + [index[e.j] for e in edges], dtype=int)
+    heads = np.array([index[e.j] for e in edges]
+                     + [index[e.i] for e in edges], dtype=int)
+    weights = np.array([e.Cij for e in edges] + [e.Cji for e in edges],
+                       dtype=float)
+    if reverse:
+        tails, heads = heads, tails
+    finite = np.isfinite(weights)
+    tails, heads, weights = tails[finite], heads[finite], weights[finite]
+    # Building a CSR matrix sums duplicate entries, so keep the smallest.
+    n = len(vert_ids)
+    if len(weights):
+        order = np.lexsort((weights, heads, tails))
+        tails, heads, weights = tails[order], heads[order], weights[order]
+        first = np.ones(len(weights), dtype=bool)
+        first[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+        tails, heads, weights = tails[first], heads[first], weights[first]
+    # Zero weights are edges too, so they must be stored explicitly.
+    graph = sparse.csr_matrix((weights, (tails, heads)), shape=(n, n))
+    return vert_ids, graph
+
+
+def distance_matrix(stn: STN, sources=None) -> tuple:
+    """All pairs (or some sources) shortest paths, by Johnson's algorithm.
+
+    Args:
+        stn (STN): STN to find the distances of.
+        sources (list, optional): Vertex ids to compute rows for. Default is
+            every vertex.
+
+    Returns:
+        A tuple of (list of vertex ids, array), where row k of the array
+        holds the distances from the k-th source to every vertex, in the
+        order of the list. None if the STN has a negative cycle.
+    """
+    vert_ids, graph = distance_graph(stn)
+    if not vert_ids:
+        return vert_ids, np.zeros((0, 0))
+    indices = None
+    if sources is not None:
+        index = {v: k for k, v in enumerate(vert_ids)}
+        indices = [index[v] for v in sources]
+        if not indices:
+            return vert_ids, np.zeros((0, len(vert_ids)))
+    try:
+        dist = johnson(graph, directed=True, indices=indices)
+    except NegativeCycleError:
+        return None
+    return vert_ids, np.atleast_2d(dist)
+
+
+def distances_from(stn: STN, node_id) -> dict:
+    """Returns {vertex id: distance from node_id}, or None if the STN has a
+    negative cycle."""
+    result = distance_matrix(stn, sources=[node_id])
+    if result is None:
+        return None
+    vert_ids, dist = result
+    return dict(zip(vert_ids, dist[0].tolist()))
+
+
+def distances_to(stn: STN, node_id) -> dict:
+    """Returns {vertex id: distance to node_id}, or None if the STN has a
+    negative cycle."""
+    vert_ids, graph = distance_graph(stn, reverse=True)
+    index = vert_ids.index(node_id)
+    try:
+        dist = johnson(graph, directed=True, indices=[index])
+    except NegativeCycleError:
+        return None
+    return dict(zip(vert_ids, np.atleast_2d(dist)[0].tolist()))
+
+
+def potential(stn: STN) -> dict:
+    """A feasible potential for the distance graph of the STN.
+
+    The distance of every vertex from a virtual source joined to each vertex
+    by a zero edge, found with a single Bellman-Ford pass. For every edge
+    a => b of weight w, p[b] <= p[a] + w, so w + p[a] - p[b] is never
+    negative, and Dijkstra can run on those reweighted edges.
+
+    Returns:
+        A dict of the form {vertex id: potential}, or None if the STN has a
+        negative cycle.
+    """
+    vert_ids, graph = distance_graph(stn)
+    n = len(vert_ids)
+    if n == 0:
+        return {}
+    # The virtual source is vertex n, joined to every vertex by a zero edge.
+    graph = sparse.vstack([sparse.hstack([graph, sparse.csr_matrix((n, 1))]),
+                           sparse.csr_matrix((np.zeros(n),
+                                              (np.zeros(n, dtype=int),
+                                               np.arange(n))),
+                                             shape=(1, n + 1))]).tocsr()
+    try:
+        dist = bellman_ford(graph, directed=True, indices=[n])
+    except NegativeCycleError:
+        return None
+    return dict(zip(vert_ids, np.atleast_2d(dist)[0, :n].tolist()))
+
+
+def is_consistent(stn: STN) -> bool:
+    """Returns whether the STN has no negative cycle.
+
+    A single Bellman-Ford pass from a virtual source joined to every vertex,
+    so this is cheaper than finding any distances.
+    """
+    return potential(stn) is not None
+
+
+def tighten(stn: STN) -> bool:
+    """Tighten every edge of the STN to its shortest path distance.
+
+    The sparse counterpart of ``stn.floyd_warshall()``: no edges are
+    created, and only the rows for events with edges are computed.
+
+    Returns:
+        Whether the STN is consistent. If it is not, the STN is left as it
+        was.
+    """
+    edges = list(stn.edges.values())
+    sources = list(dict.fromkeys([e.i for e in edges] + [e.j for e in edges]))
+    result = distance_matrix(stn, sources=sources)
+    if result is None:
+        return False
+    vert_ids, dist = result
+    row = {v: k for k, v in enumerate(sources)}
+    col = {v: k for k, v in enumerate(vert_ids)}
+    for e in edges:
+        cij = _tightened(e.Cij, float(dist[row[e.i], col[e.j]]))
+        cji = _tightened(e.Cji, float(dist[row[e.j], col[e.i]]))
+        if cij != e.Cij or cji != e.Cji:
+            e = stn.own_edge(e)
+            e.Cij = cij
+            e.Cji = cji
+    return True
+
+
+def _tightened(bound, distance) -> float:
+    """Returns the bound tightened to distance, if that tightens it by more
+    than TOLERANCE."""
+    if distance < bound - TOLERANCE:
+        return distance
+    return bound
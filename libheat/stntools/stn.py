@@ -523,27 +523,41 @@ class STN(object):
     #  \param nodeID the ID of the node to be removed
 
     def remove_vertex(self, nodeID):
-        if nodeID in self.verts:
-            del self.verts[nodeID]
-
-            if nodeID in self.received_timepoints:
-                self.received_timepoints.remove(nodeID)
-            # Clear edges
-            toRemove = []
-            for i, j in self.edges:
-                if i == nodeID or j == nodeID:
-                    toRemove += [(i, j)]
-            for i, j in toRemove:
-                del self.edges[(i, j)]
-                if (i, j) in self.contingent_edges:
-                    del self.contingent_edges[(i, j)]
-                if (i, j) in self.interagent_edges:
-                    del self.interagent_edges[(i, j)]
-                if (i, j) in self.requirement_edges:
-                    del self.requirement_edges[(i, j)]
-
-            # self.tris = [t for t in self.tris
-            #             if t.i != nodeID and t.j != nodeID and t.k != nodeID]
+        self.remove_vertices([nodeID])
+
+    def remove_vertices(self, node_ids, edge_keys=None):
+        """Removes several vertices, and their edges, at once.
+
+        Args:
+            node_ids (iterable): IDs of the vertices to remove. IDs which are
+                not in the STN are ignored.
+            edge_keys (iterable, optional): Keys of at least every edge the
+                vertices have, such as from an index kept by the caller.
+                Keys of edges which no longer exist are ignored. If not
+                given, every edge is scanned for them.
+        """
+        removed = {v for v in node_ids if v in self.verts}
+        if not removed:
+            return
+        for v in removed:
+            del self.verts[v]
+        if any(v in removed for v in self.received_timepoints):
+            self.received_timepoints[:] = [v for v in self.received_timepoints
+                                           if v not in removed]
+        if edge_keys is None:
+            edge_keys = [(i, j) for i, j in self.edges
+                         if i in removed or j in removed]
+        for key in edge_keys:
+            if key not in self.edges or (key[0] not in removed
+                                         and key[1] not in removed):
+                continue
+            del self.edges[key]
+            self.contingent_edges.pop(key, None)
+            self.interagent_edges.pop(key, None)
+            self.requirement_edges.pop(key, None)
+
+        # self.tris = [t for t in self.tris
+        #             if t.i != nodeID and t.j != nodeID and t.k != nodeID]
 
     ##
     # \fn get_vertex
@@ -585,6 +599,14 @@ class STN(object):
     def get_all_edges(self):
         return list(self.edges.values())
 
+    def own_edge(self, edge):
+        """Returns the edge to change in place of edge, one of this STN's.
+
+        An STN's edges are its own, so this is edge itself. An
+        overlay.OverlaySTN shares edges with its base until they change.
+        """
+        return edge
+
     def get_edge_weight(self, i, j):
         """Gets the directed edge weight of an edge from the STN
 
@@ -651,7 +673,7 @@ class STN(object):
             return True
         if e.i == i and e.j == j:
             if w < e.Cij or force:
-                e.Cij = w
+                self.own_edge(e).Cij = w
                 return True
             else:
                 if equality:
@@ -659,7 +681,7 @@ class STN(object):
                 return False
         else:
             if w < e.Cji or force:
-                e.Cji = w
+                self.own_edge(e).Cji = w
                 return True
             else:
                 if equality:
@@ -0,0 +1,352 @@
+"""Compact binary (array) representation of STNs.
+
+An STN is stored as a handful of flat numpy arrays:
+
+* vertex ids, owners, locations and executed flags,
+* edge endpoints, Cij and Cji bounds, and distribution codes, where each code
+  indexes into a table of distribution names (-1 for no distribution).
+
+Building an STN from these arrays skips the per-call bookkeeping of
+``add_vertex``/``add_edge``, and writing the raw arrays to disk gives a
+format which loads without any JSON parsing. The JSON loader can cache these
+files next to the JSON (see ``cached_arrays_path``).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .stn import STN, Vertex, Edge
+
+
+FORMAT_VERSION = 1
+"""Bump this whenever the array layout changes, to invalidate caches."""
+CACHE_DIR = ".stncache"
+"""Name of the cache directory created next to cached JSON files."""
+
+_MAGIC = b"STNB"
+_ARRAY_DTYPES = [("vert_ids", np.int64),
+                 ("owners", np.int64),
+                 ("has_owner", np.bool_),
+                 ("locations", np.int64),
+                 ("has_location", np.bool_),
+                 ("executed", np.bool_),
+                 ("edge_i", np.int64),
+                 ("edge_j", np.int64),
+                 ("edge_cij", np.float64),
+                 ("edge_cji", np.float64),
+                 ("edge_dist", np.int32)]
+"""Numeric arrays of the binary format, in file order, with their dtypes."""
+
+
+def json_obj_to_arrays(jsonstn, using_pstn=True, from_millis=False) -> dict:
+    """Converts a JSON STN object into the array representation.
+
+    Args:
+        jsonstn (dict): JSON object of the STN (the problem_instances format).
+        using_pstn (bool, optional): Keep contingent distributions.
+        from_millis (bool, optional): Convert bounds from milliseconds.
+
+    Returns:
+        A dictionary of columns (as lists), see stn_from_arrays().
+    """
+    conv_fact = 0.001 if from_millis else 1
+    nodes = jsonstn["nodes"]
+    constraints = jsonstn["constraints"]
+
+    # The zero timepoint comes first, and owns nothing.
+    vert_ids = [0]
+    owners = [0]
+    has_owner = [False]
+    locations = [0]
+    has_location = [False]
+    executed = [False]
+    # Every vertex is bound to the zero timepoint by its domain.
+    edge_i = [0] * len(nodes)
+    edge_j = []
+    edge_cij = []
+    edge_cji = []
+    edge_dist = [-1] * (len(nodes) + len(constraints))
+
+    agents = []
+    dist_names = []
+    dist_codes = {}
+    for v in nodes:
+        owner = v["owner_id"]
+        if owner not in agents:
+            agents.append(owner)
+        vert_ids.append(v["node_id"])
+        owners.append(owner if owner is not None else 0)
+        has_owner.append(owner is not None)
+        location = v.get("location")
+        locations.append(location if location is not None else 0)
+        has_location.append(location is not None)
+        executed.append(bool(v.get("executed", False)))
+        edge_j.append(v["node_id"])
+        edge_cij.append(float(v["max_domain"]) * conv_fact)
+        edge_cji.append(-float(v["min_domain"]) * conv_fact)
+
+    for k, e in enumerate(constraints, start=len(nodes)):
+        edge_i.append(e["first_node"])
+        edge_j.append(e["second_node"])
+        edge_cij.append(float(e["max_duration"]) * conv_fact)
+        edge_cji.append(-float(e["min_duration"]) * conv_fact)
+        if "distribution" in e and using_pstn:
+            name = e["distribution"]["name"]
+            if name not in dist_codes:
+                dist_codes[name] = len(dist_names)
+                dist_names.append(name)
+            edge_dist[k] = dist_codes[name]
+
+    return {"vert_ids": vert_ids,
+            "owners": owners,
+            "has_owner": has_owner,
+            "locations": locations,
+            "has_location": has_location,
+            "executed": executed,
+            "edge_i": edge_i,
+            "edge_j": edge_j,
+            "edge_cij": edge_cij,
+            "edge_cji": edge_cji,
+            "edge_dist": edge_dist,
+            "dist_names": dist_names,
+            "agents": agents}
+
+
+def stn_to_arrays(stn: STN) -> dict:
+    """Converts an STN into the array representation."""
+    verts = stn.get_all_verts()
+    edges = stn.get_all_edges()
+    dist_names = []
+    dist_codes = {}
+    codes = []
+    for e in edges:
+        if e.distribution is None:
+            codes.append(-1)
+            continue
+        if e.distribution not in dist_codes:
+            dist_codes[e.distribution] = len(dist_names)
+            dist_names.append(e.distribution)
+        codes.append(dist_codes[e.distribution])
+    return {"vert_ids": [v.nodeID for v in verts],
+            "owners": [v.ownerID if v.ownerID is not None else 0
+                       for v in verts],
+            "has_owner": [v.ownerID is not None for v in verts],
+            "locations": [v.location if v.location is not None else 0
+                          for v in verts],
+            "has_location": [v.location is not None for v in verts],
+            "executed": [v.executed for v in verts],
+            "edge_i": [e.i for e in edges],
+            "edge_j": [e.j for e in edges],
+            "edge_cij": [e.Cij for e in edges],
+            "edge_cji": [e.Cji for e in edges],
+            "edge_dist": codes,
+            "dist_names": dist_names,
+            "agents": list(stn.agents)}
+
+
+def stn_from_arrays(arrays) -> STN:
+    """Builds an STN in bulk from the array representation.
+
+    Edges are classified into the contingent, interagent, and requirement
+    dictionaries exactly as ``STN.add_edge`` would, and are inserted in the
+    same order as they appear in the arrays.
+
+    Args:
+        arrays (dict): Columns (lists or numpy arrays) from
+            json_obj_to_arrays(), stn_to_arrays(), or load_stn_arrays().
+
+    Returns:
+        A new STN.
+    """
+    col = {k: _as_list(v) for k, v in arrays.items()}
+    stn = STN()
+    owner_of = {}
+    verts = stn.verts
+    for node_id, owner, has_owner, location, has_location, executed in zip(
+            col["vert_ids"], col["owners"], col["has_owner"],
+            col["locations"], col["has_location"], col["executed"]):
+        if not has_owner:
+            owner = None
+        vert = Vertex(node_id, owner, location if has_location else None)
+        vert.executed = executed
+        verts[node_id] = vert
+        owner_of[node_id] = owner
+
+    dist_names = col["dist_names"]
+    edges = stn.edges
+    contingent_edges = stn.contingent_edges
+    interagent_edges = stn.interagent_edges
+    requirement_edges = stn.requirement_edges
+    for i, j, cij, cji, code in zip(col["edge_i"], col["edge_j"],
+                                    col["edge_cij"], col["edge_cji"],
+                                    col["edge_dist"]):
+        if i not in owner_of or j not in owner_of:
+            raise ValueError("Vertex pair does not exist")
+        distribution = dist_names[code] if code >= 0 else None
+        edge = Edge(i, j, -cji, cij, distribution)
+        edges[(i, j)] = edge
+        if distribution is not None:
+            contingent_edges[(i, j)] = edge
+            stn.received_timepoints.append(j)
+            stn.parent[j] = i
+        elif (owner_of[i] != owner_of[j] and owner_of[i] is not None
+                and owner_of[j] is not None):
+            interagent_edges[(i, j)] = edge
+        else:
+            requirement_edges[(i, j)] = edge
+
+    stn.agents = col["agents"]
+    return stn
+
+
+def _as_list(column):
+    if isinstance(column, np.ndarray):
+        return column.tolist()
+    return list(column)
+
+
+def save_stn_arrays(arrays, filepath):
+    """Atomically write the array representation to filepath.
+
+    The file holds a magic string, a JSON header (format version,
+    distribution names, agents, and the dtype and length of each array),
+    and then the raw bytes of every numeric array back to back.
+
+    Raises:
+        ValueError: If a vertex location is not an integer.
+    """
+    if not _integer_locations(arrays):
+        raise ValueError("STN binary files only hold integer locations")
+    header = {"version": FORMAT_VERSION,
+              "dist_names": list(arrays["dist_names"]),
+              "agents": _as_list(arrays["agents"]),
+              "arrays": []}
+    payload = []
+    for name, dtype in _ARRAY_DTYPES:
+        data = np.ascontiguousarray(arrays[name], dtype=dtype)
+        header["arrays"].append((name, len(data)))
+        payload.append(data.tobytes())
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header_bytes).to_bytes(4, "little"))
+            f.write(header_bytes)
+            for chunk in payload:
+                f.write(chunk)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _integer_locations(arrays) -> bool:
+    """Whether every vertex location is an integer, as the format stores
+    them."""
+    for location, has_location in zip(arrays["locations"],
+                                      arrays["has_location"]):
+        if has_location and (isinstance(location, bool) or not isinstance(
+                location, (int, np.integer))):
+            return False
+    return True
+
+
+def load_stn_arrays(filepath) -> dict:
+    """Read the array representation written by save_stn_arrays().
+
+    Raises:
+        ValueError: If the file is not an STN binary file, or was written
+            with a different format version.
+    """
+    with open(filepath, "rb") as f:
+        content = f.read()
+    if content[:len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not an STN binary file: {}".format(filepath))
+    offset = len(_MAGIC)
+    header_len = int.from_bytes(content[offset:offset + 4], "little")
+    offset += 4
+    header = json.loads(content[offset:offset + header_len].decode("utf-8"))
+    offset += header_len
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError("STN binary format version mismatch")
+
+    dtypes = dict(_ARRAY_DTYPES)
+    arrays = {"dist_names": header["dist_names"],
+              "agents": header["agents"]}
+    for name, length in header["arrays"]:
+        dtype = np.dtype(dtypes[name])
+        arrays[name] = np.frombuffer(content, dtype=dtype, count=length,
+                                     offset=offset)
+        offset += dtype.itemsize * length
+    return arrays
+
+
+def save_stn_binary(stn: STN, filepath):
+    """Write an STN to filepath in the binary format."""
+    save_stn_arrays(stn_to_arrays(stn), filepath)
+
+
+def load_stn_binary(filepath) -> STN:
+    """Read an STN written by save_stn_binary()."""
+    return stn_from_arrays(load_stn_arrays(filepath))
+
+
+def cached_arrays_path(filepath, content, using_pstn=True,
+                       from_millis=False) -> str:
+    """Returns the cache file path for a JSON file's array representation.
+
+    The cache lives in a CACHE_DIR folder next to the JSON file, and its name
+    holds a hash of the JSON content and the loader options. Any change to
+    the JSON produces a different cache file.
+
+    Args:
+        filepath (str): Path of the JSON file.
+        content (bytes): Content of the JSON file.
+        using_pstn (bool, optional): Loader option.
+        from_millis (bool, optional): Loader option.
+    """
+    digest = hashlib.sha1(content)
+    digest.update("v{}:{}:{}".format(FORMAT_VERSION, using_pstn,
+                                     from_millis).encode())
+    directory, basename = os.path.split(os.path.abspath(filepath))
+    return os.path.join(directory, CACHE_DIR,
+                        "{}.{}.stnb".format(basename, digest.hexdigest()[:16]))
+
+
+def load_json_file_cached(filepath, using_pstn=True,
+                          from_millis=False) -> dict:
+    """Return the array representation of a JSON STN file, via the cache.
+
+    On a cache miss, the JSON is parsed and the arrays are written to the
+    cache. Cache write failures (e.g. read-only folders) are ignored, and
+    STNs with locations the format can not hold (anything but integers)
+    are not cached.
+    """
+    with open(filepath, "rb") as f:
+        content = f.read()
+    cache_path = cached_arrays_path(filepath, content, using_pstn=using_pstn,
+                                    from_millis=from_millis)
+    if os.path.isfile(cache_path):
+        try:
+            return load_stn_arrays(cache_path)
+        except (ValueError, OSError, KeyError):
+            pass
+    arrays = json_obj_to_arrays(json.loads(content.decode("utf-8")),
+                                using_pstn=using_pstn,
+                                from_millis=from_millis)
+    if not _integer_locations(arrays):
+        return arrays
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        save_stn_arrays(arrays, cache_path)
+    except OSError:
+        pass
+    return arrays
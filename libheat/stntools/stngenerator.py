@@ -0,0 +1,176 @@
+"""Generates synthetic PSTN instances for stress testing.
+
+Instances are produced in the same JSON format as the files in
+problem_instances, so they can be read with ``load_stn_from_json_obj``.
+
+Every agent owns a chain of events. Chain links are either contingent (with a
+gaussian or uniform distribution) or plain [0, inf] requirement edges.
+Interagent edges are [0, sync_window] constraints between events of
+different agents.
+
+Consistency is guaranteed by construction: a reference schedule is drawn
+first, and every constraint generated is satisfied by that schedule (with
+contingent edges taking their mean duration).
+"""
+
+import bisect
+import math
+import numpy as np
+
+
+GAUSSIAN = "gaussian"
+UNIFORM = "uniform"
+DISTRIBUTIONS = (GAUSSIAN, UNIFORM)
+
+MU_RANGE = (1.0, 10.0)
+"""Range of contingent means, in seconds."""
+SIGMA_RANGE = (0.5, 5.5)
+"""Range of gaussian standard deviations, in seconds."""
+WIDTH_RANGE = (1.0, 10.0)
+"""Range of uniform distribution widths, in seconds."""
+GAP_RANGE = (0, 2000)
+"""Range of reference delays between requirement-linked events, in ms."""
+
+
+def generate_pstn(agents=2, events_per_agent=10, sync_density=0.2,
+                  contingent_density=0.3, distributions=DISTRIBUTIONS,
+                  tightness=0.8, sync_window=10000, seed=None) -> dict:
+    """Generates a consistent PSTN, as a JSON object.
+
+    Args:
+        agents (int, optional): Number of agents.
+        events_per_agent (int, optional): Number of events each agent owns.
+        sync_density (float, optional): Fraction of events which get an
+            outgoing interagent constraint.
+        contingent_density (float, optional): Fraction of chain links which
+            are contingent.
+        distributions (iterable, optional): Distribution families to draw
+            contingent edges from. Any of "gaussian" and "uniform".
+        tightness (float, optional): Ratio of the reference schedule's finish
+            time to the makespan, in (0, 1]. A tightness of 1 leaves no slack
+            at the end of the plan.
+        sync_window (int, optional): Upper bound of interagent constraints,
+            in ms.
+        seed (int, optional): Random seed. The same seed and arguments always
+            produce the same instance.
+
+    Returns:
+        A dictionary with "nodes", "constraints", and "num_agents" keys.
+    """
+    if not 0.0 < tightness <= 1.0:
+        raise ValueError("tightness must be in (0, 1]")
+    for family in distributions:
+        if family not in DISTRIBUTIONS:
+            raise ValueError("Unknown distribution family: {}"
+                             .format(family))
+    distributions = list(distributions)
+    if contingent_density > 0.0 and not distributions:
+        raise ValueError("Contingent edges require a distribution family")
+
+    state = np.random.RandomState(seed)
+    nodes = []
+    constraints = []
+    # Reference time of each node, in ms.
+    times = {}
+    # Node ids of each agent, in chain order.
+    chains = []
+
+    node_id = 1
+    for agent in range(agents):
+        chain = []
+        current = float(state.randint(GAP_RANGE[0], GAP_RANGE[1] + 1))
+        for local_id in range(events_per_agent):
+            if chain:
+                prev = chain[-1]
+                if state.random_sample() < contingent_density:
+                    family = distributions[state.randint(len(distributions))]
+                    edge, duration = _contingent_edge(state, prev, node_id,
+                                                      family)
+                else:
+                    edge = {"first_node": prev,
+                            "second_node": node_id,
+                            "min_duration": 0,
+                            "max_duration": "inf"}
+                    duration = state.randint(GAP_RANGE[0], GAP_RANGE[1] + 1)
+                constraints.append(edge)
+                current += duration
+            times[node_id] = current
+            chain.append(node_id)
+            nodes.append({"node_id": node_id,
+                          "owner_id": agent,
+                          "local_id": local_id,
+                          "location": None,
+                          "min_domain": 0})
+            node_id += 1
+        chains.append(chain)
+
+    constraints += _sync_edges(state, chains, times, sync_density,
+                               sync_window)
+
+    finish = max(times.values()) if times else 0.0
+    makespan = int(math.ceil(finish / tightness))
+    for node in nodes:
+        node["max_domain"] = makespan
+
+    return {"nodes": nodes,
+            "constraints": constraints,
+            "num_agents": agents}
+
+
+def _contingent_edge(state, i, j, family):
+    """Returns a contingent constraint from i to j, and its mean duration in
+    milliseconds.
+    """
+    if family == GAUSSIAN:
+        mu = round(state.uniform(*MU_RANGE), 1)
+        sigma = round(state.uniform(*SIGMA_RANGE), 1)
+        name = "N_{}_{}".format(mu, sigma)
+        lower = 0
+        upper = int(math.ceil((mu + 4 * sigma) * 1000))
+        mean = mu * 1000
+    else:
+        lb = round(state.uniform(0.0, MU_RANGE[1]), 1)
+        ub = round(lb + state.uniform(*WIDTH_RANGE), 1)
+        name = "U_{}_{}".format(lb, ub)
+        lower = int(math.floor(lb * 1000))
+        upper = int(math.ceil(ub * 1000))
+        mean = (lb + ub) * 500
+    edge = {"first_node": i,
+            "second_node": j,
+            "min_duration": lower,
+            "max_duration": upper,
+            "distribution": {"type": "Empirical", "name": name}}
+    return edge, mean
+
+
+def _sync_edges(state, chains, times, sync_density, sync_window):
+    """Create [0, sync_window] interagent constraints that the reference
+    schedule satisfies.
+    """
+    if len(chains) < 2:
+        return []
+    # All events sorted by reference time, so that candidates within the
+    # window can be found with a binary search.
+    ordered = sorted(times, key=lambda n: (times[n], n))
+    ordered_times = [times[n] for n in ordered]
+    owner = {n: a for a, chain in enumerate(chains) for n in chain}
+
+    edges = []
+    existing = set()
+    for i in ordered:
+        if state.random_sample() >= sync_density:
+            continue
+        lo = bisect.bisect_left(ordered_times, times[i])
+        hi = bisect.bisect_right(ordered_times, times[i] + sync_window)
+        candidates = [j for j in ordered[lo:hi]
+                      if owner[j] != owner[i]
+                      and (i, j) not in existing and (j, i) not in existing]
+        if not candidates:
+            continue
+        j = candidates[state.randint(len(candidates))]
+        existing.add((i, j))
+        edges.append({"first_node": i,
+                      "second_node": j,
+                      "min_duration": 0,
+                      "max_duration": sync_window})
+    return edges
@@ -6,7 +6,8 @@
 
 import json
 import os.path
-from .stn import STN
+from .stnbinary import (json_obj_to_arrays, stn_from_arrays,
+                        load_json_file_cached)
 
 ##
 # \fn loadSTNfromjson
@@ -35,12 +36,22 @@ def load_stn_from_json(json_str, using_pstn=True):
 #
 # @param filepath Path of file to read in
 # @param reduction Triangulate the STN, I guess?
+# @param cache Keep a binary copy of the parsed STN in a .stncache folder next
+#   to the file, keyed by a hash of the file content. Later loads of the same
+#   content skip JSON parsing entirely.
 # @return Returns a dictionary that has the format
 #   {'stn' : STN, 'agent_count' : numAgents}
-def load_stn_from_json_file(filepath, using_pstn=True, from_millis=False):
-    with open(filepath, 'r') as f:
-        output_dict = load_stn_from_json(f.read(),
-                                         using_pstn=using_pstn)
+def load_stn_from_json_file(filepath, using_pstn=True, from_millis=False,
+                            cache=False):
+    if cache:
+        arrays = load_json_file_cached(filepath, using_pstn=using_pstn,
+                                       from_millis=from_millis)
+        output_dict = {'stn': stn_from_arrays(arrays)}
+    else:
+        with open(filepath, 'r') as f:
+            output_dict = load_stn_from_json_obj(json.loads(f.read()),
+                                                 using_pstn=using_pstn,
+                                                 from_millis=from_millis)
     output_dict["stn"].name = os.path.basename(filepath)
     return output_dict
 
@@ -56,53 +67,11 @@ def load_stn_from_json_file(filepath, using_pstn=True, from_millis=False):
 #   {'stn' : STN, 'agent_count' : numAgents}
 def load_stn_from_json_obj(jsonstn, using_pstn=True,
                            from_millis=False):
-    stn = STN()
-
-    # Add the root vertex and put it in the T_x set
-    stn.add_vertex(0, None, None)
-    agents = []
-
-    # specify conversion factor.
-    if from_millis:
-        conv_fact = 0.001
-    else:
-        conv_fact = 1
-
-    # Add the vertices
-    for v in jsonstn['nodes']:
-        # Accumulate a list of all the owners to retrieve the agents.
-        if not v['owner_id'] in agents:
-            agents.append(v['owner_id'])
-
-        # We don't necessarily need a location, just set it to None if we
-        # don't.
-        if not ('location' in v):
-            v['location'] = None
-
-        stn.add_vertex(v['node_id'], v['owner_id'],
-                       v['location'])
-
-        stn.add_edge(0, v['node_id'], float(v['min_domain']) * conv_fact,
-                     float(v['max_domain']) * conv_fact)
-        if 'executed' in v:
-            if v['executed']:
-                stn.execute(v['node_id'])
-
-    # Add the edges
-    for e in jsonstn['constraints']:
-        if 'distribution' in e and using_pstn:
-            stn.add_edge(e['first_node'],
-                         e['second_node'],
-                         float(e['min_duration']) * conv_fact,
-                         float(e['max_duration']) * conv_fact,
-                         e['distribution']['name'])
-        else:
-            stn.add_edge(e['first_node'],
-                         e['second_node'],
-                         float(e['min_duration']) * conv_fact,
-                         float(e['max_duration']) * conv_fact)
-
-    stn.agents = agents
+    # The STN is built in bulk from flat arrays, rather than through
+    # add_vertex/add_edge. Every node gets a Z edge from its domain.
+    stn = stn_from_arrays(json_obj_to_arrays(jsonstn,
+                                             using_pstn=using_pstn,
+                                             from_millis=from_millis))
 
     # if reduction:
     #    # Triangulate the STN
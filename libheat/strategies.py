@@ -0,0 +1,419 @@
+"""Execution strategies, which decide when a simulation gets a new guide.
+
+Each strategy is a class, registered by name in STRATEGIES. A simulation
+looks its strategy up once, with get_strategy(), and makes one instance of
+it, which holds the strategy's state for that simulation (such as how many
+contingent events it has seen since its last reschedule).
+
+Strategies also declare how they behave, so that runners can pick an
+engine for them without knowing them by name:
+
+* reschedules: whether they ever run SREA again after the first guide.
+* static: whether the first guide is followed for the whole simulation,
+  whatever happens. Such strategies can be simulated for many samples at
+  once, see staticsim.
+
+Adding a strategy only takes a subclass of Strategy, decorated with
+register().
+
+Usage:
+
+    strategy = get_strategy("drea-ar")(simulator)
+    alpha, guide = strategy.guide(alpha, guide, options)
+"""
+
+from . import printers as pr
+
+
+STRATEGIES = {}
+"""Registered strategy classes, by name."""
+
+
+def register(cls):
+    """Class decorator, which adds a Strategy to STRATEGIES."""
+    STRATEGIES[cls.name] = cls
+    return cls
+
+
+def get_strategy(name):
+    """Returns the Strategy class of an execution strategy.
+
+    Raises:
+        ValueError: If there is no strategy of that name.
+    """
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(("Execution strategy '{}'"
+                          " unknown").format(name)) from None
+
+
+class Strategy(object):
+    """Base class of execution strategies.
+
+    Strategies schedule from sim.stn, run SREA through sim._srea_wrapper()
+    or sim._run_srea(), and count what they do in sim.num_reschedules and
+    sim.num_sent_schedules.
+
+    Args:
+        sim (Simulator): The simulation the strategy picks guides for.
+    """
+
+    name = None
+    """Name of the strategy, as given to the simulators."""
+    reschedules = True
+    """Whether the strategy ever runs SREA after the first guide."""
+    static = False
+    """Whether the first guide is followed for the whole simulation."""
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def guide(self, previous_alpha, previous_guide, options) -> tuple:
+        """Retrieve the guide STN (dispatch) to follow next.
+
+        Args:
+            previous_alpha (float): The previously used guide STN's alpha.
+            previous_guide (STN): The previously used guide STN.
+            options (dict): The simulation's options, see
+                Simulator.simulate().
+
+        Returns:
+            Returns a tuple with format:
+            | [0]: Alpha of the guide.
+            | [1]: dispatch (type STN) which the simulator should follow,
+        """
+        raise NotImplementedError
+
+
+@register
+class Early(Strategy):
+    """Dispatches every event as early as possible, from the simulation's
+    own STN."""
+
+    name = "early"
+    reschedules = False
+
+    def guide(self, previous_alpha, previous_guide, options):
+        return 1.0, self.sim.stn
+
+
+@register
+class Srea(Strategy):
+    """Implements the SREA algorithm: one guide, made up front."""
+
+    name = "srea"
+    reschedules = False
+    static = True
+
+    def guide(self, previous_alpha, previous_guide, options):
+        if options["first_run"]:
+            return self.sim._srea_wrapper(previous_alpha, previous_guide)
+        # Not our first run, use the previous guide.
+        return previous_alpha, previous_guide
+
+
+@register
+class Drea(Strategy):
+    """Implements the DREA algorithm: reschedule after every contingent
+    event."""
+
+    name = "drea"
+
+    def guide(self, previous_alpha, previous_guide, options):
+        if options["first_run"] or options["executed_contingent"]:
+            ans = self.sim._srea_wrapper(previous_alpha, previous_guide)
+            pr.verbose("DREA Rescheduled, new alpha: {}".format(ans[0]))
+            return ans
+        return previous_alpha, previous_guide
+
+
+@register
+class DreaS(Strategy):
+    """Implements the SREA-S algorithm: reschedule once a contingent event
+    falls outside of its guide's bounds."""
+
+    name = "drea-s"
+
+    def guide(self, previous_alpha, previous_guide, options):
+        if options["first_run"]:
+            return self.sim._srea_wrapper(previous_alpha, previous_guide)
+        if options["executed_contingent"]:
+            next_time = options["executed_time"]
+            min_time = options["guide_min"]
+            max_time = options["guide_max"]
+            if (not (min_time <= next_time <= max_time)):
+                pr.verbose("Rescheduling! t={}, not in [{}, {}]"
+                           .format(next_time, min_time, max_time))
+                # We need to reschedule now.
+                return self.sim._srea_wrapper(previous_alpha,
+                                              previous_guide)
+            pr.verbose("Did not reschedule, t={} in [{}, {}]"
+                       .format(next_time, min_time, max_time))
+        return previous_alpha, previous_guide
+
+
+@register
+class DreaSi(Strategy):
+    """Implements the DREA-SI algorithm: only send a new guide if it
+    improves the chance of success by more than "si_threshold"."""
+
+    name = "drea-si"
+
+    def guide(self, previous_alpha, previous_guide, options):
+        sim = self.sim
+        if options["first_run"]:
+            result = sim._run_srea()
+            sim.num_reschedules += 1
+            sim.num_sent_schedules += 1
+            if result is None:
+                return previous_alpha, previous_guide
+            new_alpha = result[0]
+            maybe_guide = result[1]
+            pr.verbose("Got new drea-si guide with alpha={}".format(new_alpha))
+            return new_alpha, maybe_guide
+        # We should only run this algorithm *if* we recently executed
+        # a receieved/contingent timepoint.
+        if not options["executed_contingent"]:
+            return previous_alpha, previous_guide
+        # Reschedule
+        result = sim._run_srea()
+        sim.num_reschedules += 1
+        if result is None:
+            return previous_alpha, previous_guide
+        new_alpha = result[0]
+        maybe_guide = result[1]
+
+        # num_cont : Number of remaining unexecuted contingent events
+        num_cont = sim.remaining_contingent_count(maybe_guide)
+        p_0 = (1 - previous_alpha)**num_cont
+        p_1 = (1 - new_alpha)**num_cont
+        if p_1 - p_0 > options["si_threshold"]:
+            sim.num_sent_schedules += 1
+            pr.verbose("Got new drea-si guide with alpha={}".format(new_alpha))
+            return new_alpha, maybe_guide
+        else:
+            pr.verbose("Did not reschedule, p_0={}, p_1={}".format(p_0, p_1))
+            return previous_alpha, previous_guide
+
+
+@register
+class DreaAlp(Strategy):
+    """ Implements the DREA alpha difference algorithm, which is an attempt
+    to correct DREA-SI which has a fatal flaw of not rescheduling when
+    contingent events tend to differ.
+    """
+
+    name = "drea-alp"
+
+    def guide(self, previous_alpha, previous_guide, options):
+        sim = self.sim
+        if options["first_run"]:
+            sim.num_reschedules += 1
+            result = sim._run_srea()
+            if result is None:
+                return previous_alpha, previous_guide
+            new_alpha = result[0]
+            maybe_guide = result[1]
+            sim.num_sent_schedules += 1
+            pr.verbose("Got new drea-alp guide with alpha={}"
+                       .format(new_alpha))
+            return new_alpha, maybe_guide
+        # We should only run this algorithm *if* we recently executed
+        # a receieved/contingent timepoint.
+        if not options["executed_contingent"]:
+            return previous_alpha, previous_guide
+        # We are therefore actually running the algorithm.
+        result = sim._run_srea()
+        sim.num_reschedules += 1
+        if result is None:
+            return previous_alpha, previous_guide
+        new_alpha = result[0]
+        maybe_guide = result[1]
+
+        if abs(new_alpha - previous_alpha) > options["alp_threshold"]:
+            pr.verbose("Got new drea-alp guide with alpha={}"
+                       .format(new_alpha))
+            sim.num_sent_schedules += 1
+            return new_alpha, maybe_guide
+        else:
+            pr.verbose("Did not send reschedule, a0={}, a1={}"
+                       .format(previous_alpha, new_alpha))
+            return previous_alpha, previous_guide
+
+
+@register
+class DreaAr(Strategy):
+    """Implements the DREA-AR algorithm: reschedule once enough contingent
+    events have happened that the guide is likely to have failed.
+
+    Attributes:
+        contingent_event_counter (int): Contingent events since the last
+            reschedule.
+    """
+
+    name = "drea-ar"
+
+    def __init__(self, sim):
+        super().__init__(sim)
+        self.contingent_event_counter = 0
+
+    def guide(self, previous_alpha, previous_guide, options):
+        sim = self.sim
+        if options["executed_contingent"]:
+            self.contingent_event_counter += 1
+        if options["first_run"]:
+            result = sim._run_srea()
+            sim.num_reschedules += 1
+            if result is not None:
+                sim.num_sent_schedules += 1
+                return result[0], result[1]
+            else:
+                return previous_alpha, previous_guide
+        # We should only run this algorithm *if* we recently executed
+        # a received/contingent timepoint.
+        if not options["executed_contingent"]:
+            return previous_alpha, previous_guide
+
+        threshold = options["ar_threshold"]
+        # n is a placeholder for how much uncertainty we can take.
+        n = 0
+        attempts = 0
+        if threshold == 0:
+            n = float("inf")
+        else:
+            while (1 - previous_alpha)**(n + 1) > threshold and attempts < 100:
+                n += 1
+                attempts += 1
+
+        if self.contingent_event_counter >= n:
+            result = sim._run_srea()
+            sim.num_reschedules += 1
+            if result is not None:
+                pr.verbose("DREA-AR rescheduled our STN")
+                self.contingent_event_counter = 0
+                sim.num_sent_schedules += 1
+                return result[0], result[1]
+        return previous_alpha, previous_guide
+
+
+@register
+class DreaAra(Strategy):
+    """ Implements the DREA-ARA algorithm.
+
+    Written by Jordan...
+
+    Attributes:
+        successfactor (float): Estimated chance that the guide still holds.
+    """
+
+    name = "drea-ara"
+
+    def __init__(self, sim):
+        super().__init__(sim)
+        self.successfactor = 1.0
+
+    def guide(self, previous_alpha, previous_guide, options):
+        sim = self.sim
+        first_run = options["first_run"]
+        if not options["executed_contingent"] and not first_run:
+            return previous_alpha, previous_guide
+        in_bounds = (options["guide_min"] <= options["executed_time"]
+                     <= options["guide_max"])
+        pr.verbose("In bounds?: {}".format(in_bounds))
+        pr.verbose("{}, {}, {}".format(options["guide_min"],
+                                       options["executed_time"],
+                                       options["guide_max"]))
+        if first_run:
+            result = sim._run_srea()
+            sim.num_reschedules += 1
+            if result is not None:
+                sim.num_sent_schedules += 1
+                return result[0], result[1]
+            else:
+                return previous_alpha, previous_guide
+
+        successfactor = self.successfactor
+        if in_bounds:
+            self.successfactor *= 1.0 - previous_alpha
+        else:
+            self.successfactor = min(1.0 - previous_alpha,
+                                     previous_alpha / 2.0)
+
+        if successfactor <= options["ar_threshold"]:
+            result = sim._run_srea()
+            sim.num_reschedules += 1
+            if result is not None:
+                pr.verbose("DREA-AR rescheduled our STN")
+                self.successfactor = 1.0
+                sim.num_sent_schedules += 1
+                return result[0], result[1]
+        return previous_alpha, previous_guide
+
+
+@register
+class Arsi(Strategy):
+    """Implements the ARSI algorithm. This is now technically ARSC, not
+    ARSI anymore because we are doing a direct alpha comparsion.
+
+    Direct alpha comparison with absolute value allows considering cases
+    where we *do* see an increase in risk, rather than a decrease.
+
+    Attributes:
+        contingent_event_counter (int): Contingent events since the last
+            reschedule.
+    """
+
+    name = "arsi"
+
+    def __init__(self, sim):
+        super().__init__(sim)
+        self.contingent_event_counter = 0
+
+    def guide(self, previous_alpha, previous_guide, options):
+        sim = self.sim
+        if options["executed_contingent"]:
+            self.contingent_event_counter += 1
+        if options["first_run"]:
+            result = sim._run_srea()
+            sim.num_reschedules += 1
+            if result is not None:
+                sim.num_sent_schedules += 1
+                return result[0], result[1]
+            return previous_alpha, previous_guide
+        # We should only run this algorithm *if* we recently executed
+        # a received/contingent timepoint.
+        if not options["executed_contingent"]:
+            return previous_alpha, previous_guide
+        # AR SECTION ----------------------------------------------------------
+        # n is a placeholder for how much uncertainty we can take.
+        n = 0
+        attempts = 0  # Make sure we can actually escape if threshold = 0
+        while (1 - previous_alpha)**(n + 1) > options["ar_threshold"] \
+                and attempts < 100:
+            n += 1
+            attempts += 1
+        # Should we reschedule?
+        result = None
+        if self.contingent_event_counter >= n:
+            # Get a new schedule
+            pr.verbose("ARSC rescheduled...")
+            result = sim._run_srea()
+            sim.num_reschedules += 1
+        if result is None:
+            # Early exit if SREA failed OR if it's not time yet to reschedule
+            return previous_alpha, previous_guide
+        # SI SECTION ----------------------------------------------------------
+        new_alpha = result[0]
+        maybe_guide = result[1]
+
+        if abs(new_alpha - previous_alpha) >= options["si_threshold"]:
+            sim.num_sent_schedules += 1
+            pr.verbose("Got new ARSC guide with alpha={}".format(new_alpha))
+            self.contingent_event_counter = 0
+            return new_alpha, maybe_guide
+        else:
+            pr.verbose(("ARSC did not send schedule, previous_alpha={}, "
+                        + "new_alpha={}")
+                       .format(previous_alpha, new_alpha))
+            return previous_alpha, previous_guide
@@ -17,84 +17,57 @@ import os
 import argparse
 import matplotlib.pyplot as plt
 from matplotlib import rcParams
-import pandas as pd
 import numpy as np
 
 
-from libheat.plotting.plot_utils import framefilters
-from libheat.plotting.plot_arsc import plot_arsc_cross
-from libheat.plotting.plot_ara import plot_ara
-from libheat.plotting.plot_syncvrobust import plot_syncvrobust
-from libheat.plotting.plot_scatters import communication as com_scatter
-from libheat.plotting.plot_scatters import reschedules as res_scatter
+from libheat.plotting.plot_utils import load_results
+from libheat.plotting import summarycache
+from libheat.plotting.summarystore import SummaryStore
+from libheat.plotting import batch
 import libheat.plotting.dream_details as dream_details
 
 
-# Conversion between centimetres and US inches.
-CM2INCH = 0.393701
-# Default sizes in centimetres.
-DEFAULT_WIDTH = 12
-DEFAULT_HEIGHT = 6
-
-
 def main():
     # Setup -------------------------------------------------------------------
-    rcParams["font.family"] = "serif"
+    rcParams.update(batch.STYLE)
 
     args = parse_args()
-    full_df = None
+    summarycache.set_cache_dir(args.cache_dir)
     files = flatten_files(args.file)
-    for f in files:
-        if full_df is None:
-            full_df = pd.read_csv(f, header=0)
-        else:
-            df = pd.read_csv(f, header=0)
-            full_df = full_df.append(df, ignore_index=True, sort=True)
+    if args.batch is not None:
+        names = batch.NAMES if "all" in args.batch else args.batch
+        status = batch.render_batch(names, files,
+                                    lambda: load_frame(args, files),
+                                    args.output_dir, fmt=args.format,
+                                    workers=args.jobs, force=args.force)
+        for name, result in status.items():
+            print("{}: {}".format(name, result))
+        failed = [r for r in status.values()
+                  if r not in ("rendered", "unchanged")]
+        if failed:
+            raise SystemExit(1)
+        return
 
-    # Filter the samples
-    full_df = framefilters(full_df)
+    full_df = load_frame(args, files)
 
-    plt.figure(figsize=(CM2INCH*DEFAULT_WIDTH, CM2INCH*DEFAULT_HEIGHT))
-    ax = plt.gca()
-    ax.tick_params(bottom=True, top=True, left=True, right=True)
+    fig, ax = batch.new_figure()
 
     print(full_df["stn_path"].nunique())
 
-    if args.syncvrobust:
-        plot_syncvrobust(full_df, errorbars=True)
-    elif args.reschedules:
+    selected = [name for name in batch.NAMES if getattr(args, name)]
+    if args.reschedules and not args.syncvrobust:
         plot_threshold(full_df, "si")
-    elif args.dream_cross_section:
-        # Plot a cross section of the DREAM data.
-        #ax.set_title("DREAM Threshold SC Analysis (m_AR = 1)")
-        #plot_arsc_cross(full_df, ar_threshold=1.0, ax=ax, plot_srea=True,
-        #                threshold_range=[0.0, 0.0625, 0.125, 0.25, 0.5, 1])
-        ax.set_title("DREAM Threshold AR Analysis (m_SC = 0)")
-        plot_arsc_cross(full_df, sc_threshold=0.0, ax=ax, plot_srea=True,
-                        threshold_range=[0.0, 0.0625, 0.125, 0.25, 0.5, 1])
-        #plot_arsc_cross(full_df, sc_threshold=0.0, ax=ax, plot_srea=True)
-    elif args.ara_threshold:
-        ax.set_title("DREA-AR Alternate")
-        plot_ara(full_df, ax=ax, plot_srea=True)
-    elif args.table:
-        dream_details.dream_table(full_df)
-        return
-    elif args.gain_table:
-        dream_details.dream_gain_table(full_df)
+    elif selected and selected[0] == "table":
+        table = summarycache.get_summary(
+            "dream_table", files,
+            lambda: dream_details.dream_table(full_df))
+        print(table)
         return
-    elif args.gain_table_q2:
-        dream_details.dream_gain_table_q2(full_df)
+    elif selected and selected[0] in batch.TABLES:
+        batch.TABLES[selected[0]](full_df)
         return
-    elif args.best_ar:
-        dream_details.dream_best_ar(full_df)
-        return
-    elif args.best_sc:
-        dream_details.dream_best_sc(full_df)
-        return
-    elif args.com_scatter:
-        com_scatter(full_df)
-    elif args.res_scatter:
-        res_scatter(full_df)
+    elif selected:
+        batch.FIGURES[selected[0]](full_df, ax)
 
     if args.output is None:
         plt.show()
@@ -102,6 +75,19 @@ def main():
         plt.savefig(args.output)
 
 
+def load_frame(args, files):
+    """Load the results of the files, as chosen by the arguments."""
+    if args.store is not None:
+        # Only read files which are new or changed since the last run.
+        store = SummaryStore(args.store)
+        if store.update(files):
+            store.save()
+        return store.summary(files)
+    # Read and filter the samples, unless the files are unchanged.
+    return summarycache.get_summary("frame", files,
+                                    lambda: load_results(files))
+
+
 def flatten_files(files):
     """Check all files in the provided list. If a directory, recurse on
         on those files.
@@ -357,7 +343,34 @@ def parse_args():
                             +" scatter plot, as shown in Abrahams et al.")
     parser.add_argument("-o", "--output", type=str, default=None,
                         help="Output file name")
-    return parser.parse_args()
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Store filtered results and tables in this"
+                        + " folder, keyed by the contents of the files,"
+                        + " so later runs over unchanged files skip them.")
+    parser.add_argument("--store", type=str, default=None,
+                        help="Keep running sums of the results in this file,"
+                        + " and plot from those. Only new or changed files"
+                        + " are read.")
+    parser.add_argument("--batch", nargs="+", default=None,
+                        choices=batch.NAMES + ["all"], metavar="NAME",
+                        help="Render these figures and tables (or 'all') to"
+                        + " --output-dir in parallel, skipping those whose"
+                        + " files are unchanged. Choices: "
+                        + ", ".join(batch.NAMES) + ".")
+    parser.add_argument("--output-dir", type=str, default="figures",
+                        help="Folder --batch renders into.")
+    parser.add_argument("--format", type=str, default="pdf",
+                        help="File format of --batch figures.")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Worker processes for --batch. Default is one"
+                        + " per CPU.")
+    parser.add_argument("--force", action="store_true",
+                        help="Make --batch render unchanged figures too.")
+    args = parser.parse_args()
+    if args.store is not None and args.reschedules:
+        parser.error("--reschedules needs every result, so can not be used"
+                     " with --store")
+    return args
 
 
 if __name__ == "__main__":
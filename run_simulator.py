@@ -21,18 +21,25 @@ try:
 except AssertionError:
     print("Simulations must be run with Python3 or a later version.")
 
-import os
-import os.path
 import time
+import fnmatch
 import multiprocessing
 import argparse
 import numpy as np
 
 
 from libheat import functiontimer
-from libheat.stntools import load_stn_from_json_file, mitparser
+from libheat import instancesource
 from libheat.montsim import Simulator
 from libheat.dmontsim import DecoupledSimulator
+from libheat.eventsim import EventSimulator
+from libheat import eventsim
+from libheat import dmontsim
+from libheat.decoupling import decouplecache
+from libheat import lpbackend
+from libheat import propagation
+from libheat import strategies
+from libheat import staticsim
 import libheat.printers as pr
 import libheat.parseindefinite
 from libheat import sim2csv
@@ -56,12 +63,24 @@ def main():
         pr.set_verbosity(1)
         pr.verbose("Verbosity set to: 1")
 
+    profiling = args.profile or args.profile_output is not None
+    functiontimer.set_enabled(profiling)
+    decouplecache.set_cache_dir(args.decouple_cache)
+    lpbackend.set_backend(args.lp_backend)
+    propagation.set_backend(args.propagation)
+
     sim_count = args.samples
 
     sim_options = {"ar_threshold": args.ar_threshold,
                    "alp_threshold": args.si_threshold,
-                   "si_threshold": args.si_threshold}
-    
+                   "si_threshold": args.si_threshold,
+                   "compile_guides": args.compile_guides,
+                   "async_reschedule": args.async_reschedule,
+                   "event_driven": args.event_driven,
+                   "message_delay": args.message_delay,
+                   "compute_scale": args.compute_scale,
+                   "batch_static": not args.no_batch}
+
     # Check to see if we need to create the ordering pairs from the parsed
     # user input.
 
@@ -71,8 +90,14 @@ def main():
     else:
         ordering_pairs = None
 
+    path_filter = None
+    if args.match is not None:
+        def path_filter(path):
+            return fnmatch.fnmatch(path, args.match)
+
     # simulate across multiple paths.
-    stn_paths = folder_harvest(args.stns, recurse=True, only_json=True)
+    stn_paths = instancesource.iter_stn_paths(args.stns, recurse=True,
+                                              only_json=True)
     across_paths(stn_paths, args.execution, args.threads, sim_count,
                  sim_options,
                  output=args.output,
@@ -81,15 +106,27 @@ def main():
                  mitparse=args.mit_parse,
                  start_index=args.start_point,
                  stop_index=args.stop_point,
-                 ordering_pairs=ordering_pairs)
+                 ordering_pairs=ordering_pairs,
+                 stn_cache=args.stn_cache,
+                 path_filter=path_filter)
+
+    if profiling:
+        print("Time spent per function:")
+        print(functiontimer.summary_table())
+        if args.profile_output is not None:
+            functiontimer.write_folded(args.profile_output)
+            print("Wrote folded stacks to: {}".format(args.profile_output))
 
 
 def across_paths(stn_paths, execution, threads, sim_count, sim_options,
                  output=None, live_updates=True, random_seed=None,
                  mitparse=False, start_index=0, stop_index=None,
-                 ordering_pairs=None):
+                 ordering_pairs=None, stn_cache=False, path_filter=None):
     """Runs multiple simulations for each STN in the provided iterable.
 
+    STNs are loaded one at a time, as they are needed, so stn_paths may be a
+    generator (see instancesource.iter_stn_paths).
+
     Args:
         stn_paths (iterable): iterable (like a List) of strings.
         execution (str): Execution strategy to use on each STN.
@@ -103,48 +140,50 @@ def across_paths(stn_paths, execution, threads, sim_count, sim_options,
         mitparse (boolean, optional): Parse STN JSON files as MIT format.
         ordering_pairs (list, optional): List of tuples of AR and SC settings.
             Each STN will be run with a separate simulation for each tuple.
+        stn_cache (boolean, optional): Keep binary copies of parsed STN JSON
+            files next to them, and reuse them on later runs.
+        path_filter (function, optional): Takes a path, and returns whether
+            to run on it. Applied before start_index and stop_index.
     """
-    stn_pairs = []
-    # Collect the STNs from all the passed in paths
-    # Make sure we keep the path around though, and keep them in the pair.
-    for i, path in enumerate(stn_paths):
-        if mitparse:
-            mitstns = mitparser.mit2stn(path, add_z=True, connect_origin=True)
-            stn_pairs += [(path, k) for k in mitstns]
-        else:
-            stn = load_stn_from_json_file(path)["stn"]
-            stn_pairs.append((path, stn))
-
-    # We must separate these for loops because MIT stns can hold several
-    # instances in a single file.
-    for i, pair in enumerate(stn_pairs):
-        if i < start_index:
-            continue
-        if stop_index is not None:
-            if i >= stop_index:
-                break
+    stn_paths = list(stn_paths)
+    instances = instancesource.iter_instances(stn_paths, mitparse=mitparse,
+                                              start_index=start_index,
+                                              stop_index=stop_index,
+                                              path_filter=path_filter,
+                                              stn_cache=stn_cache)
+    # Listing the paths is cheap, and gives the progress total without
+    # loading any instances. MIT files hold an unknown number each.
+    stn_count = None
+    if not mitparse:
+        stn_count = sum(1 for path in stn_paths
+                        if path_filter is None or path_filter(path))
+
+    # Parse the next STN in the background while this one simulates.
+    for i, path, stn in instancesource.prefetch(instances):
+        pair = (path, stn)
         if ordering_pairs is not None:
             for j, execution_setting in enumerate(ordering_pairs):
                 sim_option_instance = sim_options.copy()
                 sim_option_instance["ar_threshold"] = execution_setting[0]
                 sim_option_instance["si_threshold"] = execution_setting[1]
                 results_dict = _run_stage(pair, execution, sim_count, threads,
-                                      random_seed, sim_option_instance)
+                                          random_seed, sim_option_instance)
                 if live_updates:
+                    total = None
+                    if stn_count is not None:
+                        total = stn_count * len(ordering_pairs)
                     _print_results(results_dict,
-                                   j + len(ordering_pairs)*i + 1,
-                                   len(stn_pairs)*len(ordering_pairs))
-                
+                                   j + len(ordering_pairs)*i + 1, total)
+
                 if output is not None:
                     sim2csv.save_csv_row(results_dict, output)
-    
-        
+
         else:
             results_dict = _run_stage(pair, execution, sim_count, threads,
                                       random_seed, sim_options)
             if live_updates:
-                _print_results(results_dict, i + 1, len(stn_pairs))
-            
+                _print_results(results_dict, i + 1, stn_count)
+
             if output is not None:
                 sim2csv.save_csv_row(results_dict, output)
 
@@ -201,6 +240,16 @@ def _run_stage(pair, execution, sim_count, threads, random_seed, sim_options):
     results_dict["contingent_density"] = cont_dens
     results_dict["reschedule_freq"] = sum(reschedules)/len(reschedules)
     results_dict["send_freq"] = sum(sent_schedules)/len(sent_schedules)
+    if "messages" in response_dict:
+        messages = response_dict["messages"]
+        makespans = response_dict["makespans"]
+        results_dict["message_delay"] = sim_options["message_delay"]
+        results_dict["message_freq"] = sum(messages)/len(messages)
+        results_dict["makespan"] = sum(makespans)/len(makespans)
+    if sim_options.get("async_reschedule"):
+        stale = response_dict["stale_schedules"]
+        results_dict["compute_scale"] = sim_options["compute_scale"]
+        results_dict["stale_freq"] = sum(stale)/len(stale)
 
     return results_dict
 
@@ -230,7 +279,10 @@ def _print_results(results_dict, i, stn_count):
     print("    Sync Density: {}".format(results_dict["synchronous_density"]))
     print("    Resc Freq: {}".format(results_dict["reschedule_freq"]))
     print("    Send Freq: {}".format(results_dict["send_freq"]))
-    print("    Total Progress: {}/{}".format(i, stn_count))
+    if stn_count is not None:
+        print("    Total Progress: {}/{}".format(i, stn_count))
+    else:
+        print("    Total Progress: {}".format(i))
     print("-"*79)
 
 
@@ -258,20 +310,48 @@ def multiple_simulations(starting_stn, execution_strat,
     * "reschedules": A list of ints counting how many reschedules a sim took.
     * "sent_schedules": A list of ints counting how many schedules were sent
       for each sim.
+
+    Event-driven simulations (sim_options["event_driven"], except for the
+    "da" strategy) also have:
+
+    * "messages": A list of ints counting the messages between agents.
+    * "makespans": A list of the times each sim finished at.
+
+    With sim_options["async_reschedule"], the dictionary also has:
+
+    * "stale_schedules": A list of ints counting how many guides were
+      dropped, as events went differently while they were computed.
+
+    Static strategies (such as "srea") are simulated for all samples at
+    once with staticsim.simulate_batch(), unless
+    sim_options["batch_static"] is False or the runs are event-driven.
     """
-    # Each thread needs its own simulator, otherwise the progress of one thread
-    # can overwrite the progress of another
     print("Random seed is: {}".format(random_seed))
     if random_seed is not None:
         seed_gen = np.random.RandomState(random_seed)
         seeds = [seed_gen.randint(MAX_SEED) for i in range(count)]
-        tasks = _make_simulator_tasks(seeds, starting_stn,
-                                      execution_strat, sim_options,
-                                      count)
     else:
-        tasks = _make_simulator_tasks(None, starting_stn,
-                                      execution_strat, sim_options,
-                                      count)
+        seeds = None
+
+    if _batches(execution_strat, sim_options):
+        batch = staticsim.simulate_batch(starting_stn, execution_strat,
+                                         seeds or [None] * count,
+                                         sim_options)
+        if batch is not None:
+            print("Simulating all samples at once")
+            return {"sample_results": batch[0], "reschedules": batch[1],
+                    "sent_schedules": batch[2],
+                    "stale_schedules": [0] * count}
+
+    # Each thread needs its own simulator, otherwise the progress of one thread
+    # can overwrite the progress of another
+    tasks = _make_simulator_tasks(seeds, starting_stn, execution_strat,
+                                  sim_options, count)
+
+    if execution_strat == "da":
+        # Decouple once up front, so every sample (and every worker
+        # process) shares the same decoupling.
+        dmontsim.decouple(starting_stn, decouple_type=DEFAULT_DECOUPLE)
 
     if threads > 1:
         print("Using multithreading; threads = {}".format(threads))
@@ -280,7 +360,17 @@ def multiple_simulations(starting_stn, execution_strat,
             try_count += 1
             response = None
             try:
-                with multiprocessing.Pool(threads) as pool:
+                # Fork the workers while no STN is being prefetched.
+                with instancesource.paused():
+                    pool = multiprocessing.Pool(
+                        threads,
+                        initializer=_init_worker,
+                        initargs=(functiontimer.is_enabled(),
+                                  decouplecache.get_cache_dir(),
+                                  decouplecache.snapshot(),
+                                  _chosen_lp_backend(),
+                                  propagation.get_backend()))
+                with pool:
                     response = pool.map(_multisim_thread_helper, tasks)
                 break
             except BlockingIOError:
@@ -296,12 +386,36 @@ def multiple_simulations(starting_stn, execution_strat,
     sample_results = [r[0] for r in response]
     reschedules = [r[1] for r in response]
     sent_schedules = [r[2] for r in response]
+    # Pool workers time themselves, so bring those timings back here.
+    for r in response:
+        functiontimer.merge(r[3])
     # Package the response into a nice dict to send back.
     response_dict = {"sample_results": sample_results, "reschedules":
                      reschedules, "sent_schedules": sent_schedules}
+    if response and response[0][4] is not None:
+        response_dict["messages"] = [r[4][0] for r in response]
+        response_dict["makespans"] = [r[4][1] for r in response]
+    response_dict["stale_schedules"] = [r[5] for r in response]
     return response_dict
 
 
+def _chosen_lp_backend():
+    """Returns the name of the chosen LP backend, or None for the default."""
+    if lpbackend.is_chosen():
+        return lpbackend.get_backend().name
+    return None
+
+
+def _init_worker(profiling, decouple_dir, decouplings, lp_backend,
+                 propagation_backend):
+    """Set up a pool worker process with the parent's settings."""
+    functiontimer.set_enabled(profiling)
+    lpbackend.set_backend(lp_backend)
+    propagation.set_backend(propagation_backend)
+    decouplecache.set_cache_dir(decouple_dir)
+    decouplecache.merge(decouplings)
+
+
 def _make_simulator_tasks(seeds, stn, execution_strat, sim_options, count):
     """Helper function to generate a list of tasks for the thread pool"""
     if seeds is not None:
@@ -311,8 +425,8 @@ def _make_simulator_tasks(seeds, stn, execution_strat, sim_options, count):
                       sim_options, i)
                      for i in range(count)]
         else:
-            tasks = [(Simulator(seeds[i]), stn, execution_strat,
-                      sim_options, i)
+            tasks = [(_simulator_class(sim_options)(seeds[i]), stn,
+                      execution_strat, sim_options, i)
                      for i in range(count)]
     else:
         if execution_strat == "da":
@@ -321,12 +435,28 @@ def _make_simulator_tasks(seeds, stn, execution_strat, sim_options, count):
                       sim_options, i)
                      for i in range(count)]
         else:
-            tasks = [(Simulator(None), stn, execution_strat,
-                      sim_options, i)
+            tasks = [(_simulator_class(sim_options)(None), stn,
+                      execution_strat, sim_options, i)
                      for i in range(count)]
     return tasks
 
 
+def _batches(execution_strat, sim_options):
+    """Whether the strategy's samples can be simulated all at once, with
+    staticsim.simulate_batch()."""
+    if execution_strat == "da" or sim_options.get("event_driven") \
+            or not sim_options.get("batch_static", True):
+        return False
+    return strategies.get_strategy(execution_strat).static
+
+
+def _simulator_class(sim_options):
+    """Returns the simulator class for the non-decoupled strategies."""
+    if sim_options.get("event_driven"):
+        return EventSimulator
+    return Simulator
+
+
 def _multisim_thread_helper(tup):
     """ Helper function to allow passing multiple arguments to the simulator.
     """
@@ -338,15 +468,25 @@ def _multisim_thread_helper(tup):
         ans = simulator.simulate(tup[1], tup[2], sim_options=tup[3])
     reschedule_count = simulator.num_reschedules
     sent_count = simulator.num_sent_schedules
+    event_stats = None
+    if isinstance(simulator, EventSimulator):
+        event_stats = (simulator.num_messages, simulator.makespan)
     pr.verbose("Task: {}".format(tup[4]))
     pr.verbose("Assigned Times: {}".format(simulator.get_assigned_times()))
     pr.verbose("Successful?: {}".format(ans))
-    return ans, reschedule_count, sent_count
+    # Worker processes hand their timings back to the parent with the result.
+    profile = None
+    if multiprocessing.parent_process() is not None:
+        profile = functiontimer.pop_snapshot()
+    return (ans, reschedule_count, sent_count, profile, event_stats,
+            simulator.num_stale_schedules)
 
 
 def folder_harvest(folder_paths: list, recurse=True, only_json=True) -> list:
     """ Retrieves a list of STN filepaths given a list of folderpaths.
 
+    Use instancesource.iter_stn_paths to walk the folders lazily instead.
+
     Args:
         folder_paths (list): List of strings that represent file/folder paths.
         recursive (:obj:`bool`, optional): Boolean indicating whether to
@@ -355,42 +495,8 @@ def folder_harvest(folder_paths: list, recurse=True, only_json=True) -> list:
     Returns:
         Returns a flat list of STN paths.
     """
-    stn_files = []
-    for folder_path in folder_paths:
-        if os.path.isfile(folder_path):
-            # Folder was actually a stn file. Just append it.
-            if only_json:
-                _, ext = os.path.splitext(folder_path)
-                if ext == ".json":
-                    stn_files.append(folder_path)
-            else:
-                stn_files.append(folder_path)
-        elif os.path.isdir(folder_path):
-            # This was actually a folder this time!
-            contents = os.listdir(folder_path)
-            for c in contents:
-                # Make sure to include the folder path
-                long_path = folder_path + "/" + c
-                if os.path.isfile(long_path):
-                    if only_json:
-                        _, ext = os.path.splitext(long_path)
-                        if ext == ".json":
-                            stn_files.append(long_path)
-                    else:
-                        stn_files.append(long_path)
-                elif os.path.isdir(long_path) and recurse:
-                    stn_files += folder_harvest([long_path], recurse=True)
-                else:
-                    # This should never happen, but maybe?
-                    pr.warning("STN path was not file or directory: " +
-                               folder_path)
-                    pr.warning("Skipping...")
-        else:
-            # This should never happen, but maybe?
-            pr.warning("STN path was not file or directory: " +
-                       folder_path)
-            pr.warning("Skipping...")
-    return stn_files
+    return list(instancesource.iter_stn_paths(folder_paths, recurse=recurse,
+                                              only_json=only_json))
 
 
 def max_agent_verts(stn):
@@ -432,6 +538,7 @@ def parse_args():
                         help="Number of Monte-Carlo samples to use, default"
                         " is 100")
     parser.add_argument("-e", "--execution", type=str, default="early",
+                        choices=sorted(strategies.STRATEGIES) + ["da"],
                         help="Set the execution strategy to use. Default is"
                         " 'early'")
     parser.add_argument("-o", "--output", type=str,
@@ -442,6 +549,53 @@ def parse_args():
                         help="SI Threshold to use for SI, ALP and ARSI")
     parser.add_argument("--mit-parse", action="store_true",
                         help="Use MIT parsing to read in STN JSON files")
+    parser.add_argument("--stn-cache", action="store_true",
+                        help="Cache parsed STN JSON files in binary form, in"
+                        " a .stncache folder next to each file. Later runs "
+                        "over the same files skip JSON parsing.")
+    parser.add_argument("--decouple-cache", type=str, default=None,
+                        help="Folder to store decouplings in (for the 'da' "
+                        "execution), so that later runs over the same STNs "
+                        "reuse them.")
+    parser.add_argument("--lp-backend", type=str, default=None,
+                        choices=sorted(lpbackend.BACKENDS),
+                        help="LP solver used by SREA and decoupling. By "
+                        "default SREA uses 'pulp' and the opt_inter "
+                        "decoupling 'highs'. "
+                        "'highs' solves in-process, without starting a "
+                        "solver process per LP.")
+    parser.add_argument("--propagation", type=str,
+                        default=propagation.DEFAULT_BACKEND,
+                        choices=sorted(propagation.BACKENDS),
+                        help="How constraints are propagated after each "
+                        "event. 'ppc' is cheapest on sparse plans.")
+    parser.add_argument("--compile-guides", action="store_true",
+                        help="Drop dominated edges from every guide before "
+                        "dispatching it. Results are unchanged.")
+    parser.add_argument("--async-reschedule", action="store_true",
+                        help="Keep dispatching from the current guide while "
+                        "a new one is computed, which takes SREA's runtime "
+                        "times --compute-scale. Guides which events have "
+                        "overtaken are dropped.")
+    parser.add_argument("--event-driven", action="store_true",
+                        help="Simulate each agent dispatching on its own, "
+                        "hearing of other agents' events and guides after "
+                        "--message-delay. Not for the 'da' execution.")
+    parser.add_argument("--message-delay", type=float,
+                        default=eventsim.DEFAULT_MESSAGE_DELAY,
+                        help="Time for a message to reach another agent in "
+                        "--event-driven runs, in STN time units. Default is "
+                        "0.")
+    parser.add_argument("--compute-scale", type=float,
+                        default=eventsim.DEFAULT_COMPUTE_SCALE,
+                        help="STN time units per second of rescheduling in "
+                        "--event-driven and --async-reschedule runs. Default "
+                        "is 1000, as STN times are milliseconds. 0 makes "
+                        "rescheduling instant.")
+    parser.add_argument("--no-batch", action="store_true",
+                        help="Simulate static strategies (such as 'srea') "
+                        "one sample at a time, rather than all samples at "
+                        "once. Results are unchanged.")
     parser.add_argument("--seed", default=None, help="Set the random seed")
     parser.add_argument("--ordering-pairs", type=str, help="Flag "
                         "for indefinite ordering. Requires a string "
@@ -458,8 +612,20 @@ def parse_args():
                         "exclusively. Do not set if you want to run through "
                         "the entire data set. Not thoroughly tested, be "
                         "warned.")
+    parser.add_argument("--match", type=str,
+                        help="Only run on STN files whose path matches this "
+                        "shell-style pattern, e.g. '*STN_a2_*'. Applied "
+                        "before --start-point and --stop-point.")
     parser.add_argument("--no-live", action="store_true",
                         help="Turn off live update printing")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time the simulator internals, and print a "
+                        "summary table at the end. Timings from all threads "
+                        "are included.")
+    parser.add_argument("--profile-output", type=str,
+                        help="Write profiler timings to this file as folded "
+                        "stacks, for use with flame graph tools. Implies "
+                        "--profile.")
     parser.add_argument("stns", help="The STN JSON files to run on",
                         nargs="+")
     return parser.parse_args()
@@ -467,5 +633,3 @@ def parse_args():
 
 if __name__ == "__main__":
     main()
-    print("Time spent per function:")
-    print(functiontimer.get_times())
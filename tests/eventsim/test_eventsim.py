@@ -0,0 +1,72 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat.montsim import Simulator
+from libheat.eventsim import EventSimulator
+
+
+STN1 = "test_data/two_agent_sync.json"
+STN2 = "test_data/two_contingent.json"
+
+
+def handoff_stn(deadline):
+    """Agent 0 executes event 1 at 10, then agent 1 executes event 2 at
+    most deadline after it."""
+    stn = stntools.STN()
+    stn.add_vertex(0, None)
+    stn.add_vertex(1, 0)
+    stn.add_vertex(2, 1)
+    stn.agents = [0, 1]
+    stn.add_edge(0, 1, 10.0, 100.0)
+    stn.add_edge(0, 2, 0.0, 2000.0)
+    stn.add_edge(1, 2, 0.0, deadline)
+    return stn
+
+
+class TestEventSimulator(unittest.TestCase):
+    def test_no_delay_matches_simulator(self):
+        options = {"message_delay": 0.0, "compute_time": 0.0}
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            for strat in ("early", "srea", "drea", "drea-s"):
+                for seed in range(3):
+                    sim = Simulator(seed)
+                    expected = sim.simulate(stn, strat)
+                    esim = EventSimulator(seed)
+                    self.assertEqual(esim.simulate(stn, strat, options),
+                                     expected)
+                    self.assertEqual(esim.get_assigned_times(),
+                                     sim.get_assigned_times())
+
+    def test_waits_for_news(self):
+        stn = handoff_stn(1000.0)
+        sim = EventSimulator(0)
+        self.assertTrue(sim.simulate(stn, "early", {"message_delay": 50.0}))
+        self.assertEqual(sim.get_assigned_times(), {0: 0.0, 1: 10.0,
+                                                    2: 60.0})
+        self.assertEqual(sim.makespan, 60.0)
+        # Each agent tells the other of its one event.
+        self.assertEqual(sim.num_messages, 2)
+
+    def test_late_news_fails(self):
+        stn = handoff_stn(20.0)
+        sim = EventSimulator(0)
+        self.assertTrue(sim.simulate(stn, "early", {"message_delay": 10.0}))
+        self.assertFalse(sim.simulate(stn, "early",
+                                      {"message_delay": 50.0}))
+
+    def test_guides_are_sent(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        sim = EventSimulator(2)
+        self.assertTrue(sim.simulate(stn, "drea", {"message_delay": 10.0,
+                                                   "compute_time": 5.0}))
+        # Every reschedule after the first one sends a guide to the other
+        # agent, on top of one message per executed event.
+        executed = len(stn.verts) - 1
+        self.assertGreater(sim.num_reschedules, 1)
+        self.assertEqual(sim.num_messages,
+                         executed + sim.num_sent_schedules - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import libheat.functiontimer as functiontimer
+
+
+class TestSpans(unittest.TestCase):
+
+    def setUp(self):
+        functiontimer.clear()
+        functiontimer.set_enabled(True)
+
+    def tearDown(self):
+        functiontimer.clear()
+        functiontimer.set_enabled(False)
+
+    def test_nesting(self):
+        for i in range(3):
+            with functiontimer.span("outer"):
+                with functiontimer.span("inner"):
+                    pass
+        snap = functiontimer.snapshot()
+        self.assertEqual(snap["spans"][("outer",)][0], 3)
+        self.assertEqual(snap["spans"][("outer", "inner")][0], 3)
+
+    def test_recursion(self):
+        @functiontimer.timed("fib")
+        def fib(n):
+            if n < 2:
+                return n
+            return fib(n - 1) + fib(n - 2)
+        self.assertEqual(fib(5), 5)
+        snap = functiontimer.snapshot()
+        self.assertEqual(snap["spans"][("fib",)][0], 1)
+        self.assertEqual(sum(s[0] for s in snap["spans"].values()), 15)
+        self.assertIn("fib", functiontimer.get_times())
+
+    def test_disabled(self):
+        functiontimer.set_enabled(False)
+        with functiontimer.span("outer"):
+            functiontimer.start("inner")
+            functiontimer.stop("inner")
+        self.assertEqual(functiontimer.snapshot()["spans"], {})
+
+    def test_merge(self):
+        with functiontimer.span("outer"):
+            pass
+        snap = functiontimer.pop_snapshot()
+        self.assertEqual(functiontimer.snapshot()["spans"], {})
+        functiontimer.merge(snap)
+        functiontimer.merge(snap)
+        self.assertEqual(functiontimer.snapshot()["spans"][("outer",)][0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import time
+import unittest
+
+from libheat import instancesource
+
+
+STNS = ["test_data/two_agent_sync.json",
+        "test_data/two_contingent.json",
+        "test_data/two_agent_stretch.json"]
+MIT_STN = "test_data/stp_picard.json"
+
+
+class TestInstanceSource(unittest.TestCase):
+
+    def test_paths(self):
+        paths = list(instancesource.iter_stn_paths(["test_data"]))
+        self.assertEqual(len(paths), 6)
+        self.assertTrue(all(p.endswith(".json") for p in paths))
+
+    def test_index_range(self):
+        loaded = []
+
+        def path_filter(path):
+            loaded.append(path)
+            return True
+
+        got = list(instancesource.iter_instances(STNS, start_index=1,
+                                                 stop_index=2,
+                                                 path_filter=path_filter))
+        self.assertEqual([(i, p) for i, p, _ in got], [(1, STNS[1])])
+        self.assertEqual(got[0][2].name, "two_contingent.json")
+        # Nothing past the stop index is looked at.
+        self.assertEqual(loaded, STNS[:2])
+
+    def test_filter_before_index(self):
+        got = list(instancesource.iter_instances(
+            STNS, start_index=1, path_filter=lambda p: "two_agent" in p))
+        self.assertEqual([(i, p) for i, p, _ in got], [(1, STNS[2])])
+
+    def test_mit(self):
+        got = list(instancesource.iter_instances([MIT_STN, MIT_STN],
+                                                 mitparse=True))
+        self.assertEqual([i for i, _, _ in got], [0, 1])
+        self.assertEqual(len(got[0][2].verts), 5)
+
+    def test_prefetch(self):
+        self.assertEqual(list(instancesource.prefetch(range(50), depth=3)),
+                         list(range(50)))
+
+    def test_prefetch_error(self):
+        def failing():
+            yield 1
+            raise KeyError("bad")
+        items = instancesource.prefetch(failing())
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(KeyError):
+            next(items)
+
+    def test_prefetch_close(self):
+        items = instancesource.prefetch(iter(range(1000)))
+        self.assertEqual(next(items), 0)
+        items.close()
+
+    def test_prefetch_paused(self):
+        produced = []
+
+        def source():
+            for i in range(100):
+                time.sleep(0.001)
+                produced.append(i)
+                yield i
+        items = instancesource.prefetch(source(), depth=100)
+        self.assertEqual(next(items), 0)
+        with instancesource.paused():
+            count = len(produced)
+            time.sleep(0.05)
+            self.assertEqual(len(produced), count)
+        self.assertEqual(list(items), list(range(1, 100)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pulp
+from scipy import sparse
+
+import libheat.lpbackend as lpbackend
+import libheat.srea as srea
+import libheat.stntools as stntools
+
+
+STN1 = "test_data/two_agent_sync.json"
+
+
+def _small_lp():
+    # Maximise x + 2y with x + y <= 4, x - y == 1, 0 <= x, 0 <= y <= 3.
+    return lpbackend.LinearProgram(
+        [1.0, 2.0],
+        A_ub=sparse.csr_matrix([[1.0, 1.0]]), b_ub=np.array([4.0]),
+        A_eq=sparse.csr_matrix([[1.0, -1.0]]), b_eq=np.array([1.0]),
+        bounds=[(0.0, None), (0.0, 3.0)], maximize=True)
+
+
+class TestLPBackend(unittest.TestCase):
+    def tearDown(self):
+        lpbackend.set_backend(None)
+
+    def test_backends_agree(self):
+        for name in lpbackend.BACKENDS:
+            result = lpbackend.solve(_small_lp(), backend=name)
+            self.assertTrue(result.optimal)
+            self.assertAlmostEqual(result.objective, 5.5)
+            np.testing.assert_allclose(result.x, [2.5, 1.5], atol=1e-7)
+
+    def test_infeasible(self):
+        lp = _small_lp()
+        lp.b_eq = np.array([10.0])
+        for name in lpbackend.BACKENDS:
+            result = lpbackend.solve(lp, backend=name)
+            self.assertEqual(result.status, lpbackend.INFEASIBLE)
+            self.assertIsNone(result.x)
+
+    def test_solve_pulp(self):
+        lpbackend.set_backend("highs")
+        prob = pulp.LpProblem("test", pulp.LpMinimize)
+        x = pulp.LpVariable("x", lowBound=0)
+        y = pulp.LpVariable("y", lowBound=0, upBound=3)
+        prob += -x - 2 * y
+        prob += x + y <= 4
+        prob += x - y == 1
+        self.assertEqual(lpbackend.solve_pulp(prob), lpbackend.OPTIMAL)
+        self.assertAlmostEqual(x.varValue, 2.5)
+        self.assertAlmostEqual(y.varValue, 1.5)
+        self.assertEqual(prob.status, pulp.LpStatusOptimal)
+
+    def test_srea_highs(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        lpbackend.set_backend("highs")
+        alpha, guide = srea.srea(stn)
+        self.assertTrue(0.504 < alpha < 0.508)
+
+    def test_default(self):
+        # A solver's default backend is used until one is chosen.
+        self.assertFalse(lpbackend.is_chosen())
+        with mock.patch.object(lpbackend.PulpBackend, "solve") as pulp_solve:
+            result = lpbackend.solve(_small_lp(), default="highs")
+            self.assertFalse(pulp_solve.called)
+        self.assertAlmostEqual(result.objective, 5.5)
+        lpbackend.set_backend("pulp")
+        self.assertTrue(lpbackend.is_chosen())
+        with mock.patch.object(lpbackend.HighsBackend, "solve") as highs_solve:
+            result = lpbackend.solve(_small_lp(), default="highs")
+            self.assertFalse(highs_solve.called)
+        self.assertAlmostEqual(result.objective, 5.5)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            lpbackend.set_backend("glpk")
+
+
+if __name__ == "__main__":
+    unittest.main()
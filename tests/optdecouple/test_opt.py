@@ -1,7 +1,10 @@
 import unittest
 
+import pulp
 
 import libheat.decoupling.optdecouple as optdecouple
+import libheat.lpbackend as lpbackend
+from libheat import propagation
 import libheat.stntools as stntools
 from libheat.dmontsim import DecoupledSimulator
 
@@ -9,9 +12,32 @@ from libheat.dmontsim import DecoupledSimulator
 STN1 = "test_data/two_agent_sync.json"
 STN2 = "test_data/two_agent_sync2.json"
 STN3 = "test_data/two_agent_stretch.json"
+# Johnson's distances on this one are off in their last bits, with the
+# decoupling PuLP finds.
+STN4 = "problem_instances/STN_a2_i4_s5_t20000/original_3.json"
+STN5 = "problem_instances/STN_a2_i4_s1_t1000/original_0.json"
+
+
+def _pulp_flex(stn, alpha):
+    """Returns the objective of the interagent flexibility LP, as built with
+    PuLP before InteragentFlexLP, or None if it is infeasible."""
+    prob, duals = optdecouple._wilson_lp_setup(stn)
+    optdecouple.apply_contingent_bounds(stn, prob, duals, alpha)
+    points = {v for edge in stn.interagent_edges for v in edge}
+    prob += sum(duals[(v, "+")] - duals[(v, "-")] for v in points)
+    solver = pulp.LpSolverDefault.copy()
+    solver.msg = False
+    prob.solve(solver)
+    if pulp.LpStatus[prob.status] != "Optimal":
+        return None
+    return pulp.value(prob.objective)
 
 
 class TestOptDecouple(unittest.TestCase):
+    def tearDown(self):
+        lpbackend.set_backend(None)
+        propagation.set_backend(None)
+
     def test_opt_case_1(self):
         stn = stntools.load_stn_from_json_file(STN1)["stn"]
         alpha, subproblems = optdecouple.decouple_agents(stn,
@@ -28,11 +54,43 @@ class TestOptDecouple(unittest.TestCase):
         for g in subproblems:
             self.assertEqual(g.get_assigned_time(0), 0)
 
+    def test_lp_reuse(self):
+        cases = ((STN1, (0.9, 0.1, 0.6, 0.3)),
+                 (STN2, (0.9, 0.1, 0.6, 0.3)),
+                 (STN5, (0.99, 0.8, 0.95, 0.85, 0.9)))
+        for path, alphas in cases:
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            lp = optdecouple.InteragentFlexLP(stn)
+            # Solving out of order on one LP must match the PuLP LP.
+            for alpha in alphas:
+                flex, assignments = lp.solve(alpha)
+                expected = _pulp_flex(stn, alpha)
+                if expected is None:
+                    self.assertIsNone(flex)
+                    continue
+                self.assertAlmostEqual(flex, expected, delta=1e-3)
+                self.assertEqual(assignments[0], [0.0, 0.0])
+                self.assertAlmostEqual(
+                    sum(assignments[v][1] - assignments[v][0]
+                        for v in lp.synchrony_points), flex, delta=1e-3)
+
     def test_decouple_sim(self):
         stn = stntools.load_stn_from_json_file(STN1)["stn"]
         sim = DecoupledSimulator(random_seed=42)
         self.assertTrue(sim.simulate(stn))
 
+    def test_decouple_sim_rounding(self):
+        stn = stntools.load_stn_from_json_file(STN4)["stn"]
+        lpbackend.set_backend("pulp")
+        for backend in ("johnson", "ppc"):
+            propagation.set_backend(backend)
+            for seed in range(4):
+                sim = DecoupledSimulator(random_seed=seed)
+                self.assertTrue(sim.simulate(stn, decouple_type="opt_inter"))
+                for v, vert in sim.stn.verts.items():
+                    if vert.is_executed():
+                        self.assertIsNotNone(sim.stn.get_assigned_time(v))
+
     def test_decouple_sim_2(self):
         stn = stntools.load_stn_from_json_file(STN3)["stn"]
         sim = DecoupledSimulator(random_seed=42)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from libheat.plotting import batch
+from libheat.plotting import plot_utils
+from tests.plotting.test_store import results_frame
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.dir.name, "results.csv")
+        results_frame(300, 0).to_csv(self.file, index=False)
+        self.out = os.path.join(self.dir.name, "figures")
+        self.loads = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def render(self, **kwargs):
+        def load():
+            self.loads += 1
+            return plot_utils.load_results([self.file])
+        return batch.render_batch(["table", "syncvrobust"], [self.file],
+                                  load, self.out, fmt="png", workers=1,
+                                  **kwargs)
+
+    def test_skips_unchanged(self):
+        self.assertEqual(self.render(), {"table": "rendered",
+                                         "syncvrobust": "rendered"})
+        self.assertTrue(os.path.isfile(os.path.join(self.out, "table.txt")))
+        self.assertTrue(os.path.isfile(os.path.join(self.out,
+                                                    "syncvrobust.png")))
+        # Nothing changed, so the results are not even loaded.
+        self.assertEqual(self.render(), {"table": "unchanged",
+                                         "syncvrobust": "unchanged"})
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.render(force=True)["table"], "rendered")
+        # A deleted output, or changed results, are rendered again.
+        os.remove(os.path.join(self.out, "table.txt"))
+        self.assertEqual(self.render(), {"table": "rendered",
+                                         "syncvrobust": "unchanged"})
+        results_frame(300, 1).to_csv(self.file, index=False)
+        self.assertEqual(self.render(), {"table": "rendered",
+                                         "syncvrobust": "rendered"})
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            batch.render_batch(["nope"], [self.file], None, self.out)
+
+
+if __name__ == "__main__":
+    unittest.main()
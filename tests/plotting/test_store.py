@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from libheat.plotting import dream_details
+from libheat.plotting import plot_utils
+from libheat.plotting.summarystore import SummaryStore
+
+
+THRESHOLDS = [0.0, 0.0625, 0.125, 0.25, 0.5, 1.0]
+
+
+def results_frame(n, seed):
+    rng = np.random.RandomState(seed)
+    paths = ["p/STN_a2_i4_s1_t{}/original_{}.json".format(t, i)
+             for t in (1000, 5000) for i in range(4)]
+    df = pd.DataFrame({
+        "stn_path": rng.choice(paths, n),
+        "execution": rng.choice(["srea", "drea", "arsi"], n),
+        "ar_threshold": rng.choice(THRESHOLDS, n),
+        "si_threshold": rng.choice(THRESHOLDS, n),
+        "robustness": rng.rand(n),
+        "send_freq": rng.rand(n),
+        "reschedule_freq": rng.rand(n),
+        "runtime": rng.rand(n),
+        "samples": rng.choice([20, 100], n)})
+    # One STN never succeeds.
+    df.loc[df["stn_path"] == paths[0], "robustness"] = 0.0
+    return df
+
+
+class TestSummaryStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.files = []
+        for seed in range(2):
+            path = os.path.join(self.dir.name, "{}.csv".format(seed))
+            results_frame(500, seed).to_csv(path, index=False)
+            self.files.append(path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_matches_results(self):
+        store = SummaryStore()
+        store.update(self.files)
+        summary = store.summary()
+        self.assertTrue(plot_utils.is_summary(summary))
+        rows = plot_utils.load_results(self.files)
+        pd.testing.assert_frame_equal(dream_details.dream_table(summary),
+                                      dream_details.dream_table(rows))
+        for metric in plot_utils.METRICS:
+            self.assertAlmostEqual(plot_utils.metric_mean(summary, metric),
+                                   plot_utils.metric_mean(rows, metric))
+            self.assertAlmostEqual(plot_utils.metric_sem(summary, metric),
+                                   plot_utils.metric_sem(rows, metric))
+
+    def test_incremental(self):
+        path = os.path.join(self.dir.name, "store.pickle")
+        store = SummaryStore(path)
+        self.assertEqual(store.update(self.files), self.files)
+        store.save()
+
+        store = SummaryStore(path)
+        self.assertEqual(store.update(self.files), [])
+        # Only the changed file is read again.
+        results_frame(100, 5).to_csv(self.files[1], index=False)
+        self.assertEqual(store.update(self.files), [self.files[1]])
+        rows = plot_utils.load_results(self.files)
+        summary = store.summary()
+        self.assertAlmostEqual(
+            plot_utils.metric_mean(summary, "runtime"),
+            plot_utils.metric_mean(rows, "runtime"))
+        # A subset of the files only sums those.
+        first = store.summary(self.files[:1])
+        self.assertAlmostEqual(
+            plot_utils.metric_mean(first, "runtime"),
+            plot_utils.metric_mean(
+                plot_utils.load_results(self.files[:1]), "runtime"))
+
+
+if __name__ == "__main__":
+    unittest.main()
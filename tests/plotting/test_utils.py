@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from libheat.plotting import plot_utils
+from libheat.plotting import summarycache
+
+
+def results_frame():
+    paths = ["p/STN_a2_i4_s1_t1000/original_0.json",
+             "p/STN_a2_i4_s1_t5000/original_1.json",
+             "p/other/original_2.json"]
+    return pd.DataFrame({
+        "stn_path": [paths[0], paths[0], paths[1], paths[1], paths[2]],
+        "execution": ["arsi", "arsi", "arsi", "drea", "arsi"],
+        "ar_threshold": [0.0, 0.5, 0.0, 0.0, 0.5],
+        "robustness": [0.0, 0.5, 0.0, 0.0, 1.0],
+        "send_freq": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "reschedule_freq": [1.0, 1.0, 1.0, 1.0, 1.0],
+        "runtime": [0.1, 0.2, 0.3, 0.4, 0.5],
+        "samples": [100, 100, 100, 100, 10]})
+
+
+class TestPlotUtils(unittest.TestCase):
+    def test_sync_degrees(self):
+        degrees = plot_utils.sync_degrees(results_frame()["stn_path"])
+        self.assertEqual(degrees.tolist()[:4], [1.0, 1.0, 5.0, 5.0])
+        self.assertTrue(np.isnan(degrees.iloc[4]))
+
+    def test_filters(self):
+        df = plot_utils.framefilters(results_frame())
+        # The second STN never succeeds, and the third has too few samples.
+        self.assertEqual(df.index.tolist(), [0, 1])
+        self.assertEqual(df["sync_deg"].tolist(), [1.0, 1.0])
+
+    def test_threshold_means(self):
+        df = results_frame()
+        arsi = df[df["execution"] == "arsi"]
+        drea = df[df["execution"] == "drea"].assign(robustness=0.5)
+        data = plot_utils.threshold_means(arsi, "ar_threshold",
+                                          [0.5, 0.25, 0.0], comp_df=drea)
+        expected = [arsi[arsi["ar_threshold"] == t]["send_freq"].mean()
+                    / 4.0 * 100 for t in (0.5, 0.25, 0.0)]
+        np.testing.assert_allclose(data.sends, expected)
+        self.assertTrue(np.isnan(data.robs[1]))
+
+    def test_grid_means(self):
+        means = plot_utils.grid_means(
+            results_frame(), [("execution", ["arsi", "drea"]),
+                              ("ar_threshold", [0.0, 0.5])],
+            use_percents=False)
+        self.assertEqual(means["execution"].tolist(),
+                         ["arsi", "arsi", "drea", "drea"])
+        self.assertEqual(means["runtime"].tolist()[:3], [0.2, 0.35, 0.4])
+        self.assertTrue(np.isnan(means["runtime"].iloc[3]))
+
+
+class TestSummaryCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        summarycache.set_cache_dir(os.path.join(self.dir.name, "cache"))
+
+    def tearDown(self):
+        summarycache.set_cache_dir(None)
+        self.dir.cleanup()
+
+    def test_keyed_by_contents(self):
+        path = os.path.join(self.dir.name, "results.csv")
+        results_frame().to_csv(path, index=False)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return plot_utils.load_results([path])
+
+        first = summarycache.get_summary("frame", [path], compute)
+        second = summarycache.get_summary("frame", [path], compute)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(len(calls), 1)
+        # Changing the file's contents misses the cache.
+        results_frame().head(2).to_csv(path, index=False)
+        summarycache.get_summary("frame", [path], compute)
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
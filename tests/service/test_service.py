@@ -0,0 +1,99 @@
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+
+import libheat.stntools as stntools
+from libheat.montsim import Simulator
+from libheat.service import DispatchSession, ServiceClient, serve
+
+
+STN1 = "test_data/two_agent_sync.json"
+
+
+def simulated_events(stn, seed):
+    """Returns [(vert id, time), ...] of a successful simulation."""
+    sim = Simulator(seed)
+    assert sim.simulate(stn, "drea")
+    times = sim.get_assigned_times()
+    return sorted(((v, t) for v, t in times.items() if v != 0),
+                  key=lambda pair: (pair[1], pair[0]))
+
+
+class TestDispatchSession(unittest.TestCase):
+    def setUp(self):
+        self.stn = stntools.load_stn_from_json_file(STN1)["stn"]
+
+    def test_replay(self):
+        events = simulated_events(self.stn, 2)
+        alphas = {}
+        for warm_start in (True, False):
+            session = DispatchSession(self.stn, "drea",
+                                      warm_start=warm_start)
+            self.assertTrue(session.consistent)
+            alphas[warm_start] = [session.alpha]
+            for vert_id, at_time in events:
+                response = session.execute(vert_id, at_time)
+                self.assertTrue(response["consistent"])
+                alphas[warm_start].append(response["alpha"])
+            self.assertEqual(session.status()["remaining"], 0)
+            self.assertEqual(session.dispatch(), [])
+        # Warm starts find the same alphas.
+        self.assertEqual(alphas[True], alphas[False])
+
+    def test_misfit_is_not_recorded(self):
+        session = DispatchSession(self.stn, "early")
+        first = session.dispatch()[0]
+        before = session.status()
+        late = first["latest"] + 1000.0
+        self.assertFalse(session.execute(first["vert"], late)["consistent"])
+        self.assertEqual(session.status(), before)
+        response = session.execute(first["vert"], first["earliest"])
+        self.assertTrue(response["consistent"])
+        with self.assertRaises(ValueError):
+            session.execute(first["vert"], first["earliest"])
+
+
+class TestServer(unittest.TestCase):
+    def test_round_trip(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        session = DispatchSession(stn, "drea")
+        folder = tempfile.mkdtemp()
+        path = os.path.join(folder, "dispatch.sock")
+        listening = threading.Event()
+        thread = threading.Thread(
+            target=lambda: asyncio.run(serve(
+                session, path=path, ready=lambda _: listening.set())))
+        thread.start()
+        try:
+            self.assertTrue(listening.wait(30))
+            with ServiceClient(path=path, timeout=30) as client:
+                response = client.request("dispatch")
+                self.assertTrue(response["ok"])
+                first = response["dispatch"][0]
+                response = client.request("execute", vert=first["vert"],
+                                          time=first["earliest"])
+                self.assertTrue(response["ok"])
+                self.assertTrue(response["consistent"])
+                self.assertEqual(response["id"], 2)
+
+                response = client.request("unknown")
+                self.assertFalse(response["ok"])
+                self.assertIn("unknown", response["error"])
+
+                metrics = client.request("metrics")["metrics"]
+                self.assertEqual(metrics["execute"]["count"], 1)
+                self.assertGreaterEqual(metrics["execute"]["max"],
+                                        metrics["execute"]["mean"])
+                self.assertTrue(client.request("shutdown")["ok"])
+        finally:
+            thread.join(30)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rmdir(folder)
+        self.assertFalse(thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat.montsim import Simulator
+
+
+STN1 = "test_data/two_agent_sync.json"
+
+
+def run(stn, strat, seed, options):
+    sim = Simulator(seed)
+    result = sim.simulate(stn, strat, sim_options=options)
+    return result, sim.get_assigned_times(), sim
+
+
+class TestAsyncReschedule(unittest.TestCase):
+    def setUp(self):
+        self.stn = stntools.load_stn_from_json_file(STN1)["stn"]
+
+    def test_instant_matches_sync(self):
+        options = {"async_reschedule": True, "compute_time": 0.0}
+        for seed in range(3):
+            expected = run(self.stn, "drea", seed, {})
+            got = run(self.stn, "drea", seed, options)
+            self.assertEqual(got[:2], expected[:2])
+            self.assertEqual(got[2].num_stale_schedules, 0)
+
+    def test_never_ready_follows_first_guide(self):
+        # Guides which are never ready leave only the first one, as SREA.
+        options = {"async_reschedule": True, "compute_time": 1e12}
+        for seed in range(3):
+            expected = run(self.stn, "srea", seed, {})
+            got = run(self.stn, "drea", seed, options)
+            self.assertEqual(got[:2], expected[:2])
+            self.assertGreater(got[2].num_reschedules, 1)
+
+    def test_stale_guide_dropped(self):
+        guide = stntools.STN()
+        guide.add_vertex(0, None)
+        guide.add_vertex(1, 0)
+        guide.add_vertex(2, 0)
+        guide.add_edge(0, 1, 0.0, 10.0)
+        guide.add_edge(0, 2, 0.0, 30.0)
+        sim = Simulator()
+        sim._current_time = 5.0
+        pending = []
+        sim._reschedule_later(pending, 0, 10.0, 0.5, guide)
+        # Event 1 happened within the guide's bounds.
+        ready = sim._ready_guide(pending, [(1, 8.0)], 20.0, 0)
+        self.assertEqual(ready[:3], (0.5, guide, 15.0))
+        self.assertEqual(guide.get_assigned_time(1), 8.0)
+
+        sim._reschedule_later(pending, 1, 10.0, 0.6, guide.copy())
+        ready = sim._ready_guide(pending, [(1, 8.0), (2, 40.0)], 20.0, 0)
+        self.assertIsNone(ready)
+        self.assertEqual(sim.num_stale_schedules, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
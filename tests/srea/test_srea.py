@@ -18,9 +18,48 @@ class TestSreaSimulator(unittest.TestCase):
     def test_srea_case_2(self):
         stn = stntools.load_stn_from_json_file(STN2)["stn"]
         alpha, guide = srea.srea(stn)
-        self.assertEqual(guide.get_assigned_time(1), 0.0)
+        # Event 1 is pinned to within a millisecond of time 0.
+        self.assertEqual(guide.get_edge_weight(1, 0), 0.0)
+        self.assertEqual(guide.get_edge_weight(0, 1), 1.0)
         self.assertEqual(alpha, 0.481)
 
+    def test_tighten_edges(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        expected = stn.copy()
+        expected.floyd_warshall()
+        tightened = stn.copy()
+        srea.tighten_edges(tightened)
+        for i, j in expected.edges:
+            self.assertEqual(tightened.get_edge_weight(i, j),
+                             expected.get_edge_weight(i, j))
+            self.assertEqual(tightened.get_edge_weight(j, i),
+                             expected.get_edge_weight(j, i))
+
+    def test_srea_minimal(self):
+        # Dropping dominated edges must not change the lowest alpha.
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            tightened = stn.copy()
+            srea.tighten_edges(tightened)
+            full = srea.SreaLP(tightened)
+            minimal = srea.SreaLP(tightened, minimal=True)
+            self.assertLessEqual(minimal.num_constraints,
+                                 full.num_constraints)
+            self.assertEqual(srea.srea(stn)[0],
+                             srea.srea(stn, minimal=True)[0])
+
+    def test_srea_warm_start(self):
+        # Any starting guess must give the same guide as a cold search.
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            alpha, guide = srea.srea(stn)
+            for guess in (0.0, alpha, alpha - 0.1, alpha + 0.1, 1.0):
+                warm_alpha, warm_guide = srea.srea(stn, warm_alpha=guess)
+                self.assertEqual(warm_alpha, alpha)
+                for (i, j), edge in guide.edges.items():
+                    self.assertEqual(warm_guide.edges[(i, j)].Cij, edge.Cij)
+                    self.assertEqual(warm_guide.edges[(i, j)].Cji, edge.Cji)
+
     def test_srea_sim_1(self):
         stn = stntools.load_stn_from_json_file(STN1)["stn"]
         sim = Simulator(42)
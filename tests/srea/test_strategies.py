@@ -0,0 +1,76 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat.montsim import Simulator
+from libheat import strategies
+from libheat import staticsim
+
+
+STNS = ["test_data/two_agent_sync.json",
+        "test_data/two_agent_stretch.json",
+        "test_data/two_contingent.json"]
+
+
+class TestRegistry(unittest.TestCase):
+    def test_lookup(self):
+        for name in ["early", "srea", "drea", "drea-s", "drea-si",
+                     "drea-alp", "drea-ar", "drea-ara", "arsi"]:
+            self.assertEqual(strategies.get_strategy(name).name, name)
+        with self.assertRaises(ValueError):
+            strategies.get_strategy("nope")
+
+    def test_declarations(self):
+        self.assertFalse(strategies.get_strategy("early").reschedules)
+        self.assertFalse(strategies.get_strategy("early").static)
+        self.assertTrue(strategies.get_strategy("srea").static)
+        self.assertTrue(strategies.get_strategy("drea").reschedules)
+        self.assertFalse(strategies.get_strategy("drea").static)
+
+    def test_registered_strategy(self):
+        # A strategy registered elsewhere runs without touching montsim.
+        @strategies.register
+        class SreaCopy(strategies.Srea):
+            name = "test-srea-copy"
+        try:
+            stn = stntools.load_stn_from_json_file(STNS[0])["stn"]
+            for seed in range(3):
+                expected = Simulator(seed)
+                got = Simulator(seed)
+                self.assertEqual(got.simulate(stn, "test-srea-copy"),
+                                 expected.simulate(stn, "srea"))
+                self.assertEqual(got.get_assigned_times(),
+                                 expected.get_assigned_times())
+        finally:
+            del strategies.STRATEGIES["test-srea-copy"]
+
+    def test_state_is_per_simulation(self):
+        stn = stntools.load_stn_from_json_file(STNS[0])["stn"]
+        sim = Simulator(1)
+        sim.simulate(stn, "drea-ar", {"ar_threshold": 0.5})
+        first = sim.strategy
+        sim.simulate(stn, "drea-ar", {"ar_threshold": 0.5})
+        self.assertIsNot(sim.strategy, first)
+
+
+class TestStaticBatch(unittest.TestCase):
+    def test_matches_simulator(self):
+        seeds = list(range(20))
+        for path in STNS:
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            results, reschedules, sent = staticsim.simulate_batch(
+                stn, "srea", seeds, chunk_size=6)
+            for seed, result, res, snt in zip(seeds, results, reschedules,
+                                              sent):
+                sim = Simulator(seed)
+                self.assertEqual(result, sim.simulate(stn, "srea"))
+                self.assertEqual(res, sim.num_reschedules)
+                self.assertEqual(snt, sim.num_sent_schedules)
+
+    def test_not_static(self):
+        stn = stntools.load_stn_from_json_file(STNS[0])["stn"]
+        with self.assertRaises(ValueError):
+            staticsim.simulate_batch(stn, "drea", [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+import unittest
+
+import libheat.stntools as stntools
+from libheat import dmontsim
+from libheat.decoupling import decouplecache
+from libheat.dmontsim import DecoupledSimulator
+
+
+STN1 = "test_data/two_agent_sync.json"
+
+
+class TestDecoupleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        decouplecache.clear()
+
+    def tearDown(self):
+        decouplecache.set_cache_dir(None)
+        decouplecache.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def test_computed_once(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return dmontsim.sreadecouple.decouple_agents(stn)
+
+        alpha1, subs1 = decouplecache.get_decoupling(stn, "srea", None,
+                                                     compute)
+        alpha2, subs2 = decouplecache.get_decoupling(stn.copy(), "srea", None,
+                                                     compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(alpha1, alpha2)
+        self.assertEqual(len(subs1), 2)
+        # Callers get their own copies.
+        self.assertIsNot(subs1[0], subs2[0])
+        self.assertIsNot(subs1[0].edges[(0, 1)], subs2[0].edges[(0, 1)])
+
+    def test_key(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        key = decouplecache.instance_key(stn, "srea")
+        changed = stn.copy()
+        changed.update_edge(0, 1, 5.0)
+        self.assertNotEqual(key, decouplecache.instance_key(changed, "srea"))
+        self.assertNotEqual(key, decouplecache.instance_key(stn, "opt_inter",
+                                                            0.005))
+        # Resampling must not change the key.
+        for e in changed.contingent_edges.values():
+            e._sampled_time = 123
+        self.assertEqual(decouplecache.instance_key(stn.copy(), "srea"), key)
+
+    def test_disk(self):
+        decouplecache.set_cache_dir(self.tmpdir)
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        alpha, _ = dmontsim.decouple(stn, "srea")
+        decouplecache.clear()
+
+        def compute():
+            raise AssertionError("Should have been read from disk")
+
+        alpha2, subs = decouplecache.get_decoupling(stn, "srea", None,
+                                                    compute)
+        self.assertEqual(alpha, alpha2)
+        self.assertEqual(len(subs), 2)
+
+    def test_same_results(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        results = []
+        # Decoupling every sample afresh, and reusing the first sample's
+        # decoupling, must give the same outcomes.
+        for fresh in (True, False):
+            decouplecache.clear()
+            sim = DecoupledSimulator(random_seed=3)
+            run = []
+            for i in range(4):
+                if fresh:
+                    decouplecache.clear()
+                run.append((sim.simulate(stn, decouple_type="srea"),
+                            sim.get_assigned_times()))
+            results.append(run)
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import unittest
 
 import libheat.decoupling.sreadecouple as sreadecouple
 import libheat.stntools as stntools
+from libheat import dmontsim
 from libheat.dmontsim import DecoupledSimulator
 from libheat.montsim import Simulator
 
@@ -53,6 +54,32 @@ class TestSdecDecouple(unittest.TestCase):
             res2 = sim2.simulate(stn, "srea")
             self.assertEqual(res1, res2)
 
+    def test_decouple_sim_threaded(self):
+        # Running the agents on threads must not change any outcome.
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        sim1 = DecoupledSimulator(random_seed=7, workers=1)
+        sim2 = DecoupledSimulator(random_seed=7, workers=2)
+        for i in range(5):
+            self.assertEqual(sim1.simulate(stn, decouple_type="srea"),
+                             sim2.simulate(stn, decouple_type="srea"))
+            self.assertEqual(sim1.get_assigned_times(),
+                             sim2.get_assigned_times())
+            self.assertEqual(sim1.num_reschedules, sim2.num_reschedules)
+            self.assertEqual(sim1.num_sent_schedules,
+                             sim2.num_sent_schedules)
+
+    def test_decouple_sim_shares_inputs(self):
+        # Samples only hold their changes to the starting STN and the
+        # cached decoupling, which are left as they were.
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        _, shared = dmontsim.decouple(stn, "srea", shared=True)
+        before = [str(s) for s in [stn] + shared]
+        for seed in range(5):
+            sim = DecoupledSimulator(random_seed=seed)
+            sim.simulate(stn, decouple_type="srea")
+            self.assertIs(sim.stn.base, stn)
+        self.assertEqual([str(s) for s in [stn] + shared], before)
+
     def test_decouple_sim_2(self):
         stn = stntools.load_stn_from_json_file(STN3)["stn"]
         sim = DecoupledSimulator(random_seed=42)
@@ -0,0 +1,15 @@
+"""Comparisons of STNs shared by the STN tests."""
+
+
+def weights(stn):
+    """Returns the weights of every edge, by (i, j)."""
+    return {k: (e.Cij, e.Cji) for k, e in stn.edges.items()}
+
+
+def structure(stn):
+    """Returns everything about stn which two equal STNs share, including
+    the order of its vertices."""
+    return (list(stn.verts), weights(stn), stn.received_timepoints,
+            sorted(stn.contingent_edges), sorted(stn.requirement_edges),
+            sorted(stn.interagent_edges), dict(stn.parent),
+            {v: vert.is_executed() for v, vert in stn.verts.items()})
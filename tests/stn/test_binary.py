@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import libheat.stntools as stntools
+from libheat.stntools import stnbinary
+
+
+STN1 = "test_data/two_agent_sync.json"
+STN2 = "test_data/two_contingent.json"
+
+
+def edge_summary(stn):
+    return [(k, e.Cij, e.Cji, e.distribution) for k, e in stn.edges.items()]
+
+
+class TestBinary(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            out = os.path.join(self.tmpdir, "stn.stnb")
+            stntools.save_stn_binary(stn, out)
+            loaded = stntools.load_stn_binary(out)
+            self.assertEqual(edge_summary(stn), edge_summary(loaded))
+            self.assertEqual(stn.verts, loaded.verts)
+            self.assertEqual(list(stn.interagent_edges),
+                             list(loaded.interagent_edges))
+            self.assertEqual(stn.received_timepoints,
+                             loaded.received_timepoints)
+            self.assertEqual(stn.agents, loaded.agents)
+
+    def test_cache(self):
+        path = os.path.join(self.tmpdir, "two_agent_sync.json")
+        shutil.copy(STN1, path)
+        stn = stntools.load_stn_from_json_file(path)["stn"]
+        first = stntools.load_stn_from_json_file(path, cache=True)["stn"]
+        cache_dir = os.path.join(self.tmpdir, stnbinary.CACHE_DIR)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        second = stntools.load_stn_from_json_file(path, cache=True)["stn"]
+        self.assertEqual(edge_summary(stn), edge_summary(first))
+        self.assertEqual(edge_summary(stn), edge_summary(second))
+        self.assertEqual(second.name, "two_agent_sync.json")
+        # Changing the content must not reuse the old cache entry.
+        shutil.copy(STN2, path)
+        third = stntools.load_stn_from_json_file(path, cache=True)["stn"]
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+        self.assertEqual(
+            edge_summary(third),
+            edge_summary(stntools.load_stn_from_json_file(STN2)["stn"]))
+
+    def test_cache_skips_other_locations(self):
+        with open(STN1) as f:
+            jsonstn = json.load(f)
+        jsonstn["nodes"][0]["location"] = 2.5
+        jsonstn["nodes"][1]["location"] = "dock"
+        path = os.path.join(self.tmpdir, "locations.json")
+        with open(path, "w") as f:
+            json.dump(jsonstn, f)
+        stn = stntools.load_stn_from_json_file(path, cache=True)["stn"]
+        self.assertEqual(stn.get_vertex(1).location, 2.5)
+        self.assertEqual(stn.get_vertex(2).location, "dock")
+        self.assertEqual(stn.verts,
+                         stntools.load_stn_from_json_file(path)["stn"].verts)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.tmpdir, stnbinary.CACHE_DIR)))
+        with self.assertRaises(ValueError):
+            stntools.save_stn_binary(stn,
+                                     os.path.join(self.tmpdir, "stn.stnb"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat.montsim import Simulator
+from libheat.stntools.dispatchable import dominated_edges
+
+
+STN1 = "test_data/two_agent_sync.json"
+
+
+def chain_stn():
+    # 1 => 2 => 3, with 1 => 3 implied by the chain.
+    stn = stntools.STN()
+    stn.add_vertex(0, None)
+    for v in (1, 2, 3):
+        stn.add_vertex(v, 1)
+        stn.add_edge(0, v, 0.0, 100.0)
+    stn.add_edge(1, 2, 5.0, 10.0)
+    stn.add_edge(2, 3, 5.0, 10.0)
+    stn.add_edge(1, 3, 10.0, 20.0)
+    stn.agents = [1]
+    return stn
+
+
+class TestDispatchable(unittest.TestCase):
+    def test_drops_implied_edge(self):
+        stn = chain_stn()
+        self.assertEqual(dominated_edges(stn), [(1, 3)])
+        compiled = stntools.minimal_dispatchable(stn)
+        self.assertNotIn((1, 3), compiled.edges)
+        self.assertEqual(len(compiled.edges), len(stn.edges) - 1)
+        # The original is left alone.
+        self.assertIn((1, 3), stn.edges)
+
+    def test_keeps_tighter_edge(self):
+        stn = chain_stn()
+        # A lower bound stricter than the chain's is not implied.
+        stn.update_edge(3, 1, -12.0)
+        self.assertEqual(dominated_edges(stn), [])
+
+    def test_same_dispatch(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        for seed in range(3):
+            sim1 = Simulator(seed)
+            sim2 = Simulator(seed)
+            self.assertEqual(
+                sim1.simulate(stn, "drea"),
+                sim2.simulate(stn, "drea",
+                              sim_options={"compile_guides": True}))
+            self.assertEqual(sim1.get_assigned_times(),
+                             sim2.get_assigned_times())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+import libheat.stntools as stntools
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_counts(self):
+        jsonstn = stntools.generate_pstn(agents=3, events_per_agent=7,
+                                         seed=4)
+        stn = stntools.load_stn_from_json_obj(jsonstn)["stn"]
+        self.assertEqual(len(stn.verts), 3 * 7 + 1)
+        self.assertEqual(len(stn.agents), 3)
+        self.assertEqual(jsonstn["num_agents"], 3)
+
+    def test_seeded(self):
+        jsonstn1 = stntools.generate_pstn(agents=3, seed=12)
+        jsonstn2 = stntools.generate_pstn(agents=3, seed=12)
+        jsonstn3 = stntools.generate_pstn(agents=3, seed=13)
+        self.assertEqual(jsonstn1, jsonstn2)
+        self.assertNotEqual(jsonstn1, jsonstn3)
+
+    def test_consistent(self):
+        for seed in range(5):
+            jsonstn = stntools.generate_pstn(agents=4, events_per_agent=8,
+                                             sync_density=0.8,
+                                             contingent_density=0.5,
+                                             tightness=1.0, seed=seed)
+            stn = stntools.load_stn_from_json_obj(jsonstn)["stn"]
+            self.assertTrue(len(stn.interagent_edges) > 0)
+            self.assertTrue(len(stn.contingent_edges) > 0)
+            self.assertTrue(stn.floyd_warshall())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat.incremental import IncrementalChecker
+from tests.stn.helpers import weights
+
+
+STN1 = "test_data/two_agent_sync.json"
+STN2 = "test_data/two_agent_stretch.json"
+
+
+def assign(stn, vert_id, time):
+    # As Simulator._assign_timepoint does.
+    stn.update_edge(0, vert_id, time, create=True, force=True)
+    stn.update_edge(vert_id, 0, -time, create=True, force=True)
+    stn.get_vertex(vert_id).execute()
+
+
+class TestIncremental(unittest.TestCase):
+    def test_matches_full_propagation(self):
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            expected = stn.copy()
+            checker = IncrementalChecker(stn)
+            self.assertTrue(checker.propagate())
+            self.assertTrue(expected.floyd_warshall())
+            self.assertTrue(checker.is_tight)
+            # Assign each event at its earliest time, one at a time.
+            for v in sorted(stn.verts):
+                if v == 0:
+                    continue
+                time = -stn.get_edge_weight(v, 0)
+                self.assertTrue(checker.assign(v, time))
+                checker.commit()
+                assign(expected, v, time)
+                self.assertTrue(expected.floyd_warshall())
+                self.assertTrue(checker.is_tight)
+                for key, (cij, cji) in weights(expected).items():
+                    self.assertAlmostEqual(stn.edges[key].Cij, cij)
+                    self.assertAlmostEqual(stn.edges[key].Cji, cji)
+
+    def test_rollback(self):
+        stn = stntools.STN()
+        stn.add_vertex(0, None)
+        stn.add_vertex(1, 1)
+        stn.add_vertex(2, 1)
+        stn.add_edge(0, 1, 0.0, 10.0)
+        stn.add_edge(1, 2, 5.0, 10.0)
+        checker = IncrementalChecker(stn)
+        self.assertTrue(checker.propagate())
+        checker.commit()
+        before = weights(stn)
+
+        # Event 2 has no edge to the zero timepoint yet, so one is created.
+        self.assertTrue(checker.tighten(0, 2, 12.0))
+        self.assertEqual(stn.get_edge_weight(0, 1), 7.0)
+        checker.rollback()
+        self.assertEqual(weights(stn), before)
+
+        # Event 1 at 8 forces event 2 to at least 13.
+        self.assertTrue(checker.assign(1, 8.0))
+        self.assertFalse(checker.tighten(0, 2, 12.0))
+        checker.rollback()
+        self.assertEqual(weights(stn), before)
+        self.assertFalse(stn.get_vertex(1).is_executed())
+        self.assertTrue(checker.is_tight)
+
+    def test_loosening_assignment(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        checker = IncrementalChecker(stn)
+        self.assertTrue(checker.propagate())
+        v = [v for v in sorted(stn.verts) if v != 0][0]
+        late = stn.get_edge_weight(0, v) + 1.0
+        expected = stn.copy()
+        assign(expected, v, late)
+        consistent = expected.floyd_warshall()
+        self.assertEqual(checker.assign(v, late), consistent)
+        if consistent:
+            self.assertEqual(weights(stn), weights(expected))
+
+    def test_in_bounds_matches_bounds(self):
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            expected = stn.copy()
+            checker = IncrementalChecker(stn)
+            self.assertFalse(checker.assign_in_bounds(1, 0.0))
+            self.assertTrue(checker.propagate())
+            self.assertTrue(expected.floyd_warshall())
+            # Assign each event in the middle of its bounds.
+            for v in sorted(stn.verts):
+                if v == 0:
+                    continue
+                time = (stn.get_edge_weight(0, v)
+                        - stn.get_edge_weight(v, 0)) // 2
+                self.assertTrue(checker.assign_in_bounds(v, time))
+                checker.commit()
+                assign(expected, v, time)
+                self.assertTrue(expected.floyd_warshall())
+                for u in expected.verts:
+                    self.assertAlmostEqual(stn.get_edge_weight(0, u),
+                                           expected.get_edge_weight(0, u))
+                    self.assertAlmostEqual(stn.get_edge_weight(u, 0),
+                                           expected.get_edge_weight(u, 0))
+                # The potential is still valid.
+                pot = checker._potential
+                for e in stn.edges.values():
+                    self.assertLessEqual(pot[e.j], pot[e.i] + e.Cij + 1e-6)
+                    self.assertLessEqual(pot[e.i], pot[e.j] + e.Cji + 1e-6)
+
+    def test_in_bounds_refused(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        checker = IncrementalChecker(stn)
+        self.assertTrue(checker.propagate())
+        checker.commit()
+        before = weights(stn)
+        v = [v for v in sorted(stn.verts) if v != 0][0]
+        late = stn.get_edge_weight(0, v) + 1.0
+        self.assertFalse(checker.assign_in_bounds(v, late))
+        self.assertEqual(weights(stn), before)
+        self.assertFalse(stn.get_vertex(v).is_executed())
+
+    def test_loosening_after_in_bounds(self):
+        # Only the tightened edge 1 => 2 holds event 2's deadline once the
+        # bounds of event 2 are overwritten.
+        stn = stntools.STN()
+        stn.add_vertex(0, None)
+        stn.add_vertex(1, 1)
+        stn.add_vertex(2, 1)
+        stn.add_edge(0, 1, 0.0, 10.0)
+        stn.add_edge(0, 2, 0.0, 12.0)
+        stn.add_edge(1, 2, 5.0, 100.0)
+        checker = IncrementalChecker(stn)
+        self.assertTrue(checker.propagate())
+        self.assertTrue(checker.assign_in_bounds(1, 0.0))
+        checker.commit()
+        self.assertFalse(checker.assign(2, 20.0))
+        checker.rollback()
+        self.assertTrue(checker.assign(2, 12.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
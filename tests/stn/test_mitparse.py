@@ -1,7 +1,11 @@
+import os
+import json
+import tempfile
 import unittest
 import numpy as np
 
 import libheat.stntools as stntools
+from libheat.stntools import mitparser
 
 
 MIT_STN1 = "test_data/stp_picard.json"
@@ -24,6 +28,32 @@ class TestMitParse(unittest.TestCase):
         self.assertEqual(stn.edges[(3, 4)].distribution, "U_6.0_12.0")
         stn.floyd_warshall()
 
+    def test_connect_origin(self):
+        stn = stntools.mit2stn(MIT_STN1, add_z=True, connect_origin=True)[0]
+        for i in stn.verts:
+            if i != 0:
+                self.assertTrue(stn.edge_exists(0, i))
+        self.assertEqual(len(stn.edges), 7)
+
+    def test_stream(self):
+        with open(MIT_STN2, "r") as f:
+            jo = json.load(f)
+        jo["instances"] += jo["instances"]
+        jo["trailing"] = [{"text": "]}\"", "num": 12345}]
+        fd, path = tempfile.mkstemp(suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(jo, f)
+            expected = [(name, arr) for inst in jo["instances"]
+                        for name, arr in inst.items()]
+            # Tiny chunks force every value to span several reads.
+            for chunk_size in (1, 5, 1 << 20):
+                got = list(mitparser.iter_mit_instances(
+                    path, chunk_size=chunk_size))
+                self.assertEqual(got, expected)
+        finally:
+            os.remove(path)
+
     def test_sample1(self):
         state1 = np.random.RandomState(42)
         state2 = np.random.RandomState(42)
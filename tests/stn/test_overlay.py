@@ -0,0 +1,87 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat import propagation
+from libheat.incremental import IncrementalChecker
+from libheat.stntools.overlay import OverlaySTN
+from tests.stn.helpers import structure
+
+
+STN1 = "test_data/two_agent_sync.json"
+STN2 = "test_data/two_contingent.json"
+
+
+class TestOverlay(unittest.TestCase):
+    def test_matches_copy(self):
+        for path in (STN1, STN2):
+            base = stntools.load_stn_from_json_file(path)["stn"]
+            before = structure(base)
+            stn = OverlaySTN(base)
+            expected = base.copy()
+            self.assertEqual(structure(stn), structure(expected))
+            self.assertEqual(stn.changes(), 0)
+
+            v = [v for v in base.verts if v != 0][0]
+            for s in (stn, expected):
+                s.update_edge(0, v, 5.0, force=True)
+                s.update_edge(v, 0, -5.0, force=True)
+                s.execute(v)
+                s.update_edge(0, v, 1000.0, create=True)
+            self.assertTrue(propagation.tighten(stn))
+            self.assertTrue(propagation.tighten(expected))
+            self.assertEqual(structure(stn), structure(expected))
+            self.assertEqual(str(stn), str(expected))
+            self.assertEqual(structure(stn.copy()), structure(expected))
+
+            for s in (stn, expected):
+                s.remove_vertex(v)
+                s.add_vertex(v, 1)
+                s.add_edge(0, v, 1.0, 2.0)
+            self.assertEqual(structure(stn), structure(expected))
+            # The base is never changed.
+            self.assertEqual(structure(base), before)
+
+    def test_changes_are_local(self):
+        base = stntools.load_stn_from_json_file(STN1)["stn"]
+        stn = OverlaySTN(base)
+        e = stn.get_edge(0, 1)
+        stn.update_edge(0, 1, e.Cij - 1.0)
+        self.assertIsNot(stn.get_edge(0, 1), e)
+        self.assertIs(stn.get_edge(1, 2), base.get_edge(1, 2))
+        self.assertEqual(stn.changes(), 1)
+        # Overlays can be stacked.
+        top = OverlaySTN(stn)
+        top.execute(1)
+        self.assertTrue(top.get_vertex(1).is_executed())
+        self.assertFalse(stn.get_vertex(1).is_executed())
+        self.assertEqual(top.get_edge_weight(0, 1), e.Cij - 1.0)
+
+    def test_checker(self):
+        for path in (STN1, STN2):
+            base = stntools.load_stn_from_json_file(path)["stn"]
+            before = structure(base)
+            stn = OverlaySTN(base)
+            expected = base.copy()
+            checkers = [IncrementalChecker(stn),
+                        IncrementalChecker(expected)]
+            for v in sorted(base.verts):
+                if v == 0:
+                    continue
+                time = -stn.get_edge_weight(v, 0)
+                late = stn.get_edge_weight(0, v) + 1.0
+                for checker in checkers:
+                    # Loosening fully propagates, then is undone.
+                    checker.assign(v, late)
+                    checker.rollback()
+                    self.assertTrue(checker.assign(v, time))
+                    checker.commit()
+                self.assertEqual(structure(stn), structure(expected))
+            for checker in checkers:
+                checker.propagate()
+                checker.rollback()
+            self.assertEqual(structure(stn), structure(expected))
+            self.assertEqual(structure(base), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat import propagation
+from libheat.montsim import Simulator
+from libheat.stntools import ppc
+from tests.stn.helpers import weights
+
+
+STN1 = "test_data/two_agent_sync.json"
+STN2 = "test_data/two_agent_stretch.json"
+
+
+class TestPPC(unittest.TestCase):
+    def setUp(self):
+        ppc.clear_cache()
+
+    def test_matches_floyd_warshall(self):
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            expected = stn.copy()
+            self.assertTrue(expected.floyd_warshall())
+            for heuristic in ppc.HEURISTICS:
+                tri = ppc.triangulate(stn, heuristic)
+                tightened = stn.copy()
+                self.assertTrue(ppc.tighten(tightened, tri))
+                self.assertEqual(weights(tightened), weights(expected))
+
+    def test_inconsistent(self):
+        stn = stntools.STN()
+        stn.add_vertex(0, None)
+        stn.add_vertex(1, 1)
+        stn.add_vertex(2, 1)
+        stn.add_edge(0, 1, 0.0, 10.0)
+        stn.add_edge(1, 2, 5.0, 10.0)
+        stn.add_edge(0, 2, 0.0, 3.0)
+        before = weights(stn)
+        self.assertFalse(ppc.tighten(stn))
+        self.assertEqual(weights(stn), before)
+
+    def test_restricts_cached(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        whole = ppc.get_triangulation(stn)
+        self.assertIs(ppc.get_triangulation(stn.copy()), whole)
+        # Removing an event reuses the whole instance's ordering.
+        v = [v for v in stn.verts if v != 0][0]
+        stn.remove_vertex(v)
+        tri = ppc.get_triangulation(stn)
+        self.assertIsNot(tri, whole)
+        self.assertEqual(tri.order, [u for u in whole.order if u != v])
+
+    def test_same_simulation(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        results = []
+        for backend in ("johnson", "ppc"):
+            propagation.set_backend(backend)
+            try:
+                sim = Simulator(0)
+                results.append((sim.simulate(stn, "drea"),
+                                sim.get_assigned_times()))
+            finally:
+                propagation.set_backend(None)
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
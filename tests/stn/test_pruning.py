@@ -0,0 +1,40 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat.montsim import Simulator
+from libheat.pruning import Pruner
+from tests.stn.helpers import structure
+
+
+STN1 = "test_data/two_agent_sync.json"
+STN2 = "test_data/two_contingent.json"
+
+
+class TestPruning(unittest.TestCase):
+    def test_matches_remove_old_timepoints(self):
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            expected = stn.copy()
+            pruner = Pruner(stn)
+            # Execute in an order which leaves some timepoints waiting.
+            for v in sorted(stn.verts, reverse=True):
+                stn.get_vertex(v).execute()
+                expected.get_vertex(v).execute()
+                pruner.executed(v)
+                pruner.prune()
+                Simulator().remove_old_timepoints(expected)
+                self.assertEqual(structure(stn), structure(expected))
+            self.assertEqual(list(stn.verts), [0])
+
+    def test_remove_vertices(self):
+        stn = stntools.load_stn_from_json_file(STN2)["stn"]
+        expected = stn.copy()
+        removed = stn.received_timepoints[:1] + [1]
+        for v in removed:
+            expected.remove_vertex(v)
+        stn.remove_vertices(removed + [1000])
+        self.assertEqual(structure(stn), structure(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import libheat.stntools as stntools
+from libheat.stntools import shortestpaths
+from tests.stn.helpers import weights
+
+
+STN1 = "test_data/two_agent_sync.json"
+STN2 = "test_data/two_agent_stretch.json"
+
+
+class TestShortestPaths(unittest.TestCase):
+    def test_matches_floyd_warshall(self):
+        for path in (STN1, STN2):
+            stn = stntools.load_stn_from_json_file(path)["stn"]
+            expected = stn.copy()
+            self.assertTrue(expected.floyd_warshall())
+            tightened = stn.copy()
+            self.assertTrue(shortestpaths.tighten(tightened))
+            self.assertEqual(weights(tightened), weights(expected))
+
+    def test_rows(self):
+        stn = stntools.load_stn_from_json_file(STN1)["stn"]
+        vert_ids, dist = shortestpaths.distance_matrix(stn)
+        from_z = shortestpaths.distances_from(stn, 0)
+        to_z = shortestpaths.distances_to(stn, 0)
+        z = vert_ids.index(0)
+        for k, v in enumerate(vert_ids):
+            self.assertEqual(from_z[v], dist[z, k])
+            self.assertEqual(to_z[v], dist[k, z])
+
+    def test_negative_cycle(self):
+        stn = stntools.STN()
+        for v in (0, 1, 2):
+            stn.add_vertex(v, None)
+        stn.add_edge(0, 1, 5.0, 10.0)
+        stn.add_edge(1, 2, 5.0, 10.0)
+        stn.add_edge(0, 2, 0.0, 8.0)
+        before = weights(stn)
+        self.assertFalse(shortestpaths.is_consistent(stn))
+        self.assertIsNone(shortestpaths.distance_matrix(stn))
+        self.assertFalse(shortestpaths.tighten(stn))
+        self.assertEqual(weights(stn), before)
+        stn.update_edge(0, 2, 12.0, force=True)
+        self.assertTrue(shortestpaths.is_consistent(stn))
+
+
+if __name__ == "__main__":
+    unittest.main()